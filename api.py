@@ -1,12 +1,189 @@
-from typing import Any
+import asyncio
+import gzip
+import marshal
+import time
+import zlib
+from typing import Any, Dict, List, Optional
 from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 import services.logger.logger as logger
 import jdUtil as jdUtil
-from services.model.model_api import SkuInfo, SkuType
+from common.fastjson import FastJSONResponse, dumps, read_json
+from common.utils import decode_cursor, encode_cursor
+from global_conf import global_vars
+from services.cache.product_index import ProductIndex
+from services.cache.ttl_cache import TTLCache
+from services.db.remote.write_behind import SkuWriteBehind
+from services.history.compactor import HistoryCompactor
+from services.history.store import PriceHistoryStore, downsample
+from services.jdhelper.error import NetworkError, TuringVerificationRequiredError
+from services.metrics.metrics import POOL_IN_USE, POOL_SIZE, QUEUE_PENDING
+from services.metrics.registry import REGISTRY
+from services.model.model_api import ProductQuery, SkuInfo, SkuType
+from services.profiling.profiler import (HEAP_STAT_KEYS, SLOW_PROFILE_SCOPE, SORT_KEYS, Profiler, ProfilerBusyError,
+                                        format_collapsed, format_stats)
+from services.db.remote.crawl_lease import CrawlLeaseCoordinator
+from services.scheduler.lease_crawler import LeaseCrawler
+from services.scheduler.refresher import PriceRefresher
+
+# 商品列表分页参数，请求中带有任意一个时按分页格式返回
+PAGE_PARAMS = ("limit", "cursor", "minPrice", "maxPrice", "brand", "isTakenDown")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 class Api:
     def __init__(self, jdUtil: jdUtil):
         self.jd = jdUtil
+        cache_conf = global_vars.Conf.cache
+        # 按 (sku_code, 类型) 缓存 SkuInfo 字典，并发的同一商品查询只抓取一次；
+        # 类型会写入数据库，不同类型的查询不能共用一次抓取结果
+        self.sku_cache: TTLCache[dict] = TTLCache(
+            ttl=cache_conf.SkuTtl,
+            stale_ttl=cache_conf.SkuStaleTtl,
+            max_size=cache_conf.SkuMaxSize,
+            name="sku_cache",
+        )
+        # 按类型、价格排序的商品索引，getProductList 直接读内存
+        self.product_index = ProductIndex()
+        # getProductList 整类列表的响应体 [etag, JSON, gzip 后的 JSON]，商品未变化时不重复序列化和压缩
+        self._list_bodies: Dict[str, List[Any]] = {}
+        # 商品写入缓冲，抓取结果批量写库
+        self.sku_writer = SkuWriteBehind(self.jd.mysql, on_written=self._on_sku_written)
+        # 抓取结果与上一次相比有无变化的次数
+        self.changed_scrapes = 0
+        self.unchanged_scrapes = 0
+        # 后台价格刷新，按新鲜度、波动和热度安排重新抓取
+        refresh_conf = global_vars.Conf.refresh
+        self.refresher = PriceRefresher(
+            self.refresh_sku,
+            min_interval=refresh_conf.MinInterval,
+            base_interval=refresh_conf.BaseInterval,
+            max_interval=refresh_conf.MaxInterval,
+            rate=refresh_conf.RatePerSecond,
+            burst=refresh_conf.Burst,
+            concurrency=refresh_conf.Concurrency,
+            volatility_alpha=refresh_conf.VolatilityAlpha,
+            volatility_weight=refresh_conf.VolatilityWeight,
+            popularity_half_life=refresh_conf.PopularityHalfLife,
+            taken_down_factor=refresh_conf.TakenDownFactor,
+            verify_cooldown=refresh_conf.VerifyCooldown,
+        )
+        # 价格历史：只记录变化点，过期数据定时压缩
+        history_conf = global_vars.Conf.history
+        self.history_store = PriceHistoryStore(
+            self.jd.mysql.sync, block_span=history_conf.BlockSpan, compact_after=history_conf.CompactAfter,
+        )
+        self.history_compactor = HistoryCompactor(
+            self.jd.mysql, self.history_store,
+            interval=history_conf.CompactInterval, batch=history_conf.CompactBatch,
+        )
+        # 多节点模式下由租约表决定抓取哪些商品，refresher 只负责计算刷新间隔
+        self.scheduler = self.refresher
+        if refresh_conf.Distributed:
+            self.refresher.passive = True
+            self.scheduler = LeaseCrawler(
+                self.jd.mysql,
+                CrawlLeaseCoordinator(self.jd.mysql.sync, refresh_conf.NodeId, refresh_conf.LeaseSeconds),
+                self.refresh_sku,
+                self.refresher.next_refresh_in,
+                concurrency=refresh_conf.Concurrency,
+                rate=refresh_conf.RatePerSecond,
+                burst=refresh_conf.Burst,
+                claim_batch=refresh_conf.ClaimBatch,
+                heartbeat_interval=refresh_conf.LeaseHeartbeat,
+                idle_interval=refresh_conf.IdleInterval,
+                reseed_interval=refresh_conf.ReseedInterval,
+                first_interval=refresh_conf.BaseInterval,
+                retry_delay=refresh_conf.RetryDelay,
+                max_retry_delay=refresh_conf.MaxInterval,
+                verify_cooldown=refresh_conf.VerifyCooldown,
+            )
+        # 商品索引加载结束（无论成功与否）后才把商品交给后台刷新
+        self.index_loaded = asyncio.Event()
+        self._refresh_start_task: Optional[asyncio.Task] = None
+        # split 模式的 API 进程不运行后台刷新，定时从数据库重新加载索引，读到其他 API 进程的抓取结果
+        self._index_reload_task: Optional[asyncio.Task] = None
+        self._register_metric_gauges()
+        # /debug/pprof 使用，只有 enable_pprof 时才注册路由
+        profile_conf = global_vars.Conf.profile
+        self.profiler = Profiler(
+            profile_dir=profile_conf.ProfileDir,
+            max_seconds=profile_conf.MaxSeconds,
+            sample_interval=profile_conf.SampleInterval,
+            slow_request_threshold=profile_conf.SlowRequestThreshold,
+            slow_request_sample_rate=profile_conf.SlowRequestSampleRate,
+            max_saved_profiles=profile_conf.MaxSavedProfiles,
+            max_heap_snapshots=profile_conf.MaxHeapSnapshots,
+            tracemalloc_frames=profile_conf.TracemallocFrames,
+        )
+
+    def _register_metric_gauges(self):
+        """资源池和队列的瞬时值在 /metrics 输出时读取"""
+        POOL_SIZE.set_function(lambda: [({"pool": name}, size) for name, size, _ in self.jd.pool_usage()])
+        POOL_IN_USE.set_function(lambda: [({"pool": name}, in_use) for name, _, in_use in self.jd.pool_usage()])
+
+        def pending():
+            queues = [({"queue": "write_behind"}, self.sku_writer.stats()["pending"])]
+            if self.jd.crawl_pool is not None:
+                queues.append(({"queue": "crawl_jobs"}, self.jd.crawl_pool.stats()["pending"]))
+            if self.jd.job_client is not None:
+                queues.append(({"queue": "job_client"}, self.jd.job_client.stats()["pending"]))
+            return queues
+
+        QUEUE_PENDING.set_function(pending)
+
+    async def init_product_index(self):
+        """
+        从数据库加载商品索引，异常继续抛出由调用方记录就绪状态并重试
+
+        加载成功前 getProductList 回退到直接查库，后台价格刷新等到加载成功后再开始。
+        """
+        try:
+            rows = await self.jd.mysql.query_all_sku_info()
+            self.product_index.load(rows)
+        except Exception as e:
+            logger.error(f"加载商品索引失败: {e}")
+            raise
+        self.index_loaded.set()
+
+    def start_background_tasks(self):
+        """
+        在 HTTP 服务所在的事件循环中启动后台价格刷新和历史压缩
+
+        HTTP 服务先于商品索引启动，价格刷新等索引加载结束后再开始；
+        split 模式的 API 进程只定时重新加载索引，刷新和压缩由抓取进程负责
+        """
+        if self.jd.job_client is not None:
+            self._index_reload_task = asyncio.create_task(self._reload_index())
+            return
+        if global_vars.Conf.history.Enabled:
+            self.history_compactor.start()
+        if global_vars.Conf.refresh.Enabled:
+            self._refresh_start_task = asyncio.create_task(self._start_refresh())
+
+    async def _start_refresh(self):
+        await self.index_loaded.wait()
+        self.refresher.load(self.product_index.active_rows())
+        self.scheduler.start()
+
+    async def _reload_index(self):
+        interval = global_vars.Conf.split.IndexReloadInterval
+        await self.index_loaded.wait()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                rows = await self.jd.mysql.query_all_sku_info()
+                self.product_index.load(rows)
+            except Exception as e:
+                logger.error(f"重新加载商品索引失败: {e}")
+
+    async def stop_background_tasks(self):
+        for task in (self._refresh_start_task, self._index_reload_task):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        await self.history_compactor.stop()
+        await self.scheduler.stop()
 
     async def DevHand(self, request: Request):
         return {"buffge": 23456}
@@ -16,7 +193,7 @@ class Api:
     #     summoner_name = data.get("summonerName", "").strip()
 
     async def QuerySkuInfo(self, request: Request):
-        data = await request.json()
+        data = await read_json(request)
         sku_code = data.get("skuCode", "").strip()
         sku_type_str = data.get("skuType", "").strip()
         
@@ -25,7 +202,89 @@ class Api:
             sku_type_code = SkuType.get_type_code(sku_type_str)
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid sku type: {sku_type_str}")
-            
+
+        return FastJSONResponse(await self._query_and_save(sku_code, sku_type_code))
+
+    async def QuerySkuInfoBatch(self, request: Request):
+        """
+        批量查询商品信息，按并发上限抓取，每解析完一个就以 NDJSON 的形式推送一行
+
+        请求体：{"skuCodes": [...], "skuType": "显卡", "concurrency": 4}
+        每行格式：
+            {"sku_code": ..., "status": "ok" | "taken_down", "data": {...}}
+            {"sku_code": ..., "status": "error", "error": "NetworkError", "message": ...}
+        """
+        data = await read_json(request)
+        sku_type_str = data.get("skuType", "").strip()
+        raw_codes = data.get("skuCodes", [])
+        scrape_conf = global_vars.Conf.scrape
+
+        try:
+            sku_type_code = SkuType.get_type_code(sku_type_str)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid sku type: {sku_type_str}")
+
+        if not isinstance(raw_codes, list):
+            raise HTTPException(status_code=400, detail="skuCodes must be a list")
+        # 去重并保持原有顺序
+        sku_codes = list(dict.fromkeys(str(code).strip() for code in raw_codes if str(code).strip()))
+        if not sku_codes:
+            raise HTTPException(status_code=400, detail="skuCodes is empty")
+        if len(sku_codes) > scrape_conf.BatchMaxSkus:
+            raise HTTPException(status_code=400, detail=f"Too many skuCodes, max {scrape_conf.BatchMaxSkus}")
+
+        try:
+            concurrency = int(data.get("concurrency") or scrape_conf.BatchConcurrency)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid concurrency")
+        concurrency = max(1, min(concurrency, scrape_conf.BatchMaxConcurrency))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def query_one(sku_code: str) -> dict:
+            async with semaphore:
+                try:
+                    sku_info = await self._query_and_save(sku_code, sku_type_code)
+                except (NetworkError, TuringVerificationRequiredError) as e:
+                    return _batch_error(sku_code, e)
+                except Exception as e:
+                    logger.error(f"批量查询商品 {sku_code} 失败: {e}")
+                    return _batch_error(sku_code, e)
+            if not sku_info:
+                return {"sku_code": sku_code, "status": "error", "error": "NotFound", "message": "未获取到商品信息"}
+            status = "taken_down" if sku_info['is_taken_down'] else "ok"
+            return {"sku_code": sku_code, "status": status, "data": sku_info}
+
+        async def stream():
+            tasks = [asyncio.create_task(query_one(sku_code)) for sku_code in sku_codes]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    line = await next_done
+                    yield dumps(line) + b"\n"
+            finally:
+                # 客户端断开时取消尚未完成的抓取
+                for task in tasks:
+                    task.cancel()
+
+        logger.info(f"批量查询 {len(sku_codes)} 个商品，并发数 {concurrency}")
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    async def _query_and_save(self, sku_code: str, sku_type_code: int) -> Optional[dict]:
+        """查询商品信息，优先读取缓存，未命中时抓取并写入数据库"""
+        self.refresher.touch(sku_code)
+        return await self.sku_cache.get_or_load(
+            (sku_code, sku_type_code), lambda: self._scrape_and_save(sku_code, sku_type_code)
+        )
+
+    async def _scrape_and_save(self, sku_code: str, sku_type_code: int) -> Optional[dict]:
+        """
+        抓取商品信息并提交到写入缓冲，返回 SkuInfo 字典
+
+        写库由 SkuWriteBehind 批量完成，内存中的商品索引在写库成功后由 _on_sku_written 更新。
+        内容指纹与索引中上一次的结果相同、且数据库中的指纹也相同时不写商品行，只更新 last_seen_time。
+        split 模式的 API 进程把查询交给抓取进程，由抓取进程写库，本进程只更新内存中的索引。
+        """
+        if self.jd.job_client is not None:
+            return await self._query_scraper(sku_code, sku_type_code)
         # 使用 SkuInfo 类封装数据
         raw_info = await self.jd.query_sku_info(sku_code)
         if raw_info:
@@ -38,18 +297,349 @@ class Api:
                 type=str(sku_type_code),
                 is_taken_down=raw_info['is_taken_down']
             )
-            self.jd.mysql.insert_sku_info(sku_info.to_dict())
-            return sku_info.to_dict()
-        
+            sku_info_dict = sku_info.to_dict()
+            fingerprint = sku_info.fingerprint()
+            # 索引在写库成功后才更新，先与写入缓冲中尚未写库的结果比较
+            pending = self.sku_writer.get_pending(sku_code)
+            previous = pending
+            if previous is None and self.product_index.loaded:
+                previous = self.product_index.get(sku_code)
+            if previous is not None and previous['fingerprint'] == fingerprint:
+                self.unchanged_scrapes += 1
+                if pending is None:
+                    # 索引可能落后于其他节点的写入，由数据库按指纹判断是否只更新 last_seen_time
+                    self.sku_writer.mark_seen({**sku_info_dict, 'fingerprint': fingerprint})
+            else:
+                self.changed_scrapes += 1
+                # 价格或下架状态变化时才记录价格历史，只有名称变化时不记录
+                price_changed = (previous is None
+                                 or float(previous['price'] or 0) != float(sku_info.price or 0)
+                                 or int(previous['is_taken_down'] or 0) != int(sku_info.is_taken_down or 0))
+                record = {**sku_info_dict, 'fingerprint': fingerprint}
+                await self.sku_writer.submit(
+                    record, record_history=price_changed and global_vars.Conf.history.Enabled,
+                )
+            self.refresher.observe(sku_info_dict)
+            return sku_info_dict
+
         return None
 
+    def _on_sku_written(self, records: List[dict], seen_sku_codes: List[str]):
+        """一批商品写库成功后更新内存中的商品索引"""
+        for record in records:
+            self.product_index.upsert(record)
+        for sku_code in seen_sku_codes:
+            self.product_index.mark_seen(sku_code)
+
+    async def _query_scraper(self, sku_code: str, sku_type_code: int) -> Optional[dict]:
+        sku_info_dict = await self.jd.job_client.call("query", {"sku_code": sku_code, "type_code": sku_type_code})
+        if not sku_info_dict:
+            return None
+        sku_info = SkuInfo(**sku_info_dict)
+        self.product_index.upsert({**sku_info_dict, 'fingerprint': sku_info.fingerprint()})
+        return sku_info_dict
+
+    async def refresh_sku(self, sku_code: str, sku_type_code: int) -> Optional[dict]:
+        """后台刷新使用：跳过缓存直接抓取，并用结果更新缓存"""
+        sku_info = await self._scrape_and_save(sku_code, sku_type_code)
+        if sku_info is not None:
+            self.sku_cache.set((sku_code, sku_type_code), sku_info)
+        return sku_info
+
+    async def GetStats(self, request: Request):
+        stats = self.jd.stats()
+        stats["sku_cache"] = self.sku_cache.stats()
+        stats["product_index"] = self.product_index.stats()
+        stats["sku_writer"] = self.sku_writer.stats()
+        stats["refresher"] = self.scheduler.stats()
+        stats["price_history"] = self.history_store.stats()
+        scrapes = self.changed_scrapes + self.unchanged_scrapes
+        stats["change_detection"] = {
+            "changed": self.changed_scrapes,
+            "unchanged": self.unchanged_scrapes,
+            "unchanged_ratio": round(self.unchanged_scrapes / scrapes, 3) if scrapes else 0,
+        }
+        return stats
+
+    async def Healthz(self, request: Request):
+        """进程存活即返回，不检查依赖"""
+        return {"status": "OK"}
+
+    async def Readyz(self, request: Request):
+        """数据库、浏览器等组件初始化完成前返回 503，响应体为各组件状态"""
+        snapshot = self.jd.readiness.snapshot()
+        return FastJSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+    async def Metrics(self, request: Request):
+        """Prometheus 格式的指标，包含抓取进程通过心跳上报的数值；split 模式的 API 进程返回抓取进程合并后的结果"""
+        if self.jd.job_client is not None:
+            text = await self.jd.job_client.call("render_metrics")
+        else:
+            text = REGISTRY.render()
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    async def GetPriceHistory(self, request: Request):
+        """
+        查询商品价格历史
+
+        参数（POST 请求体或 GET 查询参数）：
+            skuCode: 商品编号
+            start / end: 时间范围（秒级时间戳），默认最近 History.DefaultRange 秒
+            buckets: 可选，按时间等分为 buckets 段返回开高低收，不传时返回全部变化点
+        """
+        data = await read_json(request) if request.method == "POST" else request.query_params
+        sku_code = str(data.get("skuCode", "")).strip()
+        if not sku_code:
+            raise HTTPException(status_code=400, detail="skuCode is required")
+        history_conf = global_vars.Conf.history
+        try:
+            end = int(data.get("end") or time.time())
+            start = int(data.get("start") or end - history_conf.DefaultRange)
+            buckets = int(data.get("buckets") or 0)
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid price history params: {e}")
+        if start >= end:
+            raise HTTPException(status_code=400, detail="start must be earlier than end")
+        if buckets < 0 or buckets > history_conf.MaxBuckets:
+            raise HTTPException(status_code=400, detail=f"buckets must be between 0 and {history_conf.MaxBuckets}")
+
+        try:
+            points = await self.jd.mysql.run(self.history_store.query, sku_code, start, end)
+        except Exception as e:
+            logger.error(f"查询商品 {sku_code} 的价格历史失败: {e}")
+            raise HTTPException(status_code=503, detail="Price history is temporarily unavailable")
+        result = {"sku_code": sku_code, "start": start, "end": end}
+        if buckets:
+            result["buckets"] = downsample(points, start, end, buckets)
+        else:
+            result["points"] = [{"ts": ts, "price": price, "is_taken_down": flag} for ts, price, flag in points]
+        return result
+
+    async def GetRefresherStatus(self, request: Request):
+        return self.scheduler.stats()
+
+    async def PauseRefresher(self, request: Request):
+        self.scheduler.pause()
+        logger.info("后台价格刷新已暂停")
+        return self.scheduler.stats()
+
+    async def ResumeRefresher(self, request: Request):
+        self.scheduler.resume()
+        logger.info("后台价格刷新已恢复")
+        return self.scheduler.stats()
+
+    async def ProfileCpu(self, request: Request):
+        """
+        CPU 性能分析
+
+        查询参数：
+            seconds: 采集时长，默认 10 秒，不超过 Profile.MaxSeconds
+            mode: cprofile（默认，分析 HTTP 事件循环线程）或 sample（采样所有线程的调用栈，返回 collapsed 格式）
+            format: cprofile 模式下 text（默认）返回 pstats 文本，prof 返回可用 snakeviz 打开的文件
+            sort / limit: pstats 文本的排序方式和行数
+        """
+        params = request.query_params
+        try:
+            seconds = float(params.get("seconds", 10))
+            limit = int(params.get("limit", 50))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid profile params: {e}")
+        if seconds <= 0:
+            raise HTTPException(status_code=400, detail="seconds must be positive")
+        mode = params.get("mode", "cprofile")
+        sort = params.get("sort", "cumulative")
+        if sort not in SORT_KEYS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of {SORT_KEYS}")
+
+        if mode == "sample":
+            stacks = await self.profiler.sample(seconds)
+            return PlainTextResponse(format_collapsed(stacks))
+        if mode != "cprofile":
+            raise HTTPException(status_code=400, detail="mode must be cprofile or sample")
+        try:
+            profile = await self.profiler.cpu_profile(seconds)
+        except ProfilerBusyError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if params.get("format") == "prof":
+            profile.create_stats()
+            return Response(
+                marshal.dumps(profile.stats), media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="cpu-{int(time.time())}.prof"'},
+            )
+        return PlainTextResponse(format_stats(profile, sort, limit))
+
+    async def HeapSnapshot(self, request: Request):
+        """保存 tracemalloc 快照，返回编号和占用最多的分配位置；tracemalloc 未启动时自动启动"""
+        params = request.query_params
+        try:
+            limit = int(params.get("limit", 30))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid heap snapshot params: {e}")
+        key = params.get("key", "lineno")
+        if key not in HEAP_STAT_KEYS:
+            raise HTTPException(status_code=400, detail=f"key must be one of {HEAP_STAT_KEYS}")
+        snapshot_id = self.profiler.heap_snapshot()
+        return {"id": snapshot_id, "top": self.profiler.heap_top(snapshot_id, key, limit)}
+
+    async def HeapDiff(self, request: Request):
+        """比较两个快照（from、to 为 HeapSnapshot 返回的编号），返回增长最多的分配位置"""
+        params = request.query_params
+        try:
+            from_id = int(params["from"])
+            to_id = int(params["to"])
+            limit = int(params.get("limit", 30))
+        except (KeyError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid heap diff params: {e}")
+        key = params.get("key", "lineno")
+        if key not in HEAP_STAT_KEYS:
+            raise HTTPException(status_code=400, detail=f"key must be one of {HEAP_STAT_KEYS}")
+        try:
+            return {"from": from_id, "to": to_id, "diff": self.profiler.heap_diff(from_id, to_id, key, limit)}
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    async def HeapStop(self, request: Request):
+        """停止 tracemalloc 并丢弃保存的快照"""
+        self.profiler.heap_stop()
+        return self.profiler.stats()
+
+    async def GetProfilerStatus(self, request: Request):
+        return self.profiler.stats()
+
+    async def ListSlowProfiles(self, request: Request):
+        """慢请求分析覆盖整个事件循环线程，scope 字段说明这一点，避免把并发请求的开销误认为是该请求的"""
+        return {"threshold": self.profiler.slow_request_threshold, "scope": SLOW_PROFILE_SCOPE,
+                "profiles": self.profiler.saved_profiles()}
+
+    async def GetSlowProfile(self, request: Request, name: str):
+        """下载慢请求的 .prof 文件，format=text 时返回 pstats 文本"""
+        path = self.profiler.saved_profile_path(name)
+        if path is None:
+            raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+        if request.query_params.get("format") == "text":
+            sort = request.query_params.get("sort", "cumulative")
+            if sort not in SORT_KEYS:
+                raise HTTPException(status_code=400, detail=f"sort must be one of {SORT_KEYS}")
+            return PlainTextResponse(f"# {SLOW_PROFILE_SCOPE}\n{format_stats(path, sort)}")
+        return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+    async def GetLoopReport(self, request: Request):
+        """
+        事件循环阻塞报告
+
+        按阻塞总时长列出占用事件循环超过阈值的调用位置，limit 为每个循环返回的条数
+        """
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid limit: {e}")
+        return {name: monitor.report(limit) for name, monitor in self.jd.loop_monitors.items()}
+
+    async def ResetLoopReport(self, request: Request):
+        for monitor in self.jd.loop_monitors.values():
+            monitor.reset()
+        return {name: monitor.stats() for name, monitor in self.jd.loop_monitors.items()}
+
     async def GetProductList(self, request: Request):
-        data = await request.json()
-        sku_type = data.get("type", "").strip()
+        """
+        按类型查询商品列表
+
+        POST 从请求体、GET 从查询参数读取 type。索引加载完成后直接读内存，
+        并返回 ETag，请求头 If-None-Match 与之相同时返回 304。
+
+        带有 limit、cursor、minPrice、maxPrice、brand、isTakenDown 中任意参数时按分页格式返回：
+            {"items": [{sku_code, sku_name, price}, ...], "next_cursor": "..." | null}
+        否则保持原有格式，返回该类型下的全部商品。
+        """
+        data = await read_json(request) if request.method == "POST" else request.query_params
+        sku_type = str(data.get("type", "")).strip()
 
-        sku_list = self.jd.mysql.query_sku_info_by_type(sku_type)
+        if any(data.get(name) not in (None, "") for name in PAGE_PARAMS):
+            return await self._get_product_page(request, _parse_product_query(sku_type, data))
 
-        return [{
+        if self.product_index.loaded:
+            etag = self.product_index.etag(sku_type)
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            return self._product_list_response(sku_type, etag, headers,
+                                               "gzip" in request.headers.get("accept-encoding", ""))
+
+        sku_list = await self.jd.mysql.query_sku_info_by_type(sku_type)
+
+        return FastJSONResponse([{
             "sku_name": sku['sku_name'],
             "price": sku['price']
-        } for sku in sku_list]
+        } for sku in sku_list])
+
+    def _product_list_response(self, sku_type: str, etag: str, headers: dict, accept_gzip: bool) -> Response:
+        cached = self._list_bodies.get(sku_type)
+        if cached is None or cached[0] != etag:
+            items = self.product_index.list_by_type(sku_type)
+            cached = [etag, dumps(items), None]
+            # 只缓存有商品的类型，请求中任意的 type 不会让缓存无限增长
+            if items:
+                self._list_bodies[sku_type] = cached
+        body = cached[1]
+        http_conf = global_vars.Conf.http
+        headers["Vary"] = "Accept-Encoding"
+        if accept_gzip and 0 < http_conf.GzipMinSize <= len(body):
+            if cached[2] is None:
+                cached[2] = gzip.compress(body, compresslevel=http_conf.GzipLevel)
+            body = cached[2]
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def _get_product_page(self, request: Request, query: ProductQuery):
+        headers = {}
+        if self.product_index.loaded:
+            # 同一类型版本下相同的查询条件结果相同，ETag 由类型版本和查询条件共同决定
+            query_key = zlib.crc32(repr(query).encode("utf-8"))
+            etag = f'{self.product_index.etag(query.type)[:-1]}-{query_key:x}"'
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            rows = self.product_index.page(query)
+        else:
+            rows = await self.jd.mysql.query_sku_info_page(query)
+
+        items = [{
+            "sku_code": row['sku_code'],
+            "sku_name": row['sku_name'],
+            "price": float(row['price']),
+        } for row in rows[:query.limit]]
+        next_cursor = None
+        if len(rows) > query.limit and items:
+            next_cursor = encode_cursor([items[-1]['price'], items[-1]['sku_code']])
+        return FastJSONResponse({"items": items, "next_cursor": next_cursor}, headers=headers)
+
+
+def _parse_product_query(sku_type: str, data) -> ProductQuery:
+    """从请求参数构造 ProductQuery，参数不合法时返回 400"""
+    try:
+        limit = int(data.get("limit") or DEFAULT_PAGE_SIZE)
+        query = ProductQuery(type=sku_type, limit=max(1, min(limit, MAX_PAGE_SIZE)))
+        if data.get("cursor"):
+            query.after_price, query.after_sku_code = decode_cursor(data["cursor"])
+            query.after_price = float(query.after_price)
+            query.after_sku_code = str(query.after_sku_code)
+        if data.get("minPrice") not in (None, ""):
+            query.min_price = float(data["minPrice"])
+        if data.get("maxPrice") not in (None, ""):
+            query.max_price = float(data["maxPrice"])
+        if data.get("brand"):
+            query.brand = str(data["brand"]).strip()
+        if data.get("isTakenDown") not in (None, ""):
+            query.is_taken_down = int(data["isTakenDown"])
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid product list params: {e}")
+    return query
+
+
+def _batch_error(sku_code: str, e: Exception) -> dict:
+    return {
+        "sku_code": sku_code,
+        "status": "error",
+        "error": type(e).__name__,
+        "message": getattr(e, "message", None) or str(e),
+    }
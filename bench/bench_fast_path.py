@@ -0,0 +1,125 @@
+"""
+HTTP 快速通道与 Playwright 渲染的吞吐对比
+
+用法（在项目根目录执行）：
+    python -m bench.bench_fast_path --skus 200 --concurrency 8
+    python -m bench.bench_fast_path --browser   # 同时测试 Playwright 路径，需要已安装 chromium
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from bench.fixtures import FixtureServer
+from common.utils import percentile
+from global_conf import global_vars
+from services.logger.logger import setup_logger
+
+
+async def run_load(name: str, fn: Callable[[str], Awaitable[object]], sku_codes: List[str], concurrency: int,
+                   unit: str = "scrapes") -> dict:
+    """以固定并发执行 fn，返回吞吐与延迟分位数，吞吐记为 {unit}_per_s"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one(sku_code: str):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await fn(sku_code)
+                if result is None:
+                    failures += 1
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(sku_code) for sku_code in sku_codes))
+    elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "count": len(sku_codes),
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "unit": unit,
+        f"{unit}_per_s": round(len(sku_codes) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+async def bench_fast_path(item_url_template: str, sku_codes: List[str], concurrency: int) -> dict:
+    from services.jdhelper.fast_fetch import FastSkuFetcher
+
+    fetcher = FastSkuFetcher(item_url_template=item_url_template, cookie_file="", max_connections=concurrency)
+    try:
+        await fetcher.fetch(sku_codes[0])  # 预热连接
+        return await run_load("http_fast_path", fetcher.fetch, sku_codes, concurrency)
+    finally:
+        await fetcher.close()
+
+
+async def bench_browser(item_url_template: str, sku_codes: List[str], concurrency: int) -> dict:
+    from playwright.async_api import async_playwright
+
+    from services.jdhelper.page_pool import PagePool
+    from services.jdhelper.scraper import SkuScraper
+
+    global_vars.Conf.scrape.EnableFastPath = False
+    global_vars.Conf.scrape.ItemUrlTemplate = item_url_template
+    scraper = SkuScraper()
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        context = await browser.new_context()
+        scraper.page_pool = PagePool(context, size=concurrency)
+        await scraper.page_pool.start()
+        try:
+            return await run_load("playwright", scraper.query, sku_codes, concurrency)
+        finally:
+            await scraper.close()
+            await browser.close()
+
+
+def print_result(result: dict):
+    unit = result.get("unit", "scrapes")
+    print(f"{result['name']:>24}: {result[f'{unit}_per_s']:>8} {unit}/s  "
+          f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+          f"failures {result['failures']}/{result['count']}")
+
+
+async def main_async(args) -> List[dict]:
+    sku_codes = [str(100000 + i) for i in range(args.skus)]
+    results = []
+    with FixtureServer(latency=args.latency, padding_kb=args.padding_kb) as server:
+        results.append(await bench_fast_path(server.item_url_template, sku_codes, args.concurrency))
+        print_result(results[-1])
+        if args.browser:
+            results.append(await bench_browser(server.item_url_template, sku_codes, args.concurrency))
+            print_result(results[-1])
+    if len(results) == 2 and results[1]["scrapes_per_s"]:
+        print(f"快速通道吞吐为浏览器的 {results[0]['scrapes_per_s'] / results[1]['scrapes_per_s']:.1f} 倍")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 快速通道基准测试")
+    parser.add_argument("--skus", type=int, default=200, help="请求的商品数量")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--latency", type=float, default=0.0, help="假商品页的额外延迟（秒）")
+    parser.add_argument("--padding-kb", type=int, default=64, help="假商品页的填充大小（KB）")
+    parser.add_argument("--browser", action="store_true", help="同时测试 Playwright 渲染路径")
+    args = parser.parse_args()
+
+    global_vars.Logger = setup_logger("bench", logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
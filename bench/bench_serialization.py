@@ -0,0 +1,153 @@
+"""
+接口序列化的 CPU 开销
+
+不启动 HTTP 服务，逐项测量一次请求中解析、类型转换、构造 SkuInfo 和输出 JSON 的 CPU 时间（time.process_time），
+与改用 orjson、slots SkuInfo、预先计算的类型映射和缓存的商品列表响应体之前的实现对比：
+    - querySkuInfo：解析请求体 + 类型名称转编号 + 构造 SkuInfo + 输出响应
+    - getProductList 分页：50 条商品输出为 JSON
+    - getProductList 整类列表：--products 条商品输出为 JSON（及 gzip 压缩后的大小）
+
+用法（在项目根目录执行）：
+    python -m bench.bench_serialization
+    python -m bench.bench_serialization --products 5000 --seconds 1
+"""
+
+import argparse
+import gzip
+import json
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from common import fastjson
+from common.fastjson import FastJSONResponse
+from services.model.model_api import SkuInfo, SkuType
+
+
+@dataclass
+class _LegacySkuInfo:
+    """改动之前的 SkuInfo：普通 dataclass"""
+    sku_code: str
+    sku_name: str = ""
+    price: float = 0.0
+    url: str = ""
+    brand: str = ""
+    type: str = ""
+    is_taken_down: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'sku_code': self.sku_code,
+            'sku_name': self.sku_name,
+            'price': self.price,
+            'url': self.url,
+            'brand': self.brand,
+            'type': self.type,
+            'is_taken_down': self.is_taken_down
+        }
+
+
+def _legacy_get_type_code(sku_type_str: str) -> int:
+    """改动之前的 SkuType.get_type_code：按定义顺序逐个比较"""
+    for i, member in enumerate(SkuType):
+        if member.value == sku_type_str:
+            return i + 1
+    raise ValueError(f"Invalid sku type: {sku_type_str}")
+
+
+RAW_INFO = {
+    "sku_code": "100012043978",
+    "sku_name": "七彩虹（Colorful）iGame GeForce RTX 4070 SUPER Ultra W OC 12GB 电竞游戏光追显卡",
+    "price": 4899.0,
+    "url": "https://item.jd.com/100012043978.html",
+    "brand": "七彩虹",
+    "is_taken_down": 0,
+}
+REQUEST_BODY = json.dumps({"skuCode": RAW_INFO["sku_code"], "skuType": SkuType.HDD.value}, ensure_ascii=False).encode()
+
+
+def legacy_query_sku_info() -> bytes:
+    data = json.loads(REQUEST_BODY)
+    type_code = _legacy_get_type_code(data["skuType"])
+    sku_info = _LegacySkuInfo(type=str(type_code), **RAW_INFO).to_dict()
+    result = dict(sku_info)
+    # FastAPI 对没有 response_model 的返回值先执行 jsonable_encoder，再交给 JSONResponse
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def fast_query_sku_info() -> bytes:
+    data = fastjson.loads(REQUEST_BODY)
+    type_code = SkuType.get_type_code(data["skuType"])
+    sku_info = SkuInfo(type=str(type_code), **RAW_INFO).to_dict()
+    result = dict(sku_info)
+    return FastJSONResponse(result).body
+
+
+def measure(fn: Callable[[], object], seconds: float) -> float:
+    """在 seconds 秒 CPU 时间内反复执行 fn，返回每次的 CPU 微秒数"""
+    fn()
+    count, batch = 0, 1
+    start = time.process_time()
+    while True:
+        for _ in range(batch):
+            fn()
+        count += batch
+        elapsed = time.process_time() - start
+        if elapsed >= seconds:
+            return elapsed / count * 1e6
+        batch = min(batch * 2, 10000)
+
+
+def print_row(name: str, before_us: float, after_us: float) -> dict:
+    saved = before_us - after_us
+    print(f"{name:>28}: {before_us:>10.2f} us -> {after_us:>10.2f} us  "
+          f"节省 {saved:>10.2f} us ({saved / before_us:.0%})")
+    return {"name": name, "before_us": round(before_us, 3), "after_us": round(after_us, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口序列化 CPU 开销")
+    parser.add_argument("--products", type=int, default=2000, help="整类列表中的商品数量")
+    parser.add_argument("--page-size", type=int, default=50, help="分页接口每页的商品数量")
+    parser.add_argument("--seconds", type=float, default=0.5, help="每一项测量的 CPU 时间（秒）")
+    args = parser.parse_args()
+
+    print(f"JSON 编解码：{'orjson' if fastjson.orjson is not None else '标准库 json（未安装 orjson）'}")
+    products = [{"sku_name": f"{RAW_INFO['sku_name']} {i}", "price": 1999.0 + i} for i in range(args.products)]
+    page = {"items": [{"sku_code": str(100000 + i), **item} for i, item in enumerate(products[:args.page_size])],
+            "next_cursor": "WzIwNDguMCwgIjEwMDA0OSJd"}
+    cached_body = fastjson.dumps(products)
+
+    results: List[dict] = [
+        print_row("SkuType.get_type_code",
+                  measure(lambda: _legacy_get_type_code(SkuType.HDD.value), args.seconds),
+                  measure(lambda: SkuType.get_type_code(SkuType.HDD.value), args.seconds)),
+        print_row("SkuInfo + to_dict",
+                  measure(lambda: _LegacySkuInfo(type="1", **RAW_INFO).to_dict(), args.seconds),
+                  measure(lambda: SkuInfo(type="1", **RAW_INFO).to_dict(), args.seconds)),
+        print_row("querySkuInfo 每请求",
+                  measure(legacy_query_sku_info, args.seconds),
+                  measure(fast_query_sku_info, args.seconds)),
+        print_row(f"getProductList 分页 {args.page_size} 条",
+                  measure(lambda: JSONResponse(page).body, args.seconds),
+                  measure(lambda: FastJSONResponse(page).body, args.seconds)),
+        print_row(f"getProductList {args.products} 条",
+                  measure(lambda: JSONResponse(products).body, args.seconds),
+                  measure(lambda: fastjson.dumps(products), args.seconds)),
+        # 同一类型商品未变化时直接返回缓存的响应体
+        print_row(f"getProductList {args.products} 条(缓存)",
+                  measure(lambda: JSONResponse(products).body, args.seconds),
+                  measure(lambda: cached_body, args.seconds)),
+    ]
+    compressed = gzip.compress(cached_body, compresslevel=6)
+    print(f"整类列表响应体 {len(cached_body) / 1024:.1f} KB，gzip 后 {len(compressed) / 1024:.1f} KB "
+          f"({len(compressed) / len(cached_body):.0%})，压缩耗时 "
+          f"{measure(lambda: gzip.compress(cached_body, compresslevel=6), args.seconds) / 1000:.2f} ms（每个版本一次）")
+    return results
+
+
+if __name__ == '__main__':
+    main()
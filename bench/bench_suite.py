@@ -0,0 +1,290 @@
+"""
+端到端基准测试
+
+启动完整的 jdUtil + HTTP 服务，商品页由本地假京东（bench.fixtures）提供，数据库使用 SQLite（bench.sqlite_db），
+依次测量：
+    - 启动耗时：/healthz 与 /readyz 首次返回 200 的时间
+    - query_sku_info：直接调用抓取
+    - /v1/querySkuInfo：经过 HTTP、缓存、写入缓冲的完整查询（每个请求一个新商品，不命中缓存）
+    - /v1/getProductList：整类列表与分页
+结果写入 JSON 文件，--compare 与之前的结果对比，吞吐下降或 p99 上升超过 --tolerance 时以非 0 状态退出。
+
+用法（在项目根目录执行）：
+    python -m bench.bench_suite --skus 300 --concurrency 8
+    python -m bench.bench_suite --latency 0.05 --missing-price-every 20 --verify-every 50
+    python -m bench.bench_suite --browser          # 快速通道解析失败时回退到 Playwright，需要已安装 chromium
+    python -m bench.bench_suite --compare bench/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+
+from bench.bench_fast_path import print_result, run_load
+from bench.fixtures import FixtureServer
+from bench.sqlite_db import SqliteMysqlUtil
+from global_conf import global_vars
+from services.logger.logger import setup_logger
+
+DEFAULT_RESULTS_DIR = os.path.join("bench", "results")
+SKU_TYPE = "显卡"
+SKU_TYPE_CODE = "1"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def configure(item_url_template: str, browser: bool):
+    """只保留被测路径，后台刷新和历史压缩不参与测试"""
+    conf = global_vars.Conf
+    conf.scrape.ItemUrlTemplate = item_url_template
+    conf.scrape.EnableFastPath = True
+    conf.scrape.CrawlWorkers = 0
+    conf.scrape.LazyBrowser = not browser
+    conf.scrape.SessionProbeInterval = 0
+    conf.refresh.Enabled = False
+    conf.history.Enabled = False
+    conf.profile.Enabled = False
+
+
+class BenchBrowser:
+    """不登录的 headless Chromium，页面池直接访问假京东"""
+
+    def __init__(self, scraper, size: int):
+        self.scraper = scraper
+        self.size = size
+        self._playwright = None
+        self._browser = None
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+
+        from services.jdhelper.page_pool import PagePool
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        context = await self._browser.new_context()
+        self.scraper.page_pool = PagePool(context, size=self.size)
+        await self.scraper.page_pool.start()
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+
+def build_jd(mysql: SqliteMysqlUtil, port: int):
+    # api 与 jdUtil 互相导入，与 main.py 一样先导入 jdUtil
+    from jdUtil import CancellationContext, Options, jdUtil
+    from api import Api
+    from services.db.remote.mysqlutil import AsyncMysqlUtil
+
+    ctx = CancellationContext()
+    jd = jdUtil(ctx=ctx, cancel=ctx.cancel, opts=Options(http_addr=f"127.0.0.1:{port}"),
+                mysql=AsyncMysqlUtil(mysql))
+    jd.api = Api(jd)
+    return jd
+
+
+async def wait_ok(client: httpx.AsyncClient, path: str, start: float, timeout: float = 60) -> Optional[float]:
+    """轮询 path 直到返回 200，返回距 start 的秒数"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return round(time.perf_counter() - start, 3)
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.005)
+    return None
+
+
+async def main_async(args) -> dict:
+    results: List[dict] = []
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # 三组互不重叠的商品：数据库中已有的、直接抓取的、经 HTTP 查询的
+    listed_codes = [str(100000 + i) for i in range(args.products)]
+    scrape_codes = [str(200000 + i) for i in range(args.skus)]
+    http_codes = [str(300000 + i) for i in range(args.skus)]
+
+    fixture = FixtureServer(latency=args.latency, missing_price_every=args.missing_price_every,
+                            verify_every=args.verify_every, pages_dir=args.pages_dir,
+                            padding_kb=args.padding_kb)
+    with fixture:
+        configure(fixture.item_url_template, args.browser)
+        mysql = SqliteMysqlUtil()
+        mysql.seed(len(listed_codes), sku_type=SKU_TYPE_CODE, start=100000)
+
+        loop = asyncio.get_running_loop()
+        # 与 jdUtil.notify_quit 一样，HTTP 服务与抓取在同一个事件循环中运行
+        start = time.perf_counter()
+        jd = build_jd(mysql, port)
+        browser = BenchBrowser(jd.scraper, global_vars.Conf.scrape.PagePoolSize) if args.browser else None
+
+        async def start_browser():
+            if browser is not None:
+                await browser.start()
+
+        jd._start_browser = start_browser
+        jd.init_api()
+        # 逐条输出访问日志会占用事件循环，影响测量；uvicorn.Config 在创建时就已配置好日志，
+        # 这里与 access_log=False 时 uvicorn 的做法一样直接移除 access logger 的处理器
+        access_logger = logging.getLogger("uvicorn.access")
+        access_logger.handlers = []
+        access_logger.propagate = False
+        jd._event_loop = loop
+        server_task = asyncio.create_task(jd.http_srv.serve())
+        warm_up = asyncio.create_task(jd.warm_up())
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            startup = {
+                "healthz_s": await wait_ok(client, "/healthz", start),
+                "readyz_s": await wait_ok(client, "/readyz", start),
+            }
+            await warm_up
+            print(f"{'startup':>24}: /healthz {startup['healthz_s']} s  /readyz {startup['readyz_s']} s")
+
+            results.append(await run_load("query_sku_info", jd.query_sku_info, scrape_codes, args.concurrency))
+            print_result(results[-1])
+
+            async def query_http(sku_code: str):
+                response = await client.post("/v1/querySkuInfo", json={"skuCode": sku_code, "skuType": SKU_TYPE})
+                return response.json() if response.status_code == 200 else None
+
+            results.append(await run_load("/v1/querySkuInfo", query_http, http_codes, args.concurrency))
+            print_result(results[-1])
+
+            async def product_list(_):
+                response = await client.get("/v1/getProductList", params={"type": SKU_TYPE_CODE})
+                return response.content if response.status_code == 200 else None
+
+            async def product_page(_):
+                response = await client.get("/v1/getProductList", params={"type": SKU_TYPE_CODE, "limit": 50})
+                return response.content if response.status_code == 200 else None
+
+            requests = [str(i) for i in range(args.requests)]
+            # 商品列表读内存索引，不抓取商品，吞吐按请求数计
+            results.append(await run_load("/v1/getProductList", product_list, requests, args.concurrency,
+                                          unit="requests"))
+            print_result(results[-1])
+            results.append(await run_load("/v1/getProductList?limit", product_page, requests, args.concurrency,
+                                          unit="requests"))
+            print_result(results[-1])
+
+        jd.http_srv.should_exit = True
+        await server_task
+        await jd.api.sku_writer.close()
+        await jd.scraper.close()
+        if browser is not None:
+            await browser.close()
+        jd.mysql.close()
+
+    return {
+        "meta": {
+            "timestamp": int(time.time()),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "startup": startup,
+        "fixture_requests": fixture.requests,
+        "scraper": jd.scraper.stats(),
+        "results": results,
+    }
+
+
+def save_report(report: dict, out_dir: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    name = time.strftime("bench-%Y%m%d-%H%M%S.json", time.localtime(report["meta"]["timestamp"]))
+    path = os.path.join(out_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """返回超出容忍度的退化项"""
+    regressions = []
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    print(f"对比基线 {baseline['meta'].get('commit') or ''}（容忍 {tolerance:.0%}）")
+    for result in report["results"]:
+        base = previous.get(result["name"])
+        if base is None:
+            continue
+        throughput = f"{result.get('unit', 'scrapes')}_per_s"
+        for key, higher_is_better in ((throughput, True), ("p50_ms", False), ("p99_ms", False)):
+            old, new = base.get(key), result[key]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = " <- 退化" if worse > tolerance else ""
+            print(f"{result['name']:>24} {key:>14}: {old:>10} -> {new:>10} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{result['name']} {key}")
+    for key in ("healthz_s", "readyz_s"):
+        old, new = baseline.get("startup", {}).get(key), report["startup"].get(key)
+        if old and new is not None:
+            change = (new - old) / old
+            flag = " <- 退化" if change > tolerance else ""
+            print(f"{'startup':>24} {key:>14}: {old:>10} -> {new:>10} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"startup {key}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端基准测试")
+    parser.add_argument("--skus", type=int, default=300, help="query_sku_info 与 /v1/querySkuInfo 各请求的商品数量")
+    parser.add_argument("--products", type=int, default=2000, help="数据库中预置的商品数量")
+    parser.add_argument("--requests", type=int, default=500, help="/v1/getProductList 的请求次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--latency", type=float, default=0.0, help="假商品页的额外延迟（秒）")
+    parser.add_argument("--missing-price-every", type=int, default=0, help="每 N 个商品缺少价格节点")
+    parser.add_argument("--verify-every", type=int, default=0, help="每 N 个商品重定向到验证页")
+    parser.add_argument("--pages-dir", default="", help="录制的商品页目录（{sku_code}.html）")
+    parser.add_argument("--padding-kb", type=int, default=64, help="生成的商品页的填充大小（KB）")
+    parser.add_argument("--browser", action="store_true", help="启动 Playwright，快速通道失败时回退到浏览器")
+    parser.add_argument("--out", default=DEFAULT_RESULTS_DIR, help="结果 JSON 的保存目录")
+    parser.add_argument("--compare", default="", help="与之前保存的结果对比")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="对比时允许的退化比例")
+    args = parser.parse_args()
+
+    global_vars.Logger = setup_logger("bench", logging.WARNING)
+    report = asyncio.run(main_async(args))
+    print(f"结果已保存: {save_report(report, args.out)}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"性能退化: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+本地假京东商品页，供基准测试使用
+"""
+
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+ITEM_PATH_PATTERN = re.compile(r'^/(\w+)\.html$')
+# 与京东风控页地址中的关键字一致，快速通道据此判断被拦截
+VERIFY_PATH = "/risk_handler/verify"
+
+VERIFY_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="utf-8"><title>京东验证</title></head>
+<body><div class="verify-wrap">请完成安全验证</div></body>
+</html>
+"""
+
+ITEM_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="utf-8"><title>{sku_name}【行情 报价 价格 评测】-京东</title></head>
+<body>
+<div class="w">
+  <div class="itemInfo-wrap">
+    <div class="sku-name"><div class="sku-name-title">{sku_name}</div></div>
+    <div class="summary-price-wrap">
+      <div class="summary-price J-summary-price">
+        <div class="dt">京 东 价</div>
+        <div class="dd"><span class="p-price"><span>¥</span><span class="price">{price}</span></span></div>
+      </div>
+    </div>
+  </div>
+</div>
+{padding}
+</body>
+</html>
+"""
+
+BRANDS = ("七彩虹（Colorful）", "华硕（ASUS）", "微星（MSI）", "技嘉（GIGABYTE）", "影驰（GALAXY）")
+
+
+def fake_sku_name(sku_code: str) -> str:
+    brand = BRANDS[int(sku_code) % len(BRANDS)] if sku_code.isdigit() else BRANDS[0]
+    return f"{brand} GeForce RTX 4070 SUPER {sku_code} 12G 电竞游戏显卡"
+
+
+def fake_price(sku_code: str) -> str:
+    seed = int(sku_code) if sku_code.isdigit() else len(sku_code)
+    return f"{1999 + seed % 3000}.00"
+
+
+def render_item_page(sku_code: str, with_price: bool = True, padding_kb: int = 64) -> str:
+    """
+    生成商品页 HTML
+
+    Args:
+        sku_code: 商品编码
+        with_price: 为 False 时不输出价格节点，模拟价格异步渲染或商品下架
+        padding_kb: 追加的无关内容大小，模拟真实页面体积
+    """
+    html = ITEM_PAGE_TEMPLATE.format(
+        sku_name=fake_sku_name(sku_code),
+        price=fake_price(sku_code),
+        padding="<!-- " + "x" * (padding_kb * 1024) + " -->" if padding_kb else "",
+    )
+    if not with_price:
+        html = re.sub(r'<span class="price">[^<]*</span>', '', html)
+    return html
+
+
+class FixtureServer:
+    """
+    在后台线程中运行的商品页服务
+
+    Args:
+        latency: 每个请求额外增加的延迟（秒）
+        missing_price_every: 每 N 个商品缺少价格节点，0 表示不缺失
+        verify_every: 每 N 个商品重定向到验证页，0 表示不出现
+        pages_dir: 录制的商品页目录，存在 {sku_code}.html 时直接返回该文件，否则返回生成的页面
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, missing_price_every: int = 0, padding_kb: int = 64,
+                 verify_every: int = 0, pages_dir: str = ""):
+        self.latency = latency
+        self.missing_price_every = missing_price_every
+        self.verify_every = verify_every
+        self.pages_dir = pages_dir
+        self.padding_kb = padding_kb
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests += 1
+                if self.path.startswith(VERIFY_PATH):
+                    self._send_html(VERIFY_PAGE.encode("utf-8"))
+                    return
+                match = ITEM_PATH_PATTERN.match(self.path)
+                if not match:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                sku_code = match.group(1)
+                if server._every(sku_code, server.verify_every):
+                    self.send_response(302)
+                    self.send_header("Location", f"{VERIFY_PATH}?returnUrl={sku_code}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = server._recorded_page(sku_code)
+                if body is None:
+                    with_price = not server._every(sku_code, server.missing_price_every)
+                    body = render_item_page(sku_code, with_price, server.padding_kb).encode("utf-8")
+                self._send_html(body)
+
+            def _send_html(self, body: bytes):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def _every(sku_code: str, n: int) -> bool:
+        return bool(n) and sku_code.isdigit() and int(sku_code) % n == 0
+
+    def _recorded_page(self, sku_code: str) -> Optional[bytes]:
+        if not self.pages_dir:
+            return None
+        try:
+            with open(os.path.join(self.pages_dir, f"{sku_code}.html"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @property
+    def item_url_template(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/{{sku_code}}.html"
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,301 @@
+"""
+多节点抓取租约的 MySQL 集成检查
+
+CrawlLeaseCoordinator 依赖 MySQL 8.0 的 SELECT ... FOR UPDATE SKIP LOCKED，SQLite 无法模拟，
+这里连接一个本地 MySQL，在单独的数据库中建表后依次检查：
+    - seed：jd_products_info 中的商品登记到 jd_crawl_lease
+    - 并发领取：两个节点同时领取，结果互不重叠且覆盖全部到期商品
+    - SKIP LOCKED：其他事务锁住的行被跳过，领取不等待锁
+    - 续租：heartbeat 延长 lease_until，返回仍持有的商品
+    - 接手：节点失联（租约过期）后另一个节点领取到它的商品，原节点续租与完成都失败
+    - complete/release：释放租约并设置下次抓取时间，release 保留 attempts
+    - LeaseCrawler：续租时发现租约被接手，取消进行中的抓取，不覆盖对方的租约
+
+数据库连接沿用 services.db.remote.config 的环境变量（JD_DB_HOST、JD_DB_PORT、JD_DB_USER、JD_DB_PASSWORD），
+--database 指定的数据库不存在时自动创建，其中的 jd_products_info 与 jd_crawl_lease 会被清空。
+
+用法（在项目根目录执行）：
+    JD_DB_HOST=127.0.0.1 JD_DB_PORT=3306 JD_DB_USER=root JD_DB_PASSWORD=... \\
+        python -m bench.lease_harness --database db_jd_lease_test
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, List
+
+import pymysql
+
+from global_conf import global_vars
+from services.db.remote.config import DB_CONFIG, get_db_config
+from services.db.remote.crawl_lease import CrawlLeaseCoordinator
+from services.db.remote.mysqlutil import AsyncMysqlUtil, MysqlUtil
+from services.logger.logger import setup_logger
+from services.scheduler.lease_crawler import LeaseCrawler
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "services", "db", "remote", "schema.sql")
+
+PRODUCTS_DDL = """
+CREATE TABLE IF NOT EXISTS jd_products_info (
+    sku_code       VARCHAR(64)   NOT NULL,
+    sku_name       VARCHAR(512)  NOT NULL DEFAULT '',
+    price          DECIMAL(10,2) NOT NULL DEFAULT 0,
+    url            VARCHAR(512)  NOT NULL DEFAULT '',
+    brand          VARCHAR(128)  NOT NULL DEFAULT '',
+    type           VARCHAR(16)   NOT NULL DEFAULT '',
+    is_taken_down  TINYINT       NOT NULL DEFAULT 0,
+    isdel          TINYINT       NOT NULL DEFAULT 0,
+    create_time    INT           NOT NULL DEFAULT 0,
+    update_time    INT           NOT NULL DEFAULT 0,
+    fingerprint    VARCHAR(64)   NOT NULL DEFAULT '',
+    last_seen_time INT           NOT NULL DEFAULT 0,
+    PRIMARY KEY (sku_code)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4
+"""
+
+
+def lease_ddl() -> str:
+    """从 schema.sql 中取出 jd_crawl_lease 的建表语句，与线上保持一致"""
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        statements = f.read().split(";")
+    for statement in statements:
+        lines = [line for line in statement.splitlines() if not line.strip().startswith("--")]
+        sql = "\n".join(lines).strip()
+        if sql.startswith("CREATE TABLE IF NOT EXISTS jd_crawl_lease"):
+            return sql
+    raise RuntimeError(f"{SCHEMA_PATH} 中没有 jd_crawl_lease 的建表语句")
+
+
+class Harness:
+    def __init__(self, db_config: dict, products: int, lease_seconds: int):
+        self.db_config = db_config
+        self.products = products
+        self.lease_seconds = lease_seconds
+        pool_config = {"max_size": 4, "acquire_timeout": 10, "read_timeout": 30, "write_timeout": 30}
+        self.mysql_a = MysqlUtil(db_config, pool_config)
+        self.mysql_b = MysqlUtil(db_config, pool_config)
+        self.node_a = CrawlLeaseCoordinator(self.mysql_a, node_id="harness-a", lease_seconds=lease_seconds)
+        self.node_b = CrawlLeaseCoordinator(self.mysql_b, node_id="harness-b", lease_seconds=lease_seconds)
+        self.failures: List[str] = []
+
+    # ---- 工具 ----
+
+    def execute(self, sql: str, params=None):
+        with self.mysql_a.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def lease_rows(self) -> dict:
+        rows = self.execute("SELECT sku_code, owner, lease_until, next_crawl_at, attempts, "
+                            "UNIX_TIMESTAMP() AS now FROM jd_crawl_lease")
+        return {row['sku_code']: row for row in rows}
+
+    def check(self, name: str, ok: bool, detail: str = ""):
+        print(f"{'PASS' if ok else 'FAIL'} {name}{f'  ({detail})' if detail else ''}")
+        if not ok:
+            self.failures.append(name)
+
+    def reset(self):
+        with self.mysql_a.transaction() as cursor:
+            cursor.execute(PRODUCTS_DDL)
+            cursor.execute(lease_ddl())
+            cursor.execute("DELETE FROM jd_crawl_lease")
+            cursor.execute("DELETE FROM jd_products_info")
+            now = int(time.time())
+            cursor.executemany(
+                "INSERT INTO jd_products_info (sku_code, sku_name, price, type, create_time, update_time, "
+                "last_seen_time) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [(str(100000 + i), f"商品 {i}", 100 + i, "1", now, now, now) for i in range(self.products)],
+            )
+
+    # ---- 检查项 ----
+
+    def check_seed(self):
+        # first_interval 为负数：登记后立即到期
+        added = self.node_a.seed(-60)
+        self.check("seed 登记全部商品", added == self.products, f"{added}/{self.products}")
+        again = self.node_b.seed(-60)
+        self.check("seed 重复执行不新增", again == 0, f"新增 {again}")
+
+    def check_concurrent_claims(self) -> dict:
+        barrier = threading.Barrier(2)
+        claimed = {"harness-a": [], "harness-b": []}
+        errors = []
+
+        def worker(node: CrawlLeaseCoordinator):
+            try:
+                barrier.wait()
+                while True:
+                    rows = node.claim(7)
+                    if not rows:
+                        return
+                    claimed[node.node_id].extend(row['sku_code'] for row in rows)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(node,)) for node in (self.node_a, self.node_b)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        a, b = set(claimed["harness-a"]), set(claimed["harness-b"])
+        self.check("并发领取无异常", not errors, repr(errors[:1]))
+        self.check("并发领取互不重叠", not (a & b), f"重叠 {len(a & b)}")
+        self.check("并发领取覆盖全部商品", len(a | b) == self.products, f"A {len(a)} B {len(b)}")
+        rows = self.lease_rows()
+        owners_ok = all(rows[code]['owner'] == "harness-a" for code in a) and \
+            all(rows[code]['owner'] == "harness-b" for code in b)
+        self.check("领取后 owner 与领取方一致", owners_ok)
+        return {"a": sorted(a), "b": sorted(b)}
+
+    def check_skip_locked(self):
+        self.execute("UPDATE jd_crawl_lease SET owner = NULL, lease_until = 0, "
+                     "next_crawl_at = UNIX_TIMESTAMP() - 60")
+        locked = sorted(self.lease_rows())[:3]
+        placeholders = ", ".join(["%s"] * len(locked))
+        # 另一个事务锁住 3 行且不提交，领取应跳过它们，而不是等待 innodb_lock_wait_timeout
+        with self.mysql_a.pool.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"SELECT sku_code FROM jd_crawl_lease WHERE sku_code IN ({placeholders}) "
+                                   "FOR UPDATE", locked)
+                start = time.monotonic()
+                rows = self.node_b.claim(self.products)
+                elapsed = time.monotonic() - start
+            finally:
+                conn.rollback()
+        got = {row['sku_code'] for row in rows}
+        self.check("SKIP LOCKED 跳过被锁的行", not (got & set(locked)), f"拿到 {sorted(got & set(locked))}")
+        self.check("SKIP LOCKED 领取其余的行", len(got) == self.products - len(locked), f"{len(got)}")
+        self.check("SKIP LOCKED 不等待锁", elapsed < 2, f"{elapsed:.2f}s")
+
+    def check_heartbeat(self):
+        codes = [code for code, row in self.lease_rows().items() if row['owner'] == "harness-b"][:5]
+        self.execute("UPDATE jd_crawl_lease SET lease_until = UNIX_TIMESTAMP() + 5 WHERE owner = 'harness-b'")
+        renewed = self.node_b.heartbeat(codes)
+        self.check("续租返回全部持有的商品", sorted(renewed) == sorted(codes), f"{len(renewed)}/{len(codes)}")
+        rows = self.lease_rows()
+        extended = all(rows[code]['lease_until'] >= rows[code]['now'] + self.lease_seconds - 1 for code in codes)
+        self.check("续租延长 lease_until", extended)
+        # 同一秒内再续一次，rowcount 为 0 也不能误判为丢失
+        again = self.node_b.heartbeat(codes)
+        self.check("同一秒内重复续租", len(again) == len(codes), f"{len(again)}/{len(codes)}")
+
+    def check_reclaim(self):
+        self.execute("UPDATE jd_crawl_lease SET owner = NULL, lease_until = 0, "
+                     "next_crawl_at = UNIX_TIMESTAMP() - 60")
+        held = [row['sku_code'] for row in self.node_a.claim(5)]
+        # 模拟节点 A 失联：租约过期但 owner 仍是 A
+        self.execute("UPDATE jd_crawl_lease SET lease_until = UNIX_TIMESTAMP() - 1 WHERE owner = 'harness-a'")
+        reclaimed_before = self.node_b.reclaimed
+        taken = {row['sku_code'] for row in self.node_b.claim(self.products)}
+        self.check("接手过期租约", set(held) <= taken, f"{len(set(held) & taken)}/{len(held)}")
+        self.check("接手计数", self.node_b.reclaimed - reclaimed_before == len(held),
+                   f"{self.node_b.reclaimed - reclaimed_before}")
+        renewed = self.node_a.heartbeat(held)
+        self.check("原节点续租失败", renewed == [], f"仍持有 {renewed}")
+        self.check("原节点 complete 失败", self.node_a.complete(held[0], 3600) is False)
+        self.check("原节点不覆盖接手方的租约", self.lease_rows()[held[0]]['owner'] == "harness-b")
+
+    def check_complete_release(self):
+        rows = self.lease_rows()
+        codes = [code for code, row in rows.items() if row['owner'] == "harness-b"][:2]
+        self.check("complete 成功", self.node_b.complete(codes[0], 3600) is True)
+        self.check("release 成功", self.node_b.release(codes[1], 60) is True)
+        after = self.lease_rows()
+        done, failed = after[codes[0]], after[codes[1]]
+        self.check("complete 清空 owner 并重置 attempts",
+                   done['owner'] is None and done['lease_until'] == 0 and done['attempts'] == 0)
+        self.check("complete 设置下次抓取时间", done['next_crawl_at'] >= done['now'] + 3599)
+        self.check("release 保留 attempts", failed['owner'] is None and failed['attempts'] == rows[codes[1]]['attempts'])
+        self.check("release 设置重试时间", failed['next_crawl_at'] >= failed['now'] + 59)
+
+    async def check_crawler_cancel(self):
+        self.execute("UPDATE jd_crawl_lease SET owner = NULL, lease_until = 0, attempts = 0, "
+                     "next_crawl_at = UNIX_TIMESTAMP() + 3600")
+        sku_code = sorted(self.lease_rows())[0]
+        self.execute("UPDATE jd_crawl_lease SET next_crawl_at = UNIX_TIMESTAMP() - 1 WHERE sku_code = %s",
+                     (sku_code,))
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def refresh(code: str, sku_type: int):
+            started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        mysql = AsyncMysqlUtil(self.mysql_a)
+        crawler = LeaseCrawler(mysql, self.node_a, refresh, lambda code: 3600,
+                               concurrency=1, rate=10, burst=1, heartbeat_interval=1, idle_interval=0.2,
+                               reseed_interval=3600, first_interval=3600)
+        crawler.start()
+        try:
+            await asyncio.wait_for(started.wait(), 10)
+            # 其他节点接手了这个商品
+            self.execute("UPDATE jd_crawl_lease SET owner = 'harness-thief', lease_until = UNIX_TIMESTAMP() + 600 "
+                         "WHERE sku_code = %s", (sku_code,))
+            try:
+                await asyncio.wait_for(cancelled.wait(), 5)
+            except asyncio.TimeoutError:
+                pass
+            self.check("租约丢失后取消抓取", cancelled.is_set())
+            self.check("取消计数", crawler.cancelled == 1, f"{crawler.cancelled}")
+        finally:
+            await crawler.stop()
+        row = self.lease_rows()[sku_code]
+        self.check("取消后不覆盖接手方的租约", row['owner'] == "harness-thief", f"owner={row['owner']}")
+
+    def run(self) -> bool:
+        steps: List[Callable] = [self.check_seed, self.check_concurrent_claims, self.check_skip_locked,
+                                 self.check_heartbeat, self.check_reclaim, self.check_complete_release]
+        self.reset()
+        try:
+            for step in steps:
+                step()
+            asyncio.run(self.check_crawler_cancel())
+        finally:
+            self.mysql_a.close()
+            self.mysql_b.close()
+        print(f"{len(self.failures)} 项失败" if self.failures else "全部通过")
+        return not self.failures
+
+
+def ensure_database(db_config: dict):
+    server = {key: value for key, value in db_config.items() if key != "database"}
+    conn = pymysql.connect(**server)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db_config['database']}` DEFAULT CHARSET utf8mb4")
+            cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    if int(version.split(".")[0]) < 8:
+        raise SystemExit(f"需要 MySQL 8.0+（SKIP LOCKED），当前 {version}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多节点抓取租约的 MySQL 集成检查")
+    parser.add_argument("--database", required=True, help="检查使用的数据库，其中的商品表和租约表会被清空")
+    parser.add_argument("--products", type=int, default=50, help="登记的商品数量")
+    parser.add_argument("--lease-seconds", type=int, default=30, help="租约时长（秒）")
+    args = parser.parse_args()
+    if args.database == DB_CONFIG["database"]:
+        raise SystemExit(f"不能使用业务数据库 {args.database}，请指定单独的测试数据库")
+
+    global_vars.Logger = setup_logger("lease_harness", logging.WARNING)
+    db_config = {**get_db_config(), "database": args.database}
+    ensure_database(db_config)
+    ok = Harness(db_config, args.products, args.lease_seconds).run()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+基准测试使用的 SQLite 数据库
+
+SqliteMysqlUtil 继承 MysqlUtil，只替换连接池，MysqlUtil 的各个方法（包括 SQL 语句和 @timed 统计）原样执行，
+SQL 中 MySQL 特有的语法在游标中转换为 SQLite 语法。数据库文件放在临时目录，不需要 MySQL 服务。
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from services.db.remote.mysqlutil import MysqlUtil
+from services.db.remote.pool import PoolTimeoutError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jd_products_info (
+    sku_code       TEXT    NOT NULL PRIMARY KEY,
+    sku_name       TEXT    NOT NULL DEFAULT '',
+    price          REAL    NOT NULL DEFAULT 0,
+    url            TEXT    NOT NULL DEFAULT '',
+    brand          TEXT    NOT NULL DEFAULT '',
+    type           TEXT    NOT NULL DEFAULT '',
+    is_taken_down  INTEGER NOT NULL DEFAULT 0,
+    isdel          INTEGER NOT NULL DEFAULT 0,
+    create_time    INTEGER NOT NULL DEFAULT 0,
+    update_time    INTEGER NOT NULL DEFAULT 0,
+    fingerprint    TEXT    NOT NULL DEFAULT '',
+    last_seen_time INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_type_isdel_price_sku ON jd_products_info (type, isdel, price, sku_code);
+CREATE TABLE IF NOT EXISTS jd_price_history (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    sku_code      TEXT    NOT NULL,
+    ts            INTEGER NOT NULL,
+    price         REAL    NOT NULL DEFAULT 0,
+    is_taken_down INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sku_ts ON jd_price_history (sku_code, ts);
+CREATE TABLE IF NOT EXISTS jd_price_history_block (
+    sku_code    TEXT    NOT NULL,
+    start_ts    INTEGER NOT NULL,
+    end_ts      INTEGER NOT NULL,
+    point_count INTEGER NOT NULL,
+    data        BLOB    NOT NULL,
+    PRIMARY KEY (sku_code, start_ts)
+);
+"""
+
+_VALUES_FN = re.compile(r"VALUES\((\w+)\)")
+
+
+def translate_sql(sql: str) -> str:
+    """把项目中用到的 MySQL 语法转换为 SQLite 语法"""
+    sql = sql.replace("%s", "?")
+    sql = sql.replace("INSERT IGNORE", "INSERT OR IGNORE")
+    sql = sql.replace(" FOR UPDATE SKIP LOCKED", "").replace(" FOR UPDATE", "")
+    sql = sql.replace("UNIX_TIMESTAMP()", "CAST(strftime('%s', 'now') AS INTEGER)")
+    sql = sql.replace("GREATEST(", "MAX(").replace("IFNULL(", "COALESCE(")
+    if "ON DUPLICATE KEY UPDATE" in sql:
+        head, update = sql.split("ON DUPLICATE KEY UPDATE", 1)
+        sql = head + "ON CONFLICT DO UPDATE SET " + _VALUES_FN.sub(r"excluded.\1", update)
+    return sql
+
+
+class _Cursor:
+    """pymysql DictCursor 的子集"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(translate_sql(sql), tuple(params or ()))
+        self.rowcount = self._cursor.rowcount
+
+    def executemany(self, sql, params_list: Iterable):
+        self._cursor.executemany(translate_sql(sql), [tuple(params) for params in params_list])
+        self.rowcount = self._cursor.rowcount
+
+    def fetchone(self) -> Optional[dict]:
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self) -> list:
+        return [dict(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Connection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+    def cursor(self) -> _Cursor:
+        return _Cursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SqlitePool:
+    """与 ConnectionPool 接口一致：connection()、stats()、close()、max_size"""
+
+    def __init__(self, path: str, max_size: int = 8, acquire_timeout: float = 10):
+        self.path = path
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.created = 0
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeoutError(f"等待数据库连接超时（{self.acquire_timeout}s）")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = _Connection(self.path)
+            with self._lock:
+                self.created += 1
+        with self._lock:
+            self.in_use += 1
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._idle.put(conn)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "idle": self._idle.qsize(),
+            "in_use": self.in_use,
+            "created": self.created,
+            "recycled": 0,
+            "broken": 0,
+        }
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SqliteMysqlUtil(MysqlUtil):
+    """
+    用 SQLite 文件代替 MySQL 的 MysqlUtil
+
+    Args:
+        path: 数据库文件路径，为空时在临时目录中创建
+        max_size: 连接数，与 POOL_CONFIG 中的 max_size 含义相同
+    """
+
+    def __init__(self, path: str = "", max_size: int = 8):
+        if not path:
+            path = os.path.join(tempfile.mkdtemp(prefix="openpc-bench-"), "jd.sqlite3")
+        self.DB_CONFIG = {"database": path}
+        self.pool = SqlitePool(path, max_size=max_size)
+        with self.pool.connection() as conn:
+            conn._conn.execute("PRAGMA journal_mode=WAL")
+            conn._conn.executescript(SCHEMA)
+
+    def seed(self, count: int, sku_type: str = "1", start: int = 100000) -> list:
+        """写入 count 个商品，返回商品编码"""
+        now = int(time.time())
+        sku_codes = [str(start + i) for i in range(count)]
+        self.sql_executemany(
+            "INSERT INTO jd_products_info (sku_code, sku_name, price, type, create_time, update_time) "
+            "VALUES (%s, %s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE sku_name=VALUES(sku_name), price=VALUES(price)",
+            [(sku_code, f"商品 {sku_code}", 1999 + int(sku_code) % 3000, sku_type, now, now)
+             for sku_code in sku_codes],
+            raise_on_error=True,
+        )
+        return sku_codes
@@ -0,0 +1,59 @@
+"""
+JSON 编解码
+
+已安装 orjson 时使用 orjson，否则回退到标准库 json。两种实现输出相同格式：UTF-8 bytes、不转义中文、没有多余空格。
+接口返回 FastJSONResponse 时跳过 FastAPI 的 jsonable_encoder，直接序列化。
+"""
+
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any):
+    # pymysql 把 DECIMAL 列读为 Decimal
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default)
+
+    def dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def read_json(request: Request) -> dict:
+    """读取请求体，格式错误或不是 JSON 对象时返回 400"""
+    try:
+        data = loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON body: expected an object")
+    return data
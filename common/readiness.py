@@ -0,0 +1,97 @@
+"""
+启动就绪状态
+
+HTTP 服务先于浏览器和数据库启动，各组件在后台初始化，通过 /readyz 查询是否已可以处理请求。
+"""
+
+import threading
+import time
+from typing import Awaitable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+PENDING = "pending"
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Component:
+    __slots__ = ("name", "required", "state", "started_at", "finished_at", "error")
+
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.state = PENDING
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error = ""
+
+    def to_dict(self) -> dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        return {
+            "state": self.state,
+            "required": self.required,
+            "elapsed_seconds": elapsed,
+            "error": self.error,
+        }
+
+
+class Readiness:
+    """
+    记录各组件的初始化状态
+
+    required 为 False 的组件（例如按需启动的浏览器）不影响 is_ready。
+    读写都加锁，可以在事件循环之外的线程中读取。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, _Component] = {}
+        self._created_at = time.monotonic()
+
+    def register(self, name: str, required: bool = True):
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = _Component(name, required)
+
+    async def track(self, name: str, awaitable: Awaitable[T]) -> T:
+        """等待 awaitable 并记录耗时和结果，失败时记录错误后原样抛出"""
+        self.register(name)
+        component = self._components[name]
+        with self._lock:
+            component.state = STARTING
+            component.started_at = time.monotonic()
+            component.finished_at = None
+            component.error = ""
+        try:
+            result = await awaitable
+        except BaseException as e:
+            with self._lock:
+                component.state = FAILED
+                component.finished_at = time.monotonic()
+                component.error = f"{type(e).__name__}: {e}"
+            raise
+        with self._lock:
+            component.state = READY
+            component.finished_at = time.monotonic()
+        return result
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            component = self._components.get(name)
+            return component.state if component is not None else PENDING
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(c.state == READY for c in self._components.values() if c.required)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ready": all(c.state == READY for c in self._components.values() if c.required),
+                "uptime_seconds": round(time.monotonic() - self._created_at, 3),
+                "components": {name: c.to_dict() for name, c in self._components.items()},
+            }
@@ -0,0 +1,264 @@
+"""
+异步重试与熔断
+
+- RetryPolicy: 重试次数、指数退避与随机抖动，等待使用 asyncio.sleep，不阻塞事件循环
+- RetryBudget: 重试预算，限制重试占正常调用的比例，防止故障时重试风暴
+- CircuitBreaker: 按 host 熔断，连续失败达到阈值后在一段时间内直接拒绝请求
+"""
+
+import asyncio
+import inspect
+import random
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+import services.logger.logger as logger
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态时抛出的异常"""
+
+    def __init__(self, key: str, retry_after: float):
+        self.key = key
+        self.retry_after = retry_after
+        super().__init__(f"Circuit open for {key}, retry after {retry_after:.1f}s")
+
+
+class RetryBudget:
+    """
+    重试预算（令牌桶）
+
+    每次调用存入 ratio 个令牌，每次重试消耗 1 个令牌，令牌不足时放弃重试直接抛出异常。
+    例如 ratio=0.2 表示长期来看重试次数不超过正常调用次数的 20%。
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - closed: 正常放行，连续失败 failure_threshold 次后进入 open
+    - open: 拒绝所有调用，reset_timeout 秒后进入 half_open
+    - half_open: 只放行一个探测调用，成功则 closed，失败则重新 open；探测被取消时允许下一个调用重新探测
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, key: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """调用前检查，熔断时抛出 CircuitOpenError，本次调用是半开状态的探测调用时返回 True"""
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.key, self.reset_timeout - elapsed)
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(self.key, self.reset_timeout)
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.key} 连续失败 {self.failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def abort_probe(self):
+        """探测调用没有结果（被取消）时结束探测，保持 half_open，下一个调用重新探测"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+
+class CircuitBreakerRegistry:
+    """按 key（通常是 host）维护熔断器"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(key, self.failure_threshold, self.reset_timeout)
+                self._breakers[key] = breaker
+            return breaker
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {key: breaker.state for key, breaker in self._breakers.items()}
+
+
+# 全局的按 host 熔断器
+host_breakers = CircuitBreakerRegistry()
+
+
+def host_of(url: str) -> str:
+    """从 URL 中取出 host 作为熔断 key"""
+    return urlparse(url).netloc or url
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    重试策略
+
+    - max_retries: 最大尝试次数（含第一次调用），与 sync_retry 保持一致
+    - retry_delay: 初始延迟时间（秒）
+    - backoff_factor: 退避系数（指数退避）
+    - max_delay: 单次等待的上限（秒）
+    - jitter: 随机抖动比例，实际等待时间在 [wait, wait * (1 + jitter)] 之间
+    - exceptions: 需要重试的异常类型元组
+    - budget: 重试预算，为 None 时不限制
+    """
+    max_retries: int = 3
+    retry_delay: float = 1.0
+    backoff_factor: float = 2.0
+    max_delay: float = 30.0
+    jitter: float = 0.5
+    exceptions: Tuple[Type[BaseException], ...] = (Exception,)
+    budget: Optional[RetryBudget] = None
+
+    def backoff(self, retries: int) -> float:
+        """计算第 retries 次重试前的等待时间"""
+        wait_time = min(self.max_delay, self.retry_delay * (self.backoff_factor ** (retries - 1)))
+        return wait_time + random.uniform(0, wait_time * self.jitter)
+
+
+async def call_with_retry(func: Callable, *args,
+                          policy: RetryPolicy = RetryPolicy(),
+                          breaker: Optional[CircuitBreaker] = None,
+                          **kwargs):
+    """
+    按重试策略调用协程函数
+
+    Args:
+        func: 协程函数
+        policy: 重试策略
+        breaker: 熔断器，只有 policy.exceptions 中的异常会计入失败；
+            半开状态的探测调用抛出其他异常时也按探测失败处理，被取消时结束探测，避免熔断器一直停在探测中
+    """
+    name = getattr(func, "__qualname__", repr(func))
+    retries = 0
+    if policy.budget is not None:
+        policy.budget.deposit()
+    while True:
+        probe = breaker.before_call() if breaker is not None else False
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            if probe:
+                breaker.abort_probe()
+            raise
+        except policy.exceptions as e:
+            if breaker is not None:
+                breaker.record_failure()
+            retries += 1
+            if retries >= policy.max_retries:
+                raise
+            if breaker is not None and breaker.state == CircuitBreaker.OPEN:
+                # 本次失败触发了熔断，重试也会被拒绝，直接抛出原始异常
+                raise
+            if policy.budget is not None and not policy.budget.withdraw():
+                logger.warning(f"Func {name} 重试预算已耗尽，不再重试")
+                raise
+            wait_time = policy.backoff(retries)
+            logger.warning(f"Func {name} failed ({e})，{wait_time:.1f}秒后重试 ({retries}/{policy.max_retries})......")
+            await asyncio.sleep(wait_time)
+        except BaseException:
+            if probe:
+                breaker.record_failure()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+def async_retry(policy: Optional[RetryPolicy] = None,
+                breaker_arg: Optional[str] = None,
+                breakers: CircuitBreakerRegistry = host_breakers,
+                **policy_kwargs):
+    """
+    协程重试装饰器
+
+    Args:
+        policy: 重试策略，为 None 时由 policy_kwargs 构造
+        breaker_arg: 保存 URL 的参数名，指定后按该 URL 的 host 熔断
+        breakers: 熔断器注册表
+    """
+    if policy is None:
+        policy = RetryPolicy(**policy_kwargs)
+
+    def decorator(func):
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"async_retry can only wrap coroutine functions, got {func!r}")
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            breaker = None
+            if breaker_arg is not None:
+                url = signature.bind_partial(*args, **kwargs).arguments.get(breaker_arg)
+                if url:
+                    breaker = breakers.get(host_of(str(url)))
+            return await call_with_retry(func, *args, policy=policy, breaker=breaker, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,8 @@
 import time
 import random
+import inspect
+import base64
+import json
 from functools import wraps
 from typing import Optional, Union, List, Dict
 from urllib.parse import urlparse, parse_qs, unquote
@@ -54,9 +57,17 @@ def sync_retry(max_retries=3, retry_delay=2, backoff_factor=2, exceptions=(Excep
     - retry_delay: 初始延迟时间（秒）
     - backoff_factor: 退避系数（指数退避）
     - exceptions: 需要重试的异常类型元组
+
+    修饰协程函数时交给 common.retry.async_retry 处理，
+    否则只能捕获创建协程对象时的异常，并且 time.sleep 会阻塞事件循环
     """
 
     def decorator(func):  # 装饰器工厂函数，接收外部参数（如重试次数）
+        if inspect.iscoroutinefunction(func):
+            from common.retry import async_retry
+            return async_retry(max_retries=max_retries, retry_delay=retry_delay,
+                               backoff_factor=backoff_factor, exceptions=exceptions)(func)
+
         @wraps(func)  # 保留原函数元信息（__name__、__doc__）
         def wrapper(*args, **kwargs):  # 包装函数，实际执行时替换原函数
             retries = 0
@@ -81,6 +92,44 @@ def sync_retry(max_retries=3, retry_delay=2, backoff_factor=2, exceptions=(Excep
     return decorator
 
 
+def percentile(samples, pct: float) -> float:
+    """
+    计算分位数（最近秩法）
+
+    Args:
+        samples: 样本序列
+        pct: 分位，例如 50、99
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def encode_cursor(values: list) -> str:
+    """把分页游标（如 [price, sku_code]）编码为 URL 安全的字符串"""
+    raw = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    解码 encode_cursor 生成的游标
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
 def progress_bar(progress, total, bar_length=30):
     """
     显示进度条
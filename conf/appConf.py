@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import List
 
 from pydantic import BaseModel, Field
 
@@ -8,6 +9,17 @@ class Mode(str, Enum):
 
 class LogConf(BaseModel):
     Level: str = Field(default="info", json_schema_extra={"env": "logLevel"})
+    # 每行输出一个 JSON 对象，便于日志系统采集
+    Json: bool = Field(default=False, json_schema_extra={"env": "logJson"})
+    Console: bool = Field(default=True)
+    Dir: str = Field(default="logs")
+    QueueSize: int = Field(default=10000)
+    BatchSize: int = Field(default=256)
+    # 日志文件轮转：按大小（字节，0 表示不限）和/或时间（midnight、hourly、空字符串）
+    MaxBytes: int = Field(default=50 * 1024 * 1024)
+    RotateWhen: str = Field(default="midnight")
+    BackupCount: int = Field(default=14)
+    Compress: bool = Field(default=True)
 
 class BuffApi(BaseModel):
     Url: str = Field(default="https://k2-api.buffge.com:40012/prod/lol", json_schema_extra={"env": "buffApiUrl"})
@@ -16,6 +28,120 @@ class BuffApi(BaseModel):
 class WebViewConf(BaseModel):
     IndexUrl: str = Field(default="http://localhost:5173")
 
+class HttpConf(BaseModel):
+    # 响应体不小于 GzipMinSize 字节且客户端支持时 gzip 压缩；0 表示不压缩
+    GzipMinSize: int = Field(default=1024, json_schema_extra={"env": "gzipMinSize"})
+    GzipLevel: int = Field(default=6)
+
+class ScrapeConf(BaseModel):
+    ItemUrlTemplate: str = Field(default="https://item.jd.com/{sku_code}.html")
+    PagePoolSize: int = Field(default=4, json_schema_extra={"env": "pagePoolSize"})
+    PageHealthCheckTimeout: float = Field(default=3.0)
+    BatchConcurrency: int = Field(default=4)
+    BatchMaxConcurrency: int = Field(default=16)
+    BatchMaxSkus: int = Field(default=500)
+    EnableFastPath: bool = Field(default=True, json_schema_extra={"env": "enableFastPath"})
+    FastPathTimeout: float = Field(default=5.0)
+    FastPathMaxConnections: int = Field(default=20)
+    EnableRequestFilter: bool = Field(default=True, json_schema_extra={"env": "enableRequestFilter"})
+    BlockResourceTypes: List[str] = Field(default_factory=lambda: ["image", "media", "font", "stylesheet"])
+    AllowDomains: List[str] = Field(default_factory=lambda: ["jd.com", "3.cn", "360buyimg.com", "jd.hk"])
+    DenyDomains: List[str] = Field(default_factory=lambda: [
+        "mercury.jd.com", "wl.jd.com", "hm.baidu.com",
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    ])
+    # 抓取进程数，0 表示在 API 进程内抓取
+    CrawlWorkers: int = Field(default=0, json_schema_extra={"env": "crawlWorkers"})
+    CrawlJobTimeout: float = Field(default=60.0)
+    CrawlHeartbeatInterval: float = Field(default=5.0)
+    CrawlHeartbeatTimeout: float = Field(default=30.0)
+    CrawlJobMaxAttempts: int = Field(default=2)
+    # Chromium 用户数据目录，非空时复用其中的登录状态；多进程抓取时每个进程使用 {目录}-{编号}
+    UserDataDir: str = Field(default="", json_schema_extra={"env": "browserUserDataDir"})
+    Headless: bool = Field(default=False, json_schema_extra={"env": "headless"})
+    # 为 True 时浏览器在第一次抓取时才启动，否则在 HTTP 服务启动后立即在后台启动
+    LazyBrowser: bool = Field(default=False)
+    # 浏览器未就绪时抓取请求最多等待的时间（秒）
+    BrowserWaitTimeout: float = Field(default=30.0)
+    # 登录会话后台探测间隔（秒），0 表示不探测；cookies 剩余有效期少于 SessionRefreshBefore 秒时主动续期
+    SessionProbeInterval: float = Field(default=600.0)
+    SessionRefreshBefore: float = Field(default=3 * 86400.0)
+    SessionProbeTimeout: float = Field(default=5.0)
+
+class CacheConf(BaseModel):
+    SkuTtl: float = Field(default=60.0, json_schema_extra={"env": "skuCacheTtl"})
+    SkuStaleTtl: float = Field(default=300.0)
+    SkuMaxSize: int = Field(default=10000)
+
+class RefreshConf(BaseModel):
+    Enabled: bool = Field(default=True, json_schema_extra={"env": "enableRefresher"})
+    MinInterval: float = Field(default=600.0)
+    BaseInterval: float = Field(default=6 * 3600.0)
+    MaxInterval: float = Field(default=24 * 3600.0)
+    RatePerSecond: float = Field(default=0.5, json_schema_extra={"env": "refreshRate"})
+    Burst: float = Field(default=2.0)
+    Concurrency: int = Field(default=2)
+    VolatilityAlpha: float = Field(default=0.3)
+    VolatilityWeight: float = Field(default=20.0)
+    PopularityHalfLife: float = Field(default=6 * 3600.0)
+    TakenDownFactor: float = Field(default=4.0)
+    VerifyCooldown: float = Field(default=600.0)
+    # 多节点模式：通过 jd_crawl_lease 表领取抓取任务，多个节点共用一个数据库时不会重复抓取
+    Distributed: bool = Field(default=False, json_schema_extra={"env": "distributedCrawl"})
+    NodeId: str = Field(default="", json_schema_extra={"env": "crawlNodeId"})
+    LeaseSeconds: int = Field(default=120)
+    LeaseHeartbeat: float = Field(default=30.0)
+    ClaimBatch: int = Field(default=10)
+    IdleInterval: float = Field(default=5.0)
+    ReseedInterval: float = Field(default=300.0)
+    RetryDelay: float = Field(default=60.0)
+
+class HistoryConf(BaseModel):
+    Enabled: bool = Field(default=True, json_schema_extra={"env": "enablePriceHistory"})
+    # 原始变化点保留多久后压缩（秒）
+    CompactAfter: int = Field(default=7 * 86400)
+    CompactInterval: float = Field(default=3600.0)
+    CompactBatch: int = Field(default=200)
+    # 每个压缩块覆盖的时间跨度（秒）
+    BlockSpan: int = Field(default=30 * 86400)
+    DefaultRange: int = Field(default=90 * 86400)
+    MaxBuckets: int = Field(default=1000)
+
+class ProfileConf(BaseModel):
+    # 开启后注册 /debug/pprof 路由，等同于 WithEnablePprof(True)
+    Enabled: bool = Field(default=False, json_schema_extra={"env": "enablePprof"})
+    MaxSeconds: float = Field(default=60.0)
+    SampleInterval: float = Field(default=0.005)
+    # 慢请求自动保存 cProfile 结果（秒），0 表示关闭
+    SlowRequestThreshold: float = Field(default=2.0)
+    SlowRequestSampleRate: float = Field(default=0.1)
+    ProfileDir: str = Field(default="profiles")
+    MaxSavedProfiles: int = Field(default=50)
+    MaxHeapSnapshots: int = Field(default=10)
+    TracemallocFrames: int = Field(default=10)
+    # 事件循环阻塞检测：心跳间隔与判定阻塞的阈值（秒）
+    LoopMonitorEnabled: bool = Field(default=True, json_schema_extra={"env": "enableLoopMonitor"})
+    LoopMonitorInterval: float = Field(default=0.1)
+    LoopBlockThreshold: float = Field(default=0.1)
+    LoopMaxOffenders: int = Field(default=50)
+
+class SplitConf(BaseModel):
+    # single：一个进程内完成接口和抓取；split：抓取进程持有浏览器，ApiWorkers 个 API 进程对外提供接口
+    Mode: str = Field(default="single", json_schema_extra={"env": "serveMode"})
+    ApiWorkers: int = Field(default=2, json_schema_extra={"env": "apiWorkers"})
+    # 抓取任务通道地址，host:port 或 unix:/path
+    Address: str = Field(default="127.0.0.1:8091", json_schema_extra={"env": "jobChannelAddr"})
+    # 抓取进程自身的 HTTP 服务（/metrics、/v1/stats 等），不对外提供查询
+    ScraperHttpAddr: str = Field(default="127.0.0.1:8092")
+    RequestTimeout: float = Field(default=60.0)
+    # 抓取进程同时处理的请求上限，超出时立即返回繁忙；每个 API 进程未完成请求的上限
+    MaxInFlight: int = Field(default=64)
+    ClientMaxInFlight: int = Field(default=32)
+    ConnectTimeout: float = Field(default=5.0)
+    # API 进程从数据库重新加载商品索引的间隔（秒），以及上报指标、检查进程存活的间隔
+    IndexReloadInterval: float = Field(default=60.0)
+    HeartbeatInterval: float = Field(default=5.0)
+
 class AppConf(BaseModel):
     mode: Mode = Field(default="debug", json_schema_extra={"env": "APP_MODE"})
     log: LogConf = Field(default_factory=LogConf)
@@ -23,4 +149,11 @@ class AppConf(BaseModel):
     buff_api: BuffApi = Field(default_factory=BuffApi)
     website_title: str = Field(default="localhost:5173")
     web_view: WebViewConf = Field(default_factory=WebViewConf)
+    http: HttpConf = Field(default_factory=HttpConf)
+    scrape: ScrapeConf = Field(default_factory=ScrapeConf)
+    cache: CacheConf = Field(default_factory=CacheConf)
+    refresh: RefreshConf = Field(default_factory=RefreshConf)
+    history: HistoryConf = Field(default_factory=HistoryConf)
+    profile: ProfileConf = Field(default_factory=ProfileConf)
+    split: SplitConf = Field(default_factory=SplitConf)
 
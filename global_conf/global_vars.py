@@ -9,6 +9,7 @@ ENV_KEY_MODE = "APP_MODE"
 ZAP_LOGGER_CLEANUP_KEY = "zap_logger"
 LOG_WRITER_CLEANUP_KEY = "log_writer"
 OTEL_CLEANUP_KEY = "otel"
+SKU_WRITE_BEHIND_CLEANUP_KEY = "sku_write_behind"
 
 @dataclass
 class AppInfo:
@@ -20,6 +21,8 @@ class AppInfo:
 DEFAULT_APP_CONF : appConf.AppConf = appConf.AppConf()
 Conf: appConf.AppConf = appConf.AppConf()
 Logger: Optional[Any] = None
+# services.logger.queued.QueuedLogging，init_log 之后才有值
+LogPipeline: Optional[Any] = None
 cleanups_mu : threading.Lock = threading.Lock()
 Cleanups: dict = {}
 
@@ -49,6 +52,11 @@ def set_cleanup(name: str, fn: Callable) -> None:
         global Cleanups
         Cleanups[name] = fn
 
+def remove_cleanup(name: str) -> None:
+    """移除清理函数"""
+    with cleanups_mu:
+        Cleanups.pop(name, None)
+
 def cleanup() -> None:
     """清理资源"""
     import contextlib
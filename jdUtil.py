@@ -1,36 +1,74 @@
 import asyncio
+import os
 import re
 import signal
 import threading
 import time
 import webbrowser
-from concurrent.futures import ThreadPoolExecutor
-from contextlib import suppress
+from contextlib import asynccontextmanager, suppress
 from typing import Optional, Any, Callable
 
 from fastapi import FastAPI
 from flask import Request
 
-from common.utils import sync_retry
 from global_conf import global_vars
-from option import ApplyOption, WithDebug, WithProd
+from option import ApplyOption, WithDebug, WithEnablePprof, WithProd
 from api import Api
-from routes import register_routes
-from services.db.remote.mysqlutil import MysqlUtil
+from common.fastjson import FastJSONResponse
+from common.readiness import READY, Readiness
+from common.retry import RetryPolicy
+from routes import register_pprof_routes, register_routes
+from services.db.remote.mysqlutil import AsyncMysqlUtil
 import services.logger.logger as logger
 import uvicorn
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError, Locator, ElementHandle, Page
+from playwright.async_api import Page
 
+from services.ipc.api_workers import ApiWorkerPool, decode_metrics, encode_metrics, metrics_source
+from services.ipc.channel import ChannelError, JobClient, JobServer
+from services.jdhelper.crawl_workers import CrawlWorkerPool
 from services.jdhelper.error import NetworkError
-from services.jdhelper.login_with_cookie import logInWithCookies as async_logInWithCookies
+from services.jdhelper.scraper import SkuScraper, extract_brand
+from services.metrics.metrics import HTTP_REQUEST_SECONDS, SCRAPE_ERRORS
+from services.metrics.registry import REGISTRY
+from services.profiling.loop_monitor import LoopLagMonitor
+
+# 商品索引加载失败（例如数据库暂时不可用）时的重试间隔，一直重试直到成功，不限次数
+DB_INIT_RETRY = RetryPolicy(retry_delay=1, backoff_factor=2, max_delay=60)
 
 
 class CancellationContext:
+    """
+    退出信号
+
+    cancel 可以在任意线程（包括信号处理函数）中调用，bind 之后 wait 在事件循环中等待，不需要轮询
+    """
+
     def __init__(self):
         self._cancelled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._event = asyncio.Event()
+        if self._cancelled:
+            self._event.set()
 
     def cancel(self):
         self._cancelled = True
+        if self._event is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self):
+        await self._event.wait()
 
     @property
     def cancelled(self) -> bool:
@@ -39,14 +77,23 @@ class CancellationContext:
 class Options:
     def __init__(self,
                  debug: bool = False,
-                 enable_pprof: bool = True,
-                 http_addr: str = "127.0.0.1:8090"):
+                 enable_pprof: bool = False,
+                 http_addr: str = "127.0.0.1:8090",
+                 fast_loop: bool = True):
         self.debug = debug
         self.enable_pprof = enable_pprof
         self.http_addr = http_addr
+        # 已安装 uvloop 时使用 uvloop 事件循环
+        self.fast_loop = fast_loop
 
 default_opts = Options()
 
+# 进程角色：single 在一个进程内完成接口和抓取；
+# split 模式下 scraper 持有浏览器并执行抓取任务，api 进程只对外提供接口，抓取通过任务通道交给 scraper
+ROLE_SINGLE = "single"
+ROLE_SCRAPER = "scraper"
+ROLE_API = "api"
+
 class jdUtil:
     def __init__(self,
                  ctx: Optional[Any] = None,
@@ -56,7 +103,8 @@ class jdUtil:
                  cancel: Optional[Callable[[], None]] = None,
                  api: Optional[Api] = None,
                  lock: Optional[threading.Lock] = None,
-                 mysql: Optional[Any] = None):
+                 mysql: Optional[Any] = None,
+                 role: str = ROLE_SINGLE):
         self._event_loop = None  # 存储事件循环引用
         self.ctx = ctx
         self.opts = opts if opts is not None else default_opts
@@ -67,12 +115,71 @@ class jdUtil:
         self.api = api
         self.lock = lock if lock is not None else threading.Lock()
         self.mysql = mysql
+        self.role = role
 
-        self.__page, browser = None, None
         self.__err_occurred = False
 
-    async def init_page(self):
-        self.__page, _ = await async_logInWithCookies()
+        # 进程内抓取，CrawlWorkers 大于 0 时改由抓取进程池完成
+        self.scraper = SkuScraper()
+        self.crawl_pool: Optional[CrawlWorkerPool] = None
+        scrape_conf = global_vars.Conf.scrape
+        if scrape_conf.CrawlWorkers > 0 and role != ROLE_API:
+            self.crawl_pool = CrawlWorkerPool(
+                workers=scrape_conf.CrawlWorkers,
+                concurrency=scrape_conf.PagePoolSize,
+                job_timeout=scrape_conf.CrawlJobTimeout,
+                heartbeat_interval=scrape_conf.CrawlHeartbeatInterval,
+                heartbeat_timeout=scrape_conf.CrawlHeartbeatTimeout,
+                max_attempts=scrape_conf.CrawlJobMaxAttempts,
+            )
+
+        # split 模式：抓取进程监听任务通道并启动 API 进程，API 进程通过 job_client 提交抓取
+        split_conf = global_vars.Conf.split
+        self.job_server: Optional[JobServer] = None
+        self.job_client: Optional[JobClient] = None
+        self.api_pool: Optional[ApiWorkerPool] = None
+        # API 进程的编号和对外 HTTP 端口的监听 socket（由抓取进程绑定后传入）
+        self.worker_id: Optional[int] = None
+        self.http_sockets: Optional[list] = None
+        self._parent_pid = os.getppid()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        if role == ROLE_API:
+            self.job_client = JobClient(
+                split_conf.Address,
+                timeout=split_conf.RequestTimeout,
+                max_in_flight=split_conf.ClientMaxInFlight,
+                connect_timeout=split_conf.ConnectTimeout,
+            )
+
+        # 启动就绪状态：HTTP 服务先启动，浏览器和商品索引在后台初始化
+        self.readiness = Readiness()
+        self.readiness.register("db")
+        if role == ROLE_API:
+            self.readiness.register("scraper")
+        else:
+            # 按需启动时浏览器不影响就绪
+            self.readiness.register("browser", required=not scrape_conf.LazyBrowser)
+        self._startup_task: Optional[asyncio.Task] = None
+        self._browser_task: Optional[asyncio.Task] = None
+
+        # 事件循环阻塞检测：HTTP 服务、抓取和后台任务共用一个事件循环
+        self.loop_monitors = {}
+        profile_conf = global_vars.Conf.profile
+        if profile_conf.LoopMonitorEnabled:
+            self.loop_monitors = {name: LoopLagMonitor(
+                name,
+                interval=profile_conf.LoopMonitorInterval,
+                threshold=profile_conf.LoopBlockThreshold,
+                max_offenders=profile_conf.LoopMaxOffenders,
+            ) for name in ("main",)}
+
+    async def init_page(self) -> Page:
+        """
+        登录并初始化页面池
+
+        :return: 登录时使用的页面，由调用方决定何时关闭
+        """
+        return await self.scraper.start()
 
     def init_api(self):
         # 确保 api 已初始化
@@ -81,7 +188,18 @@ class jdUtil:
 
         # 1. 根据 debug 标志创建 FastAPI 应用
         debug = bool(self.opts.debug)
-        app = FastAPI(debug=debug)
+
+        # 后台价格刷新、历史压缩跟随 HTTP 服务启停，与接口请求共用同一个事件循环
+        @asynccontextmanager
+        async def lifespan(_app: FastAPI):
+            self.api.start_background_tasks()
+            try:
+                yield
+            finally:
+                await self.api.stop_background_tasks()
+
+        # 返回 dict 的接口也用 orjson 输出；热点接口直接返回 FastJSONResponse，跳过 jsonable_encoder
+        app = FastAPI(debug=debug, lifespan=lifespan, default_response_class=FastJSONResponse)
 
         # 添加CORS中间件
         from fastapi.middleware.cors import CORSMiddleware
@@ -99,28 +217,62 @@ class jdUtil:
             allow_headers=["*"],  # 允许所有请求头
         )
 
+        # 较大的响应 gzip 压缩；已设置 Content-Encoding 的响应（如缓存的商品列表）原样返回
+        http_conf = global_vars.Conf.http
+        if http_conf.GzipMinSize > 0:
+            from fastapi.middleware.gzip import GZipMiddleware
+            app.add_middleware(GZipMiddleware, minimum_size=http_conf.GzipMinSize,
+                               compresslevel=http_conf.GzipLevel)
+
+        enable_pprof = bool(self.opts.enable_pprof)
+        profiler = self.api.profiler
+
         @app.middleware("http")
         async def recovery_and_log(request: Request, call_next):
+            start = time.perf_counter()
+            status = 500
+            # 抽样对请求启用 cProfile，超过阈值的保存到 Profile.ProfileDir；分析路由本身不参与
+            profile = None
+            if enable_pprof and not request.url.path.startswith("/debug/pprof"):
+                profile = profiler.begin_request()
             try:
                 response = await call_next(request)
+                status = response.status_code
                 return response
             except Exception as exc:
                 logger.error("Unhandled exception in request:", exc_info=exc)
                 from fastapi.responses import PlainTextResponse
                 return PlainTextResponse("Internal Server Error", status_code=500)
+            finally:
+                # 按路由模板统计，未匹配的路径归为一类，避免标签数量随 URL 增长
+                elapsed = time.perf_counter() - start
+                route = getattr(request.scope.get("route"), "path", "unmatched")
+                HTTP_REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=status)
+                if profile is not None:
+                    profiler.end_request(profile, elapsed, request.method, route)
 
         # 5. 注册路由
         register_routes(app, self.api)
+        if enable_pprof:
+            register_pprof_routes(app, self.api)
+            logger.warning("已启用 /debug/pprof 性能分析路由")
 
         # 6. 创建并保存 Uvicorn 服务器实例（未运行）
-        host_str, port_str = self.opts.http_addr.split(":")
+        # split 模式下对外端口由 API 进程提供，抓取进程的 HTTP 服务只用于 /metrics、/v1/stats 等
+        http_addr = self.opts.http_addr
+        if self.role == ROLE_SCRAPER:
+            http_addr = global_vars.Conf.split.ScraperHttpAddr
+        host_str, port_str = http_addr.split(":")
         host = host_str.strip()
         port = int(port_str.strip())
 
+        # 事件循环由 run 创建，uvicorn 只在其中运行；http="auto" 在安装了 httptools 时使用 httptools
         uvicorn_config = uvicorn.Config(
             app,
             host=host,
             port=port,
+            loop="none",
+            http="auto",
             log_level="debug" if debug else "info",
         )
         server = uvicorn.Server(uvicorn_config)
@@ -150,99 +302,230 @@ class jdUtil:
         
         # 保存事件循环引用
         self._event_loop = asyncio.get_running_loop()
+        if "main" in self.loop_monitors:
+            self.loop_monitors["main"].start()
         
-        # 初始化页面
-        await self.init_page()
-        time.sleep(3)
-        await self.__page.close()
+        if self.role == ROLE_SCRAPER:
+            await self.start_split()
+        elif self.role == ROLE_API:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+        # 浏览器和商品索引在后台初始化，HTTP 服务不等待它们
+        self._startup_task = asyncio.create_task(self.warm_up())
+
+        # 运行主循环
+        await self.notify_quit()
+
+    async def warm_up(self):
+        """并行加载商品索引和启动浏览器，失败只记录在就绪状态中，不影响 HTTP 服务"""
+        steps = [self._load_product_index()]
+        if self.role == ROLE_API:
+            steps.append(self.readiness.track("scraper", self._connect_scraper()))
+        elif not global_vars.Conf.scrape.LazyBrowser:
+            steps.append(self.ensure_browser(timeout=None))
+        results = await asyncio.gather(*steps, return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            logger.warning(f"部分组件初始化失败: {self.readiness.snapshot()['components']}")
         logger.info(
             f"{global_vars.Conf.app_name} 已启动 -- {global_vars.Conf.website_title}"
         )
-        
-        # 运行主循环
-        await self.notify_quit()
-        
-    def run(self):
-        asyncio.run(self.run_async())
 
+    async def _load_product_index(self):
+        """加载商品索引，失败后按 DB_INIT_RETRY 退避重试；每次尝试的结果都记录在 /readyz 的 db 组件中"""
+        attempt = 0
+        while True:
+            try:
+                return await self.readiness.track("db", self.api.init_product_index())
+            except Exception:
+                attempt += 1
+                delay = DB_INIT_RETRY.backoff(attempt)
+                logger.warning(f"商品索引第 {attempt} 次加载失败，{delay:.1f} 秒后重试")
+                await asyncio.sleep(delay)
+
+    async def start_split(self):
+        """抓取进程：先监听任务通道，再绑定对外端口并启动 API 进程"""
+        split_conf = global_vars.Conf.split
+        self.job_server = JobServer(split_conf.Address, self._job_handlers(), max_in_flight=split_conf.MaxInFlight)
+        await self.job_server.start()
+        self.api_pool = ApiWorkerPool(
+            workers=split_conf.ApiWorkers,
+            http_addr=self.opts.http_addr,
+            debug=bool(self.opts.debug),
+            enable_pprof=bool(self.opts.enable_pprof),
+        )
+        await asyncio.to_thread(self.api_pool.start)
+
+    def _job_handlers(self) -> dict:
+        """抓取进程处理的任务通道请求"""
 
-    async def notify_quit(self):
-        """
-        等待程序退出信号，管理服务器生命周期
-        """
-        # 创建事件循环
-        loop = asyncio.get_running_loop()
-        interrupt_event = asyncio.Event()
+        async def query(payload: dict):
+            # 经过抓取进程的缓存，多个 API 进程同时查询同一商品只抓取一次；写库、价格历史和后台刷新也在这里完成
+            return await self.api._query_and_save(str(payload["sku_code"]), int(payload["type_code"]))
 
-        # # 设置中断信号处理
-        # interrupt_event = asyncio.Event()
-        # for sig in (signal.SIGINT, signal.SIGTERM):
-        #     loop.add_signal_handler(sig, interrupt_event.set)
+        async def scrape(payload: dict):
+            return await self.query_sku_info(str(payload["sku_code"]))
 
-        # Windows 专用信号处理
-        def signal_handler(sig, frame):
-            logger.info("收到 Ctrl+C 信号")
-            interrupt_event.set()
+        async def ping(payload: dict):
+            return self.readiness.snapshot()
 
-        signal.signal(signal.SIGINT, signal_handler)
+        async def metrics(payload: dict):
+            REGISTRY.update_remote(payload["source"], decode_metrics(payload["snapshot"]))
 
-        # 创建线程池用于运行阻塞操作
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            # 任务1: 运行HTTP服务器
-            server_task = loop.run_in_executor(
-                executor,
-                self.http_srv.run
-            )
+        async def render_metrics(payload: dict):
+            return REGISTRY.render()
 
-            # 任务2: 监听中断信号
-            async def watch_interrupt():
-                await interrupt_event.wait()
-                logger.info("收到退出信号，正在关闭服务器...")
+        return {"query": query, "scrape": scrape, "ping": ping, "metrics": metrics, "render_metrics": render_metrics}
+
+    async def _connect_scraper(self):
+        """API 进程：等待任务通道可用"""
+        while True:
+            try:
+                return await self.job_client.call("ping", timeout=global_vars.Conf.split.ConnectTimeout)
+            except ChannelError as e:
+                logger.warning(f"连接抓取进程失败，稍后重试: {e.message}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat(self):
+        """API 进程：定时把指标快照发给抓取进程；抓取进程退出后本进程随之退出"""
+        interval = global_vars.Conf.split.HeartbeatInterval
+        source = metrics_source(self.worker_id)
+        while True:
+            await asyncio.sleep(interval)
+            if os.getppid() != self._parent_pid:
+                logger.error("抓取进程已退出，API 进程随之退出")
+                self.ctx.cancel()
+                return
+            try:
+                await self.job_client.call("metrics", {"source": source, "snapshot": encode_metrics(REGISTRY.snapshot())},
+                                           timeout=interval)
+            except NetworkError as e:
+                logger.debug(f"上报指标失败: {e.message}")
+
+    async def _start_browser(self):
+        if self.crawl_pool is not None:
+            # 浏览器运行在抓取进程中，API 进程不启动 Chromium
+            await self.crawl_pool.start()
+        else:
+            login_page = await self.init_page()
+            await login_page.close()
+
+    async def ensure_browser(self, timeout: Optional[float] = -1):
+        """
+        在主事件循环中调用：浏览器未启动时启动，并等待其就绪
 
-                # 调用停止方法
-                await self.stop()
+        多个请求共用同一个启动任务；启动失败后下一次调用重新启动。
+        :param timeout: 最长等待秒数，-1 表示使用 Scrape.BrowserWaitTimeout，None 表示一直等待
+        """
+        task = self._browser_task
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = self._browser_task = asyncio.create_task(self.readiness.track("browser", self._start_browser()))
+        if task.done():
+            return task.result()
+        if timeout == -1:
+            timeout = global_vars.Conf.scrape.BrowserWaitTimeout
+        try:
+            # shield：等待超时不取消启动任务
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise NetworkError("浏览器尚未就绪", details=f"等待 {timeout} 秒超时")
 
-                # 关闭服务器
-                with suppress(Exception):
-                    await self.http_srv.shutdown()
+    def run(self):
+        if self.opts.fast_loop:
+            try:
+                import uvloop
+            except ImportError:
+                logger.debug("未安装 uvloop，使用默认事件循环")
+            else:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        asyncio.run(self.run_async())
 
-            interrupt_task = asyncio.create_task(watch_interrupt())
 
-            # 任务3: 监听上下文取消
-            async def watch_context():
-                while not self.ctx.cancelled:
-                    await asyncio.sleep(0.1)
-                logger.info("上下文已取消，正在关闭服务器...")
-                interrupt_event.set()
+    async def notify_quit(self):
+        """
+        在当前事件循环中运行 HTTP 服务，直到收到退出信号或上下文被取消，然后停止服务
+        """
+        loop = asyncio.get_running_loop()
+        self.ctx.bind(loop)
 
-            context_task = asyncio.create_task(watch_context())
+        # uvicorn 在主线程运行时自己处理 SIGINT/SIGTERM 并在退出后重新触发信号，
+        # 这里的处理函数只负责取消上下文，不会再抛出 KeyboardInterrupt 打断清理
+        def signal_handler(sig, frame):
+            logger.info("收到退出信号")
+            loop.call_soon_threadsafe(self.ctx.cancel)
 
-            # 等待所有任务完成
-            done, pending = await asyncio.wait(
-                [server_task, interrupt_task, context_task],
-                return_when=asyncio.FIRST_COMPLETED
-            )
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with suppress(ValueError, OSError):
+                signal.signal(sig, signal_handler)
 
-            # 取消未完成的任务
-            for task in pending:
-                task.cancel()
-                with suppress(asyncio.CancelledError):
-                    await task
+        server_task = asyncio.create_task(self.http_srv.serve(sockets=self.http_sockets))
+        cancel_task = asyncio.create_task(self.ctx.wait())
+        await asyncio.wait([server_task, cancel_task], return_when=asyncio.FIRST_COMPLETED)
 
-            # 检查是否有错误
-            for task in done:
-                if task.exception():
-                    logger.error(f"任务异常: {task.exception()}")
-                    return task.exception()
+        if not server_task.done():
+            logger.info("上下文已取消，正在关闭服务器...")
+            self.http_srv.should_exit = True
+        error = None
+        try:
+            await server_task
+        except BaseException as e:
+            logger.error(f"HTTP 服务异常: {e}")
+            error = e
+        cancel_task.cancel()
 
-        return None
+        await self.stop()
+        return error
 
     async def stop(self):
         """停止服务，清理资源"""
         logger.info("正在停止服务...")
 
-        # 清理其他资源
-        # ...
+        # 取消尚未完成的启动
+        for task in (self._startup_task, self._browser_task, self._heartbeat_task):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        # 先停止 API 进程，它们正在等待的抓取任务仍可以完成，再关闭任务通道
+        if self.api_pool is not None:
+            with suppress(Exception):
+                await asyncio.to_thread(self.api_pool.close)
+        if self.job_server is not None:
+            with suppress(Exception):
+                await self.job_server.stop()
+        if self.job_client is not None:
+            with suppress(Exception):
+                await self.job_client.close()
+
+        # 停止后台价格刷新和历史压缩
+        if self.api is not None:
+            try:
+                await self.api.stop_background_tasks()
+            except Exception as e:
+                logger.error(f"停止后台任务失败: {e}")
+
+        # 写入缓冲中剩余的商品数据
+        if self.api is not None:
+            try:
+                await self.api.sku_writer.close()
+            except Exception as e:
+                logger.error(f"写入缓冲刷新失败: {e}")
+
+        # 关闭数据库连接池
+        if self.mysql is not None:
+            with suppress(Exception):
+                self.mysql.close()
+
+        # 关闭抓取进程
+        if self.crawl_pool is not None:
+            with suppress(Exception):
+                await asyncio.to_thread(self.crawl_pool.close)
+
+        # 关闭 HTTP 快速通道和页面池
+        await self.scraper.close()
+
+        for monitor in self.loop_monitors.values():
+            await monitor.stop()
 
         # 标记上下文为已取消
         self.ctx.cancel()
@@ -259,101 +542,72 @@ class jdUtil:
                 'price': price_value
             }
         '''
-        # if not self.__page or self.__page.is_closed():
-        #     await self.init_page()
-            
-        url_1 = f'https://item.jd.com/{sku_code}.html'
-        sku_name = ''
-        price_value = 0.00
-        brand_name = ''
-        is_taken_down = 0
-        try:
-            await self.__load_page(url_1, timeout=20000)
-        except PlaywrightTimeoutError:
-            raise NetworkError(message=f"页面加载超时：{url_1}")
-            
-        try:
-            await self.__page.wait_for_selector('.sku-name-title', timeout=5000)
-            sku_name_element = self.__page.locator('.sku-name-title')
-            sku_name = await sku_name_element.inner_text()
-            logger.info(f'商品名称: {sku_name}')
-        except Exception as e:
-            logger.error(f"获取商品名称失败: {e}")
-
         try:
-            await self.__page.wait_for_selector('.summary-price.J-summary-price .p-price .price', timeout=5000)
-            price_element = self.__page.locator('.summary-price.J-summary-price .p-price .price')
-            price_text = await price_element.inner_text()
-            price_value = float(price_text.split('¥')[-1].strip())
-            logger.info(f'商品价格: {price_value}')
+            if self.job_client is not None:
+                return await self.job_client.call("scrape", {"sku_code": sku_code})
+            if self.readiness.state("browser") != READY:
+                await self.ensure_browser()
+            if self.crawl_pool is not None:
+                return await self.crawl_pool.query(sku_code)
+            # HTTP 服务与页面池在同一个事件循环中，直接使用页面
+            return await self.scraper.query(sku_code)
         except Exception as e:
-            logger.error(f"获取商品价格失败: {e}，可能已经下架了")
-            is_taken_down = 1
-        finally:
-            time.sleep(2)
-            await self.__page.close()
-
-        if sku_name:
-            brand_name = self.extract_brand(sku_name)
-        return {
-            'sku_code': sku_code,
-            'sku_name': sku_name,
-            'price': price_value,
-            'url': url_1,
-            'brand': brand_name,
-            'is_taken_down': is_taken_down
-        }
-
-    @sync_retry(max_retries=3, retry_delay=2, exceptions=(PlaywrightTimeoutError,))
-    async def __load_page(self, url: str, timeout: float):
-        # if not self.__page or self.__page.is_closed():
-        #     await self.init_page()
-        # 确保在正确的事件循环中执行
-        if self._event_loop and self._event_loop != asyncio.get_running_loop():
-            # 在正确循环中重新初始化页面
-            self.__page = None
-            await self.init_page()
-        return await self.__page.goto(url, timeout=timeout)
+            SCRAPE_ERRORS.inc(type=type(e).__name__)
+            raise
+
+    def pool_usage(self) -> list:
+        """资源池的 (名称, 容量, 使用中) 列表，供 /metrics 输出"""
+        pools = []
+        page_pool = self.scraper.page_pool
+        if page_pool is not None:
+            pools.append(("page", page_pool.size, page_pool.in_use))
+        if self.mysql is not None:
+            pool_stats = self.mysql.pool.stats()
+            pools.append(("mysql", pool_stats["max_size"], pool_stats["in_use"]))
+        if self.crawl_pool is not None:
+            # 按抓取槽位（进程数 × 每进程并发）计算占用，只计已被抓取进程取走的任务，仍在队列中等待的不占槽位
+            slots = self.crawl_pool.workers * self.crawl_pool.concurrency
+            pools.append(("crawl_workers", slots, self.crawl_pool.stats()["running"]))
+        if self.job_server is not None:
+            pools.append(("job_server", self.job_server.max_in_flight, self.job_server.stats()["in_flight"]))
+        if self.job_client is not None:
+            pools.append(("job_client", self.job_client.max_in_flight, self.job_client.stats()["pending"]))
+        return pools
+
+    def stats(self) -> dict:
+        """抓取相关组件的运行统计"""
+        stats = self.scraper.stats()
+        stats["crawl_workers"] = self.crawl_pool.stats() if self.crawl_pool is not None else None
+        stats["mysql_pool"] = self.mysql.pool.stats() if self.mysql is not None else None
+        stats["event_loops"] = {name: monitor.stats() for name, monitor in self.loop_monitors.items()}
+        stats["readiness"] = self.readiness.snapshot()
+        stats["role"] = self.role
+        if self.job_server is not None:
+            stats["job_server"] = self.job_server.stats()
+            stats["api_workers"] = self.api_pool.stats() if self.api_pool is not None else None
+        if self.job_client is not None:
+            stats["job_client"] = self.job_client.stats()
+        return stats
 
     def extract_brand(self, sku_name):
-        """
-        从商品名称中提取品牌信息
-        规则：优先取第一个括号前的内容，若无括号则取第一个空格前的内容
-        """
-        print(sku_name)
-        if not sku_name:
-            return ""
-
-        # 模式1：匹配"品牌（英文）"结构（支持中英文括号）
-        pattern1 = r'^([^\(\（]+?)\s*[\(\（]'
-        # 模式2：匹配首个空格前的连续非空字符
-        pattern2 = r'^(\S+?)\s'
-
-        # 先尝试匹配括号模式
-        match = re.search(pattern1, sku_name)
-        if match:
-            return match.group(1).strip()
-
-        # 再尝试匹配空格模式
-        match = re.search(pattern2, sku_name)
-        if match:
-            return match.group(1).strip()
-
-        # 两种模式都不匹配时取前5个字符（防止过长无效字符）
-        return sku_name[:5].strip()
+        """从商品名称中提取品牌信息，规则见 services.jdhelper.scraper.extract_brand"""
+        return extract_brand(sku_name)
 
 
 def new_jdUtil(*apply_options: ApplyOption) -> jdUtil:
     ctx = CancellationContext()
     cancel = ctx.cancel
-    mysql = MysqlUtil()
+    mysql = AsyncMysqlUtil()
+    # Split.Mode 为 split 时本进程作为抓取进程，对外接口由它启动的 API 进程提供
+    role = ROLE_SCRAPER if global_vars.Conf.split.Mode == "split" else ROLE_SINGLE
     # 创建实例
     p = jdUtil(
         ctx=ctx,
         cancel=cancel,
         lock=threading.Lock(),
         opts=default_opts,
-        mysql=mysql
+        mysql=mysql,
+        role=role,
     )
     # 设置开发/生产模式
     if global_vars.is_dev_mode():
@@ -361,6 +615,9 @@ def new_jdUtil(*apply_options: ApplyOption) -> jdUtil:
     else:
         apply_options = (*apply_options, WithProd())
 
+    if global_vars.Conf.profile.Enabled:
+        apply_options = (*apply_options, WithEnablePprof(True))
+
     # 应用选项
     for fn in apply_options:
         fn(p.opts)
@@ -368,4 +625,21 @@ def new_jdUtil(*apply_options: ApplyOption) -> jdUtil:
     # 关键：在返回之前创建并设置 Api 实例
     p.api = Api(p)  # 确保 Api 被正确初始化
 
-    return p
\ No newline at end of file
+    return p
+
+
+def new_api_worker(worker_id: int, sock, debug: bool = False, enable_pprof: bool = False) -> jdUtil:
+    """split 模式下的 API 进程：在抓取进程绑定的 socket 上提供接口，不启动浏览器"""
+    ctx = CancellationContext()
+    p = jdUtil(
+        ctx=ctx,
+        cancel=ctx.cancel,
+        lock=threading.Lock(),
+        opts=Options(debug=debug, enable_pprof=enable_pprof),
+        mysql=AsyncMysqlUtil(),
+        role=ROLE_API,
+    )
+    p.worker_id = worker_id
+    p.http_sockets = [sock]
+    p.api = Api(p)
+    return p
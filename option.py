@@ -10,6 +10,7 @@ class Options:
     debug: bool = False
     enable_pprof: bool = False
     http_addr: str = ""
+    fast_loop: bool = True
     # 可以在此添加其他配置字段
 
 
@@ -39,6 +40,19 @@ def WithHttpAddr(http_addr: str) -> ApplyOption:
     return apply
 
 
+def WithFastLoop(fast_loop: bool) -> ApplyOption:
+    """是否在已安装 uvloop 时使用 uvloop 事件循环
+
+    :param fast_loop: 是否启用
+    :return: 应用函数
+    """
+
+    def apply(o: Options):
+        o.fast_loop = fast_loop
+
+    return apply
+
+
 def WithDebug() -> ApplyOption:
     """启用调试模式选项
 
@@ -16,6 +16,20 @@ def register_routes(app: FastAPI, api: Api):
             return {"status": "OK"}
         return await api.DevHand(request)
 
+    # 存活与就绪探针：HTTP 服务先于浏览器和数据库启动，就绪前 /readyz 返回 503
+    @app.get("/healthz")
+    async def healthz(request: Request):
+        return await api.Healthz(request)
+
+    @app.get("/readyz")
+    async def readyz(request: Request):
+        return await api.Readyz(request)
+
+    # Prometheus 抓取地址，按惯例不放在 /v1 下
+    @app.get("/metrics")
+    async def metrics(request: Request):
+        return await api.Metrics(request)
+
     # 2. 创建 /v1 路由组
     v1 = APIRouter(prefix="/v1")
 
@@ -28,9 +42,75 @@ def register_routes(app: FastAPI, api: Api):
     async def query_sku_info(request: Request):
         return await api.QuerySkuInfo(request)
 
-    @v1.post("/getProductList")
+    @v1.post("/querySkuInfoBatch")
+    async def query_sku_info_batch(request: Request):
+        return await api.QuerySkuInfoBatch(request)
+
+    @v1.api_route("/getProductList", methods=["GET", "POST"])
     async def get_product_list(request: Request):
         return await api.GetProductList(request)
 
+    @v1.api_route("/getPriceHistory", methods=["GET", "POST"])
+    async def get_price_history(request: Request):
+        return await api.GetPriceHistory(request)
+
+    @v1.get("/stats")
+    async def get_stats(request: Request):
+        return await api.GetStats(request)
+
+    @v1.get("/refresher")
+    async def get_refresher_status(request: Request):
+        return await api.GetRefresherStatus(request)
+
+    @v1.post("/refresher/pause")
+    async def pause_refresher(request: Request):
+        return await api.PauseRefresher(request)
+
+    @v1.post("/refresher/resume")
+    async def resume_refresher(request: Request):
+        return await api.ResumeRefresher(request)
+
     # 最后把 v1 注册到主应用
-    app.include_router(v1)
\ No newline at end of file
+    app.include_router(v1)
+
+def register_pprof_routes(app: FastAPI, api: Api):
+    """性能分析路由，只在 Options.enable_pprof 为 True 时注册"""
+    pprof = APIRouter(prefix="/debug/pprof")
+
+    @pprof.get("")
+    async def profiler_status(request: Request):
+        return await api.GetProfilerStatus(request)
+
+    @pprof.get("/profile")
+    async def cpu_profile(request: Request):
+        return await api.ProfileCpu(request)
+
+    @pprof.post("/heap/snapshot")
+    async def heap_snapshot(request: Request):
+        return await api.HeapSnapshot(request)
+
+    @pprof.get("/heap/diff")
+    async def heap_diff(request: Request):
+        return await api.HeapDiff(request)
+
+    @pprof.post("/heap/stop")
+    async def heap_stop(request: Request):
+        return await api.HeapStop(request)
+
+    @pprof.get("/slow")
+    async def list_slow_profiles(request: Request):
+        return await api.ListSlowProfiles(request)
+
+    @pprof.get("/slow/{name}")
+    async def get_slow_profile(request: Request, name: str):
+        return await api.GetSlowProfile(request, name)
+
+    @pprof.get("/loop")
+    async def loop_report(request: Request):
+        return await api.GetLoopReport(request)
+
+    @pprof.post("/loop/reset")
+    async def reset_loop_report(request: Request):
+        return await api.ResetLoopReport(request)
+
+    app.include_router(pprof)
@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import services.logger.logger as logger
+from services.model.model_api import ProductQuery
+
+
+class ProductIndex:
+    """
+    按商品类型划分、按价格排序的内存索引
+
+    启动时从 jd_products_info 全量加载，之后在 insert_sku_info 写库成功后原地更新（write-through），
+    /v1/getProductList 直接读内存。每个类型维护一个版本号，用于生成 ETag。
+
+    更新规则与 insert_sku_info 的 ON DUPLICATE KEY UPDATE 保持一致：
+    已存在的商品只更新价格和下架状态，名称、类型保持不变。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, dict] = {}
+        self._sorted: Dict[str, List[Tuple[float, str]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._views: Dict[str, Tuple[int, List[dict]]] = {}
+        # 进程每次启动生成不同的前缀，避免重启后版本号重复导致 ETag 误命中
+        self._generation = format(int(time.time()), "x")
+        self.loaded = False
+
+    def load(self, rows: Iterable[dict]):
+        """用数据库查询结果重建索引"""
+        with self._lock:
+            self._rows.clear()
+            self._sorted.clear()
+            self._views.clear()
+            for row in rows:
+                self._rows[row['sku_code']] = self._make_row(row)
+            for sku_code, row in self._rows.items():
+                if not row['isdel']:
+                    self._sorted.setdefault(row['type'], []).append((row['price'], sku_code))
+            for keys in self._sorted.values():
+                keys.sort()
+            for sku_type in set(self._sorted) | set(self._versions):
+                self._versions[sku_type] = self._versions.get(sku_type, 0) + 1
+            self.loaded = True
+        logger.info(f"商品索引已加载，共 {len(self._rows)} 个商品，{len(self._sorted)} 个类型")
+
+    @staticmethod
+    def _make_row(row: dict) -> dict:
+        return {
+            'sku_code': row['sku_code'],
+            'sku_name': row.get('sku_name', ''),
+            'price': float(row.get('price') or 0),
+            'brand': row.get('brand', ''),
+            'type': str(row.get('type', '')),
+            'is_taken_down': int(row.get('is_taken_down') or 0),
+            'isdel': int(row.get('isdel') or 0),
+            'update_time': int(row.get('update_time') or 0),
+            'fingerprint': row.get('fingerprint') or '',
+            'last_seen_time': int(row.get('last_seen_time') or 0),
+        }
+
+    def upsert(self, sku_info: dict):
+        """写库成功后更新索引"""
+        sku_code = sku_info['sku_code']
+        with self._lock:
+            row = self._rows.get(sku_code)
+            now = int(time.time())
+            if row is None:
+                row = self._make_row(sku_info)
+                row['update_time'] = row['last_seen_time'] = now
+                self._rows[sku_code] = row
+                self._insert_key(row)
+                return
+
+            new_price = float(sku_info.get('price') or 0)
+            new_taken_down = int(sku_info.get('is_taken_down') or 0)
+            row['update_time'] = row['last_seen_time'] = now
+            row['fingerprint'] = sku_info.get('fingerprint') or row['fingerprint']
+            if row['price'] == new_price:
+                if row['is_taken_down'] != new_taken_down:
+                    row['is_taken_down'] = new_taken_down
+                    self._bump(row['type'])
+                return
+            row['is_taken_down'] = new_taken_down
+            self._remove_key(row)
+            row['price'] = new_price
+            self._insert_key(row)
+
+    def mark_seen(self, sku_code: str):
+        """内容未变化的抓取只更新 last_seen_time，不影响排序和 ETag"""
+        with self._lock:
+            row = self._rows.get(sku_code)
+            if row is not None:
+                row['last_seen_time'] = int(time.time())
+
+    def _insert_key(self, row: dict):
+        if row['isdel']:
+            return
+        keys = self._sorted.setdefault(row['type'], [])
+        bisect.insort(keys, (row['price'], row['sku_code']))
+        self._bump(row['type'])
+
+    def _remove_key(self, row: dict):
+        if row['isdel']:
+            return
+        keys = self._sorted.get(row['type'], [])
+        key = (row['price'], row['sku_code'])
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+            self._bump(row['type'])
+
+    def _bump(self, sku_type: str):
+        self._versions[sku_type] = self._versions.get(sku_type, 0) + 1
+        self._views.pop(sku_type, None)
+
+    def etag(self, sku_type: str) -> str:
+        return f'W/"{sku_type}-{self._generation}-{self._versions.get(sku_type, 0)}"'
+
+    def list_by_type(self, sku_type: str) -> List[dict]:
+        """按价格升序返回 {sku_name, price} 列表，同一版本只构建一次"""
+        with self._lock:
+            version = self._versions.get(sku_type, 0)
+            view = self._views.get(sku_type)
+            if view is not None and view[0] == version:
+                return view[1]
+            items = [{
+                "sku_name": self._rows[sku_code]['sku_name'],
+                "price": price,
+            } for price, sku_code in self._sorted.get(sku_type, [])]
+            self._views[sku_type] = (version, items)
+            return items
+
+    def page(self, query: ProductQuery) -> List[dict]:
+        """
+        游标分页查询，与 MysqlUtil.query_sku_info_page 的语义一致
+
+        :return: 最多 query.limit + 1 条 {sku_code, sku_name, price}，多出的一条用来判断是否还有下一页
+        """
+        with self._lock:
+            keys = self._sorted.get(query.type, [])
+            # 用二分查找定位起点：游标之后、最低价之上
+            start = 0
+            if query.after_price is not None and query.after_sku_code is not None:
+                start = bisect.bisect_right(keys, (query.after_price, query.after_sku_code))
+            if query.min_price is not None:
+                start = max(start, bisect.bisect_left(keys, (query.min_price, "")))
+
+            items = []
+            for i in range(start, len(keys)):
+                price, sku_code = keys[i]
+                if query.max_price is not None and price > query.max_price:
+                    break
+                row = self._rows[sku_code]
+                if query.brand and row['brand'] != query.brand:
+                    continue
+                if query.is_taken_down is not None and row['is_taken_down'] != query.is_taken_down:
+                    continue
+                items.append({"sku_code": sku_code, "sku_name": row['sku_name'], "price": price})
+                if len(items) > query.limit:
+                    break
+            return items
+
+    def get(self, sku_code: str) -> Optional[dict]:
+        with self._lock:
+            row = self._rows.get(sku_code)
+            return dict(row) if row is not None else None
+
+    def active_rows(self) -> List[dict]:
+        """返回未删除商品的副本，供后台刷新初始化调度队列"""
+        with self._lock:
+            return [dict(row) for row in self._rows.values() if not row['isdel']]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "products": len(self._rows),
+                "types": {sku_type: len(keys) for sku_type, keys in self._sorted.items()},
+            }
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+import services.logger.logger as logger
+
+V = TypeVar("V")
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    stored_at: float
+
+
+class TTLCache(Generic[V]):
+    """
+    进程内异步缓存
+
+    - ttl 秒内直接返回缓存值
+    - 过期后 stale_ttl 秒内仍返回旧值，同时在后台刷新（stale-while-revalidate）
+    - 同一个 key 同时只会有一个加载任务，并发请求合并等待同一个结果（single-flight）
+    - 超过 max_size 时按 LRU 淘汰
+    - 加载结果为 None 时不缓存
+    """
+
+    def __init__(self, ttl: float = 60.0, stale_ttl: float = 0.0, max_size: int = 10000, name: str = "cache"):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.name = name
+
+        self._entries: "OrderedDict[Hashable, _Entry[V]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        # 统计信息
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.load_errors = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """只读取未过期的缓存，不触发加载"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: V):
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        """
+        读取缓存，未命中时调用 loader 加载
+
+        Args:
+            key: 缓存键
+            loader: 无参协程函数，返回要缓存的值
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    self._start_load(key, loader)
+                return entry.value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_load(key, loader)
+        # shield：某个等待者被取消（如客户端断开）不影响其他等待者和加载任务本身
+        return await asyncio.shield(task)
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Optional[V]]]) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = task
+
+        def done(t: asyncio.Task):
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            # 标记异常已读取，避免无人等待时（后台刷新）输出 "exception was never retrieved"
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning(f"{self.name} 加载 {key} 失败: {t.exception()}")
+
+        task.add_done_callback(done)
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        start = time.perf_counter()
+        try:
+            value = await loader()
+        except Exception:
+            self.load_errors += 1
+            raise
+        finally:
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        served = self.hits + self.stale_hits + self.coalesced
+        avg_load = self.load_seconds / self.loads if self.loads else 0.0
+        return {
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "load_errors": self.load_errors,
+            "avg_load_ms": round(avg_load * 1000, 1),
+            # 被缓存挡下的请求按平均加载耗时估算节省的抓取时间
+            "saved_seconds": round(served * avg_load, 1),
+        }
@@ -1,7 +1,51 @@
+import os
+
 DB_CONFIG = {
     "host": "sh-cynosdbmysql-grp-2ywyko9q.sql.tencentcdb.com",
     "user": "root",
     "password": "ColayKD41!",
     "database": "db_jd",
     "port": 26754,
-}
\ No newline at end of file
+}
+
+# 可以用环境变量覆盖的数据库配置项，便于连接本地 MySQL 测试
+DB_ENV_KEYS = {
+    "host": "JD_DB_HOST",
+    "user": "JD_DB_USER",
+    "password": "JD_DB_PASSWORD",
+    "database": "JD_DB_NAME",
+    "port": "JD_DB_PORT",
+}
+
+
+def get_db_config() -> dict:
+    """返回数据库配置，环境变量（含 .env）中设置的项优先"""
+    config = dict(DB_CONFIG)
+    for key, env_key in DB_ENV_KEYS.items():
+        value = os.environ.get(env_key)
+        if value:
+            config[key] = int(value) if key == "port" else value
+    return config
+
+# 连接池配置
+POOL_CONFIG = {
+    "max_size": 8,  # 最大连接数
+    "recycle": 3600,  # 连接最长存活时间（秒）
+    "ping_interval": 30,  # 空闲超过该时间的连接借出前先 ping（秒）
+    "acquire_timeout": 10,  # 等待空闲连接的超时时间（秒）
+    "connect_timeout": 5,
+    # 驱动层的读写超时，超时后 pymysql 抛出 OperationalError，连接池丢弃该连接，线程池中的调用随之结束
+    "read_timeout": 10,
+    "write_timeout": 10,
+}
+
+# 单次异步调用的超时时间（秒），超时后协程返回，不再阻塞请求。
+# asyncio 的超时无法中断线程池中的 pymysql 调用，需要大于驱动层的 read_timeout，由驱动先结束查询
+QUERY_TIMEOUT = 15
+
+# 商品写入缓冲配置
+WRITE_BEHIND_CONFIG = {
+    "max_batch": 200,  # 单次批量写入的最大行数，缓冲达到该数量时立即刷新
+    "flush_interval": 1.0,  # 定时刷新间隔（秒）
+    "max_pending": 5000,  # 缓冲上限，超过后写入方等待刷新（背压）
+}
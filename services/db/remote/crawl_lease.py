@@ -0,0 +1,138 @@
+import os
+import socket
+from typing import List, Sequence
+
+import services.logger.logger as logger
+from services.db.remote.mysqlutil import MysqlUtil
+
+# 把新商品加入租约表，已存在的行不变。首次抓取时间为商品最近一次抓取时间 + 间隔
+SEED_LEASE_SQL = ("INSERT IGNORE INTO jd_crawl_lease (sku_code, type, next_crawl_at, updated_at) "
+                  "SELECT sku_code, type, GREATEST(update_time, IFNULL(last_seen_time, 0)) + %s, UNIX_TIMESTAMP() "
+                  "FROM jd_products_info "
+                  "WHERE isdel = 0 AND type <> ''")
+
+# 领取到期且没有有效租约的 SKU，其他节点正在领取（已加锁）的行直接跳过
+CLAIM_LEASE_SQL = ("SELECT sku_code, type, owner, attempts FROM jd_crawl_lease "
+                   "WHERE next_crawl_at <= UNIX_TIMESTAMP() AND lease_until < UNIX_TIMESTAMP() "
+                   "ORDER BY next_crawl_at LIMIT %s FOR UPDATE SKIP LOCKED")
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class CrawlLeaseCoordinator:
+    """
+    基于 jd_crawl_lease 表的多节点抓取协调
+
+    多个节点连接同一个 db_jd 时，通过 SELECT ... FOR UPDATE SKIP LOCKED 领取互不重叠的一批 SKU，
+    领取后持有 lease_seconds 秒的租约并定时续租。节点宕机或失联时租约过期，
+    其他节点的下一次领取会自动接手，不需要单独的回收任务。
+
+    所有方法都是阻塞的，在异步代码中通过 AsyncMysqlUtil.run 调用。
+    """
+
+    def __init__(self, mysql: MysqlUtil, node_id: str = "", lease_seconds: int = 120):
+        self.mysql = mysql
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = lease_seconds
+
+        # 统计信息
+        self.claimed = 0
+        self.reclaimed = 0
+        self.completed = 0
+        self.released = 0
+        self.lost = 0
+
+    def seed(self, first_interval: int) -> int:
+        """把 jd_products_info 中尚未登记的商品加入租约表，返回新增行数"""
+        with self.mysql.transaction() as cursor:
+            cursor.execute(SEED_LEASE_SQL, (first_interval,))
+            return cursor.rowcount
+
+    def claim(self, limit: int) -> List[dict]:
+        """
+        领取最多 limit 个到期的 SKU
+
+        :return: [{sku_code, type, owner, attempts}, ...]，owner 为领取前的持有者，非空表示接手了过期租约
+        """
+        with self.mysql.transaction() as cursor:
+            cursor.execute(CLAIM_LEASE_SQL, (limit,))
+            rows = cursor.fetchall()
+            if not rows:
+                return []
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(
+                "UPDATE jd_crawl_lease SET owner = %s, lease_until = UNIX_TIMESTAMP() + %s, "
+                f"attempts = attempts + 1, updated_at = UNIX_TIMESTAMP() WHERE sku_code IN ({placeholders})",
+                (self.node_id, self.lease_seconds, *(row['sku_code'] for row in rows)),
+            )
+        self.claimed += len(rows)
+        reclaimed = [row for row in rows if row['owner'] and row['owner'] != self.node_id]
+        if reclaimed:
+            self.reclaimed += len(reclaimed)
+            logger.info(f"接手 {len(reclaimed)} 个过期租约，原持有者: {sorted({row['owner'] for row in reclaimed})}")
+        return list(rows)
+
+    def heartbeat(self, sku_codes: Sequence[str]) -> List[str]:
+        """为持有的租约续期，返回仍由本节点持有的 sku_code，其余的租约已被其他节点接手"""
+        if not sku_codes:
+            return []
+        placeholders = ", ".join(["%s"] * len(sku_codes))
+        with self.mysql.transaction() as cursor:
+            cursor.execute(
+                "UPDATE jd_crawl_lease SET lease_until = UNIX_TIMESTAMP() + %s "
+                f"WHERE owner = %s AND sku_code IN ({placeholders})",
+                (self.lease_seconds, self.node_id, *sku_codes),
+            )
+            # 同一秒内重复续租时 rowcount 为 0（值未变化），按 owner 重新查询
+            cursor.execute(
+                f"SELECT sku_code FROM jd_crawl_lease WHERE owner = %s AND sku_code IN ({placeholders})",
+                (self.node_id, *sku_codes),
+            )
+            renewed = [row['sku_code'] for row in cursor.fetchall()]
+        if len(renewed) < len(sku_codes):
+            self.lost += len(sku_codes) - len(renewed)
+            logger.warning(f"{len(sku_codes) - len(renewed)} 个抓取租约续期失败，可能已被其他节点接手")
+        return renewed
+
+    def complete(self, sku_code: str, next_crawl_in: int) -> bool:
+        """抓取成功，释放租约并设置下次抓取时间"""
+        done = self._finish(sku_code, next_crawl_in, reset_attempts=True)
+        if done:
+            self.completed += 1
+        return done
+
+    def release(self, sku_code: str, retry_in: int) -> bool:
+        """抓取失败，释放租约并在 retry_in 秒后重试，attempts 保留用于退避"""
+        done = self._finish(sku_code, retry_in, reset_attempts=False)
+        if done:
+            self.released += 1
+        return done
+
+    def _finish(self, sku_code: str, next_crawl_in: int, reset_attempts: bool) -> bool:
+        attempts = "attempts = 0, " if reset_attempts else ""
+        with self.mysql.transaction() as cursor:
+            cursor.execute(
+                f"UPDATE jd_crawl_lease SET owner = NULL, lease_until = 0, {attempts}"
+                "next_crawl_at = UNIX_TIMESTAMP() + %s, updated_at = UNIX_TIMESTAMP() "
+                "WHERE sku_code = %s AND owner = %s",
+                (int(next_crawl_in), sku_code, self.node_id),
+            )
+            if cursor.rowcount:
+                return True
+        # 租约已过期并被其他节点接手，结果仍然写库，但不覆盖对方的租约
+        self.lost += 1
+        logger.warning(f"商品 {sku_code} 的抓取租约已失效")
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "lease_seconds": self.lease_seconds,
+            "claimed": self.claimed,
+            "reclaimed": self.reclaimed,
+            "completed": self.completed,
+            "released": self.released,
+            "lost": self.lost,
+        }
@@ -1,88 +1,182 @@
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from functools import partial, wraps
 
 import services.logger.logger as logger
-from services.db.remote.config import DB_CONFIG
+from services.db.remote.config import POOL_CONFIG, QUERY_TIMEOUT, get_db_config
+from services.db.remote.pool import ConnectionPool
+from services.metrics.metrics import DB_CALL_SECONDS, DB_ERRORS
+from services.model.model_api import ProductQuery
 import pymysql
 
 
+INSERT_SKU_INFO_SQL = ("INSERT INTO jd_products_info "
+                       "(sku_code, sku_name, price, url, brand, type, is_taken_down, create_time, update_time, "
+                       "fingerprint, last_seen_time) "
+                       "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                       "ON DUPLICATE KEY UPDATE "
+                       "price=VALUES(price), update_time=VALUES(update_time), is_taken_down=VALUES(is_taken_down), "
+                       "fingerprint=VALUES(fingerprint), last_seen_time=VALUES(last_seen_time)")
+
+# 只在数据库中的指纹与本次抓取相同时更新 last_seen_time；其他节点已写入不同内容时不匹配，需要完整写入
+TOUCH_SKU_INFO_SQL = "UPDATE jd_products_info SET last_seen_time = %s WHERE sku_code = %s AND fingerprint = %s"
+
+INSERT_PRICE_HISTORY_SQL = ("INSERT INTO jd_price_history (sku_code, ts, price, is_taken_down) "
+                            "VALUES (%s, %s, %s, %s)")
+
+
+def timed(fn):
+    """记录 MysqlUtil 方法的耗时（含等待连接池）和抛出的异常"""
+    method = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            DB_ERRORS.inc(method=method, type=type(e).__name__)
+            raise
+        finally:
+            DB_CALL_SECONDS.observe(time.perf_counter() - start, method=method)
+
+    return wrapper
+
+
 class MysqlUtil:
-    def __init__(self):
-        self.DB_CONFIG = DB_CONFIG
-        self.db = pymysql.connect(**self.DB_CONFIG)
-        self.cursor = self.db.cursor(cursor=pymysql.cursors.DictCursor)
+    def __init__(self, db_config=None, pool_config=None):
+        self.DB_CONFIG = db_config if db_config is not None else get_db_config()
+        self.pool = ConnectionPool(self.DB_CONFIG, **(pool_config if pool_config is not None else POOL_CONFIG))
+
+    @contextmanager
+    def transaction(self):
+        """
+        从连接池借用连接并开启事务，正常结束时提交，出现异常时回滚
+
+        用法：
+            with mysql.transaction() as cursor:
+                cursor.execute(sql, params)
+        """
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    yield cursor
+                conn.commit()
+            except BaseException:
+                with suppress(Exception):
+                    conn.rollback()
+                raise
 
     # 获取单条数据
-    def get_fetchone(self, sql):
-        self.cursor.execute(sql)
-        return self.cursor.fetchone()
+    @timed
+    def get_fetchone(self, sql, params=None):
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
 
     # 获取多条数据
-    def get_fetchall(self, sql, params=None):
+    @timed
+    def get_fetchall(self, sql, params=None, raise_on_error=False):
         """
         执行SQL查询并返回所有结果。
 
         :param sql: SQL查询语句
         :param params: 查询参数（用于参数化查询）
+        :param raise_on_error: 为 True 时抛出异常，调用方可以区分查询失败与空结果
         :return: 查询结果
         """
         try:
-            if params:
-                self.cursor.execute(sql, params)  # 使用参数化查询
-            else:
-                self.cursor.execute(sql)  # 无参数的查询
-            return self.cursor.fetchall()
+            with self.transaction() as cursor:
+                cursor.execute(sql, params)  # params 为 None 时即无参数查询
+                return cursor.fetchall()
         except pymysql.MySQLError as e:
-            print(f"Error: {e}")
+            logger.error(f"查询失败: {e}")
+            if raise_on_error:
+                raise
+            DB_ERRORS.inc(method="get_fetchall", type=type(e).__name__)
             return []
 
-    def sql_execute(self, sql, params):
+    @timed
+    def sql_execute(self, sql, params, raise_on_error=False):
         try:
-            if self.db and self.cursor:
-                self.cursor.execute(sql,params)
-                affected_rows = self.cursor.rowcount
-                self.db.commit()
-                logger.info(f"受影响的行数: {affected_rows}")
-                return affected_rows
+            with self.transaction() as cursor:
+                cursor.execute(sql, params)
+                affected_rows = cursor.rowcount
+            logger.info(f"受影响的行数: {affected_rows}")
+            return affected_rows
         except Exception as e:
-            self.db.rollback()
             logger.error(sql)
             logger.error(e)
             logger.error("sql语句执行错误，已执行回滚操作")
+            if raise_on_error:
+                raise
+            DB_ERRORS.inc(method="sql_execute", type=type(e).__name__)
             return False
 
-    def sql_executemany(self, sql, params_list):
+    @timed
+    def sql_executemany(self, sql, params_list, raise_on_error=False):
         """
         执行批量SQL更新操作。
 
+        INSERT ... VALUES 语句会被 pymysql 合并为多行 INSERT 一次发送。
+
         :param sql: SQL语句，使用%s作为参数占位符
         :param params_list: 参数列表，每个元素是一个元组，对应一条记录的参数
+        :param raise_on_error: 为 True 时回滚后抛出异常，便于调用方重试
         :return: 受影响的行数
         """
-        # logger.info("SQL Statement:")
-        # for params in params_list:
-        #     # 构建一个用于打印的 SQL 语句
-        #     logger.info(sql % params)
         try:
-            self.cursor.executemany(sql, params_list)
-            self.db.commit()  # 提交事务
-            return self.cursor.rowcount  # 返回受影响的行数
+            with self.transaction() as cursor:
+                cursor.executemany(sql, params_list)
+                return cursor.rowcount  # 返回受影响的行数
         except pymysql.MySQLError as e:
-            print(f"Error: {e}")
-            self.db.rollback()  # 回滚事务
+            logger.error(f"批量执行失败，已回滚: {e}")
+            if raise_on_error:
+                raise
+            DB_ERRORS.inc(method="sql_executemany", type=type(e).__name__)
             return 0
 
+    @timed
+    def write_sku_batch(self, sku_params_list, history_params_list=(), seen_params_list=(), seen_time=0):
+        """
+        在一个事务中批量写入商品和价格变化记录，失败时回滚并抛出异常
+
+        :param sku_params_list: INSERT_SKU_INFO_SQL 的参数列表
+        :param history_params_list: INSERT_PRICE_HISTORY_SQL 的参数列表
+        :param seen_params_list: 指纹与本地索引相同的商品（INSERT_SKU_INFO_SQL 的参数），
+                                 数据库中的指纹也相同时只把 last_seen_time 更新为 seen_time，否则完整写入
+        :return: seen_params_list 中因指纹不匹配而完整写入的条数
+        """
+        with self.transaction() as cursor:
+            stale = []
+            for params in seen_params_list:
+                cursor.execute(TOUCH_SKU_INFO_SQL, (seen_time, params[0], params[9]))
+                # 未匹配（指纹已变或行不存在）时 rowcount 为 0；同一秒内重复更新也为 0，完整写入同样正确
+                if cursor.rowcount == 0:
+                    stale.append(params)
+            if sku_params_list or stale:
+                cursor.executemany(INSERT_SKU_INFO_SQL, [*sku_params_list, *stale])
+            if history_params_list:
+                cursor.executemany(INSERT_PRICE_HISTORY_SQL, history_params_list)
+            return len(stale)
+
+    @timed
     def delete_data(self, delete_query):
         try:
-            self.cursor.execute(delete_query)
-            affected_rows = self.cursor.rowcount  # 获取受影响的行数
-            self.db.commit()
+            with self.transaction() as cursor:
+                cursor.execute(delete_query)
+                affected_rows = cursor.rowcount  # 获取受影响的行数
             logger.info(f"删除成功，受影响的行数: {affected_rows}")
             return affected_rows
         except Exception as e:
-            self.db.rollback()
-            logger.error("删除失败:", e)
+            DB_ERRORS.inc(method="delete_data", type=type(e).__name__)
+            logger.error(f"删除失败: {e}")
 
-    def insert_sku_info(self, sku_info):
+    @staticmethod
+    def sku_info_params(sku_info):
+        """把 SkuInfo 字典转换为 INSERT_SKU_INFO_SQL 的参数"""
         res_sku_code = sku_info.get('sku_code', '')
         res_sku_name = sku_info.get('sku_name', '')
         res_price = sku_info.get('price', 0.00)
@@ -90,24 +184,126 @@ class MysqlUtil:
         res_brand = sku_info.get('brand', '')
         res_sku_type = sku_info.get('type', '')
         is_taken_down = sku_info.get('is_taken_down', 0)
+        fingerprint = sku_info.get('fingerprint', '')
         create_time = int(time.time())
         update_time = int(time.time())
-        sql = ("INSERT INTO jd_products_info "
-               "(sku_code, sku_name, price, url, brand, type, is_taken_down, create_time, update_time) "
-               "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
-               "ON DUPLICATE KEY UPDATE "
-               "price=VALUES(price), update_time=VALUES(update_time), is_taken_down=VALUES(is_taken_down)")
-        params = (res_sku_code, res_sku_name, res_price, res_url, res_brand, res_sku_type, is_taken_down, create_time, update_time)
-        self.sql_execute(sql, params)
-
-    def query_sku_info_by_type(self, type):
-        sql = "SELECT * FROM jd_products_info WHERE type = %s and isdel = 0 order by price asc"
+        return (res_sku_code, res_sku_name, res_price, res_url, res_brand, res_sku_type, is_taken_down, create_time,
+                update_time, fingerprint, update_time)
+
+    @timed
+    def insert_sku_info(self, sku_info, raise_on_error=False):
+        return self.sql_execute(INSERT_SKU_INFO_SQL, self.sku_info_params(sku_info), raise_on_error)
+
+    @timed
+    def query_sku_info_by_type(self, type, raise_on_error=False):
+        sql = "SELECT sku_code, sku_name, price FROM jd_products_info WHERE type = %s and isdel = 0 order by price asc"
         params = (type,)
-        return self.get_fetchall(sql, params)
+        return self.get_fetchall(sql, params, raise_on_error)
+
+    @timed
+    def query_sku_info_page(self, query: ProductQuery, raise_on_error=False):
+        """
+        按 (price, sku_code) 游标分页查询商品列表
+
+        依赖 schema.sql 中的 idx_type_isdel_price_sku (type, isdel, price, sku_code) 索引，
+        WHERE 与 ORDER BY 都命中索引，不需要 filesort，也不会随页码增加而变慢。
+        多查一条用来判断是否还有下一页。
+        """
+        conditions = ["type = %s", "isdel = 0"]
+        params = [query.type]
+        if query.min_price is not None:
+            conditions.append("price >= %s")
+            params.append(query.min_price)
+        if query.max_price is not None:
+            conditions.append("price <= %s")
+            params.append(query.max_price)
+        if query.brand:
+            conditions.append("brand = %s")
+            params.append(query.brand)
+        if query.is_taken_down is not None:
+            conditions.append("is_taken_down = %s")
+            params.append(query.is_taken_down)
+        if query.after_price is not None and query.after_sku_code is not None:
+            conditions.append("(price > %s OR (price = %s AND sku_code > %s))")
+            params.extend([query.after_price, query.after_price, query.after_sku_code])
+        sql = ("SELECT sku_code, sku_name, price FROM jd_products_info "
+               f"WHERE {' AND '.join(conditions)} "
+               "ORDER BY price ASC, sku_code ASC LIMIT %s")
+        params.append(query.limit + 1)
+        return self.get_fetchall(sql, tuple(params), raise_on_error)
+
+    @timed
+    def query_all_sku_info(self):
+        """加载商品索引使用，只查询需要的列。查询失败时抛出异常，避免把空结果当成空索引"""
+        sql = ("SELECT sku_code, sku_name, price, brand, type, is_taken_down, isdel, update_time, "
+               "fingerprint, last_seen_time FROM jd_products_info")
+        with self.transaction() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def close(self):
+        self.pool.close()
+
+
+class AsyncMysqlUtil:
+    """
+    MysqlUtil 的异步封装
+
+    pymysql 是阻塞的，这里把每次调用放到与连接池同样大小的线程池中执行，
+    并用 asyncio.wait_for 限制单次查询耗时，避免数据库往返阻塞事件循环。
+
+    与同步接口不同，查询和执行失败时抛出异常（pymysql.MySQLError、PoolTimeoutError 或 asyncio.TimeoutError），
+    不返回空结果，调用方可以区分失败与没有数据。
+    """
+
+    def __init__(self, mysql: MysqlUtil = None, query_timeout: float = QUERY_TIMEOUT):
+        self.sync = mysql if mysql is not None else MysqlUtil()
+        self.query_timeout = query_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.sync.pool.max_size, thread_name_prefix="mysql")
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return self.sync.pool
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        在数据库线程池中执行阻塞函数，超时抛出 asyncio.TimeoutError
+
+        超时后线程中的调用不会被中断，由连接池的 read_timeout/write_timeout 结束查询并丢弃连接，
+        因此 query_timeout 应大于驱动层的超时。
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout=self.query_timeout)
+
+    async def get_fetchone(self, sql, params=None):
+        return await self.run(self.sync.get_fetchone, sql, params)
+
+    async def get_fetchall(self, sql, params=None):
+        return await self.run(self.sync.get_fetchall, sql, params, True)
+
+    async def sql_execute(self, sql, params):
+        return await self.run(self.sync.sql_execute, sql, params, True)
+
+    async def sql_executemany(self, sql, params_list, raise_on_error=False):
+        return await self.run(self.sync.sql_executemany, sql, params_list, raise_on_error)
+
+    async def write_sku_batch(self, sku_params_list, history_params_list=(), seen_params_list=(), seen_time=0):
+        return await self.run(self.sync.write_sku_batch, sku_params_list, history_params_list,
+                              seen_params_list, seen_time)
+
+    async def insert_sku_info(self, sku_info):
+        return await self.run(self.sync.insert_sku_info, sku_info, True)
+
+    async def query_sku_info_by_type(self, type):
+        return await self.run(self.sync.query_sku_info_by_type, type, True)
+
+    async def query_sku_info_page(self, query: ProductQuery):
+        return await self.run(self.sync.query_sku_info_page, query, True)
+
+    async def query_all_sku_info(self):
+        return await self.run(self.sync.query_all_sku_info)
 
-    @staticmethod
     def close(self):
-        if self.cursor is not None:
-            self.cursor.close()
-        if self.db is not None:
-            self.db.close()
+        self._executor.shutdown(wait=False)
+        self.sync.close()
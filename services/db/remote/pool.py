@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import pymysql
+
+import services.logger.logger as logger
+
+
+class PoolTimeoutError(Exception):
+    """等待连接超时时抛出的异常"""
+
+
+@dataclass
+class _PooledConnection:
+    conn: pymysql.connections.Connection
+    created_at: float
+    last_used: float
+
+
+class ConnectionPool:
+    """
+    线程安全的 pymysql 连接池
+
+    - 最多 max_size 个连接，连接用尽时等待 acquire_timeout 秒
+    - 创建超过 recycle 秒的连接在借出时关闭重建，避免被服务端 wait_timeout 断开
+    - 空闲超过 ping_interval 秒的连接借出前先 ping 一次（pre-ping），失效则重建
+    - 连接在使用中抛出连接类异常时直接丢弃，不放回池中
+    - 连接按需创建，初始化时不连接数据库
+    """
+
+    def __init__(self, db_config: dict,
+                 max_size: int = 8,
+                 recycle: float = 3600,
+                 ping_interval: float = 30,
+                 acquire_timeout: float = 10,
+                 connect_timeout: int = 5,
+                 read_timeout: int = 10,
+                 write_timeout: int = 10):
+        self.db_config = dict(db_config)
+        self.max_size = max_size
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+        self.connect_kwargs = {
+            "connect_timeout": connect_timeout,
+            "read_timeout": read_timeout,
+            "write_timeout": write_timeout,
+            "cursorclass": pymysql.cursors.DictCursor,
+        }
+
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # 统计信息
+        self.created = 0
+        self.recycled = 0
+        self.broken = 0
+        self.in_use = 0
+
+    def _connect(self) -> _PooledConnection:
+        conn = pymysql.connect(**self.db_config, **self.connect_kwargs)
+        now = time.monotonic()
+        with self._lock:
+            self.created += 1
+        return _PooledConnection(conn, now, now)
+
+    @staticmethod
+    def _close(item: _PooledConnection):
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            try:
+                item = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            now = time.monotonic()
+            if now - item.created_at > self.recycle:
+                self._close(item)
+                with self._lock:
+                    self.recycled += 1
+                continue
+            if now - item.last_used > self.ping_interval:
+                try:
+                    item.conn.ping(reconnect=False)
+                except Exception:
+                    self._close(item)
+                    with self._lock:
+                        self.broken += 1
+                    continue
+            return item
+
+    @contextmanager
+    def connection(self):
+        """
+        借用一个连接
+
+        用法：
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql)
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeoutError(f"等待数据库连接超时（{self.acquire_timeout}s）")
+        try:
+            item = self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        try:
+            yield item.conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # 连接已断开或超时，丢弃该连接
+            self._close(item)
+            with self._lock:
+                self.broken += 1
+            item = None
+            raise
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            if item is not None:
+                if self._closed:
+                    self._close(item)
+                else:
+                    item.last_used = time.monotonic()
+                    self._idle.put(item)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "idle": self._idle.qsize(),
+            "in_use": self.in_use,
+            "created": self.created,
+            "recycled": self.recycled,
+            "broken": self.broken,
+        }
+
+    def close(self):
+        """关闭所有空闲连接，使用中的连接在归还时关闭"""
+        self._closed = True
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        logger.info("数据库连接池已关闭")
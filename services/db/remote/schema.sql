@@ -0,0 +1,61 @@
+-- jd_products_info 索引
+--
+-- /v1/getProductList 的游标分页：
+--   WHERE type = ? AND isdel = 0 [AND price BETWEEN ? AND ?] AND (price, sku_code) > (?, ?)
+--   ORDER BY price, sku_code LIMIT ?
+-- 等值列 (type, isdel) 在前，排序列 (price, sku_code) 在后，范围扫描直接按索引顺序读取，
+-- 无需 filesort，翻页成本与页码无关。brand / is_taken_down 过滤在索引扫描之后进行。
+ALTER TABLE jd_products_info
+    ADD INDEX idx_type_isdel_price_sku (type, isdel, price, sku_code);
+
+-- 多节点抓取租约（需要 MySQL 8.0+，依赖 SELECT ... FOR UPDATE SKIP LOCKED）
+--
+-- 每个 SKU 一行。节点领取 next_crawl_at 已到期且租约已过期（lease_until < 当前时间）的行，
+-- 写入 owner 与 lease_until 后抓取，抓取期间定时续租，完成后清空 owner 并写入下次抓取时间。
+-- 节点宕机后租约自然过期，其他节点下次领取时直接接手。时间统一取数据库的 UNIX_TIMESTAMP()，
+-- 不受各节点时钟偏差影响。
+CREATE TABLE IF NOT EXISTS jd_crawl_lease (
+    sku_code      VARCHAR(64)  NOT NULL,
+    type          INT          NOT NULL DEFAULT 0,
+    owner         VARCHAR(128) NULL,
+    lease_until   INT          NOT NULL DEFAULT 0,
+    next_crawl_at INT          NOT NULL DEFAULT 0,
+    attempts      INT          NOT NULL DEFAULT 0,
+    updated_at    INT          NOT NULL DEFAULT 0,
+    PRIMARY KEY (sku_code),
+    KEY idx_next_crawl_lease (next_crawl_at, lease_until)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
+
+-- 价格历史
+--
+-- jd_price_history 只在价格或下架状态变化时写入一行，随商品数据在同一事务中批量写入。
+-- 超过 History.CompactAfter 的原始行由 HistoryCompactor 按 SKU、按 History.BlockSpan 合并为
+-- jd_price_history_block 中的一个压缩块（services/history/codec.py，时间差/价格差 varint + zlib），
+-- 随后删除原始行。/v1/getPriceHistory 读取与查询范围重叠的块和原始行。
+CREATE TABLE IF NOT EXISTS jd_price_history (
+    id            BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    sku_code      VARCHAR(64)     NOT NULL,
+    ts            INT             NOT NULL,
+    price         DECIMAL(10, 2)  NOT NULL DEFAULT 0,
+    is_taken_down TINYINT         NOT NULL DEFAULT 0,
+    PRIMARY KEY (id),
+    KEY idx_sku_ts (sku_code, ts),
+    KEY idx_ts (ts)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS jd_price_history_block (
+    sku_code    VARCHAR(64) NOT NULL,
+    start_ts    INT         NOT NULL,
+    end_ts      INT         NOT NULL,
+    point_count INT         NOT NULL,
+    data        BLOB        NOT NULL,
+    PRIMARY KEY (sku_code, start_ts)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
+
+-- 抓取内容指纹
+--
+-- fingerprint 为名称、价格、下架状态的 blake2b 摘要（SkuInfo.fingerprint）。重复抓取结果指纹不变时
+-- 不再 upsert 整行，只批量更新 last_seen_time；update_time 表示内容最后一次变化的时间。
+ALTER TABLE jd_products_info
+    ADD COLUMN fingerprint    CHAR(16) NOT NULL DEFAULT '',
+    ADD COLUMN last_seen_time INT      NOT NULL DEFAULT 0;
@@ -0,0 +1,255 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import services.logger.logger as logger
+from global_conf import global_vars
+from services.db.remote.config import WRITE_BEHIND_CONFIG
+from services.db.remote.mysqlutil import AsyncMysqlUtil, MysqlUtil
+
+
+class SkuWriteBehind:
+    """
+    商品写入缓冲（write-behind）
+
+    submit 只把 SkuInfo 放入内存缓冲就返回，后台任务在缓冲达到 max_batch 条或距上次刷新超过
+    flush_interval 秒时，通过 write_sku_batch 以多行 INSERT ... ON DUPLICATE KEY UPDATE 批量写入。
+    每批写入成功后调用 on_written(已写入的 SkuInfo 列表, 只更新 last_seen_time 的 sku_code 列表)，
+    调用方据此更新内存中的商品索引，索引不会领先于数据库。
+
+    - 同一个 sku_code 在刷新前多次提交时只保留最后一次
+    - record_history=True 的提交额外记录一个价格变化点，与商品数据在同一事务中写入 jd_price_history
+    - mark_seen 记录指纹与本地索引相同的商品，刷新时数据库中的指纹也相同才只更新 last_seen_time，
+      否则（其他节点已写入不同内容）按普通提交完整写入
+    - 商品和价格变化点合计达到 max_pending 条时 submit 等待刷新完成（背压），写库持续失败时缓冲不会无限增长
+    - 写入失败的批次放回缓冲，下次刷新重试（不覆盖期间提交的新数据）
+    - 进程没有调用 close 就退出时，通过 global_vars 注册的清理函数同步刷新剩余数据；
+      close 之后连接池由调用方关闭，清理函数随 close 一起移除
+    """
+
+    def __init__(self, mysql: AsyncMysqlUtil,
+                 max_batch: int = WRITE_BEHIND_CONFIG["max_batch"],
+                 flush_interval: float = WRITE_BEHIND_CONFIG["flush_interval"],
+                 max_pending: int = WRITE_BEHIND_CONFIG["max_pending"],
+                 on_written: Optional[Callable[[List[dict], List[str]], None]] = None):
+        self.mysql = mysql
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_written = on_written
+
+        # sku_code -> (INSERT_SKU_INFO_SQL 的参数, SkuInfo 字典)
+        self._buffer: Dict[str, Tuple[tuple, dict]] = {}
+        self._history: List[tuple] = []
+        self._seen: Dict[str, Tuple[tuple, dict]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._closed = False
+
+        # 统计信息
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.history_written = 0
+        self.seen_written = 0
+        self.seen_stale = 0
+        self.batches = 0
+        self.failures = 0
+        self.backpressure_waits = 0
+        self.last_batch_size = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+
+        global_vars.set_cleanup(global_vars.SKU_WRITE_BEHIND_CLEANUP_KEY, self.flush_sync)
+
+    def _ensure_started(self):
+        """在第一次提交所在的事件循环中启动刷新任务"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, sku_info: dict, record_history: bool = False):
+        """提交一条 SkuInfo 字典，缓冲已满时等待，等待期间 close() 时抛出 RuntimeError"""
+        if self._closed:
+            raise RuntimeError("SkuWriteBehind is closed")
+        self._ensure_started()
+        while self.backlog >= self.max_pending:
+            self.backpressure_waits += 1
+            self._drained.clear()
+            self._wakeup.set()
+            await self._drained.wait()
+            if self._closed:
+                # close() 结束时唤醒所有等待者，数据库不可用时缓冲不会再被清空
+                raise RuntimeError("SkuWriteBehind is closed")
+
+        params = MysqlUtil.sku_info_params(sku_info)
+        with self._lock:
+            if params[0] in self._buffer:
+                self.coalesced += 1
+            self._buffer[params[0]] = (params, sku_info)
+            self.submitted += 1
+            if record_history:
+                # params: (sku_code, sku_name, price, url, brand, type, is_taken_down, create_time, update_time)
+                self._history.append((params[0], params[8], params[2], params[6]))
+            pending = len(self._buffer)
+        if pending >= self.max_batch:
+            self._wakeup.set()
+
+    def mark_seen(self, sku_info: dict):
+        """记录一次内容未变化的抓取（SkuInfo 字典，含 fingerprint），不阻塞、不触发背压"""
+        if self._closed:
+            return
+        self._ensure_started()
+        params = MysqlUtil.sku_info_params(sku_info)
+        with self._lock:
+            self._seen[params[0]] = (params, sku_info)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def backlog(self) -> int:
+        """背压计数：待写入的商品和价格变化点（写入失败时价格变化点会随重试累积）"""
+        return len(self._buffer) + len(self._history)
+
+    def get_pending(self, sku_code: str) -> Optional[dict]:
+        """已提交但尚未写入数据库的 SkuInfo"""
+        with self._lock:
+            entry = self._buffer.get(sku_code)
+        return entry[1] if entry is not None else None
+
+    def _take_batch(self) -> Tuple[List[Tuple[tuple, dict]], List[tuple], List[Tuple[tuple, dict]]]:
+        with self._lock:
+            batch = [self._buffer.pop(sku_code) for sku_code in list(self._buffer)[:self.max_batch]]
+            history, self._history = self._history[:self.max_batch], self._history[self.max_batch:]
+            seen = [self._seen.pop(sku_code) for sku_code in list(self._seen)[:self.max_batch]]
+            return batch, history, seen
+
+    def _requeue(self, batch: List[Tuple[tuple, dict]], history: List[tuple], seen: List[Tuple[tuple, dict]]):
+        with self._lock:
+            for entry in batch:
+                # 期间又提交了新数据时以新数据为准
+                self._buffer.setdefault(entry[0][0], entry)
+            self._history[:0] = history
+            for entry in seen:
+                self._seen.setdefault(entry[0][0], entry)
+
+    @staticmethod
+    def _batch_args(batch: List[Tuple[tuple, dict]], history: List[tuple], seen: List[Tuple[tuple, dict]]) -> tuple:
+        """write_sku_batch 的参数"""
+        return [params for params, _ in batch], history, [params for params, _ in seen], int(time.time())
+
+    def _written(self, batch: List[Tuple[tuple, dict]], history: List[tuple], seen: List[Tuple[tuple, dict]],
+                 stale: int, elapsed: float):
+        """一批数据写入成功：更新统计并通知 on_written"""
+        self._record_flush(len(batch), len(history), len(seen), stale, elapsed)
+        if self.on_written is not None:
+            try:
+                self.on_written([record for _, record in batch], [params[0] for params, _ in seen])
+            except Exception as e:
+                logger.error(f"更新写入结果失败: {e}")
+
+    def _record_flush(self, size: int, history_size: int, seen_size: int, stale: int, elapsed: float):
+        self.batches += 1
+        self.written += size
+        self.history_written += history_size
+        self.seen_written += seen_size - stale
+        self.seen_stale += stale
+        self.last_batch_size = size
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+
+    async def flush(self) -> int:
+        """把缓冲中的数据全部写入数据库，返回写入的行数"""
+        written = 0
+        while True:
+            batch, history, seen = self._take_batch()
+            if not batch and not history and not seen:
+                break
+            start = time.perf_counter()
+            try:
+                stale = await self.mysql.write_sku_batch(*self._batch_args(batch, history, seen))
+            except Exception as e:
+                self.failures += 1
+                self._requeue(batch, history, seen)
+                logger.error(f"批量写入 {len(batch)} 条商品失败，稍后重试: {e}")
+                break
+            self._written(batch, history, seen, stale, time.perf_counter() - start)
+            written += len(batch)
+        if self._drained is not None and self.backlog < self.max_pending:
+            self._drained.set()
+        return written
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"刷新商品写入缓冲失败: {e}")
+
+    def flush_sync(self):
+        """同步刷新，供进程退出时的清理函数使用"""
+        while True:
+            batch, history, seen = self._take_batch()
+            if not batch and not history and not seen:
+                return
+            start = time.perf_counter()
+            stale = self.mysql.sync.write_sku_batch(*self._batch_args(batch, history, seen))
+            self._written(batch, history, seen, stale, time.perf_counter() - start)
+
+    async def close(self):
+        """停止后台任务并写入剩余数据"""
+        self._closed = True
+        try:
+            if self._task is not None and self._loop is asyncio.get_running_loop():
+                self._wakeup.set()
+                await asyncio.gather(self._task, return_exceptions=True)
+                await self.flush()
+            else:
+                # 刷新任务属于其他事件循环（或尚未启动），在数据库线程池中同步刷新
+                await self.mysql.run(self.flush_sync)
+        finally:
+            # 调用方随后关闭连接池，退出时不再通过清理函数刷新
+            global_vars.remove_cleanup(global_vars.SKU_WRITE_BEHIND_CLEANUP_KEY)
+            remaining = self.backlog + len(self._seen)
+            if remaining:
+                logger.error(f"商品写入缓冲关闭时仍有 {remaining} 条数据未能写入")
+            # 无论最后一次写入是否成功，都唤醒等待背压的 submit，由其抛出 RuntimeError
+            if self._drained is not None:
+                if self._loop is asyncio.get_running_loop():
+                    self._drained.set()
+                elif not self._loop.is_closed():
+                    self._loop.call_soon_threadsafe(self._drained.set)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "history_written": self.history_written,
+            "history_pending": len(self._history),
+            "seen_written": self.seen_written,
+            "seen_pending": len(self._seen),
+            "seen_stale": self.seen_stale,
+            "batches": self.batches,
+            "failures": self.failures,
+            "backpressure_waits": self.backpressure_waits,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0,
+            "avg_flush_ms": round(self.flush_seconds_total / self.batches * 1000, 1) if self.batches else 0,
+            "max_flush_ms": round(self.flush_seconds_max * 1000, 1),
+        }
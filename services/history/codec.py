@@ -0,0 +1,101 @@
+"""
+价格历史块编码
+
+一个块保存同一 SKU 一段时间内按时间排序的价格变化点 (ts, price, is_taken_down)：
+
+    版本号(1 字节) | 点数(varint) | 首个时间戳(varint) | 首个价格(分, zigzag varint) | 后续点...
+
+后续每个点保存与前一个点的差值：时间差(varint)，价格差(分)经 zigzag 后左移一位、最低位存下架标记(varint)。
+价格变化点之间的时间差和价格差通常很小，大多数点只占 2~4 个字节，整块再用 zlib 压缩。
+"""
+
+import zlib
+from typing import List, Tuple
+
+BLOCK_VERSION = 1
+
+# (时间戳, 价格（元）, 是否下架)
+PricePoint = Tuple[int, float, int]
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+def _write_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def to_cents(price: float) -> int:
+    return int(round(float(price) * 100))
+
+
+def encode_block(points: List[PricePoint]) -> bytes:
+    """把按时间升序排列的价格点编码为压缩块"""
+    out = bytearray([BLOCK_VERSION])
+    _write_varint(out, len(points))
+    prev_ts = prev_cents = 0
+    for i, (ts, price, is_taken_down) in enumerate(points):
+        cents = to_cents(price)
+        if i == 0:
+            _write_varint(out, ts)
+            _write_varint(out, (_zigzag(cents) << 1) | (1 if is_taken_down else 0))
+        else:
+            _write_varint(out, ts - prev_ts)
+            _write_varint(out, (_zigzag(cents - prev_cents) << 1) | (1 if is_taken_down else 0))
+        prev_ts, prev_cents = ts, cents
+    return zlib.compress(bytes(out))
+
+
+def decode_block(data: bytes) -> List[PricePoint]:
+    raw = zlib.decompress(data)
+    if not raw or raw[0] != BLOCK_VERSION:
+        raise ValueError(f"Unsupported price block version: {raw[0] if raw else None}")
+    count, pos = _read_varint(raw, 1)
+    points: List[PricePoint] = []
+    ts = cents = 0
+    for i in range(count):
+        ts_value, pos = _read_varint(raw, pos)
+        packed, pos = _read_varint(raw, pos)
+        flag = packed & 1
+        value = _unzigzag(packed >> 1)
+        if i == 0:
+            ts, cents = ts_value, value
+        else:
+            ts += ts_value
+            cents += value
+        points.append((ts, cents / 100, flag))
+    return points
+
+
+def dedupe_points(points: List[PricePoint]) -> List[PricePoint]:
+    """按时间排序并去掉与前一个点价格、下架状态都相同的点，只保留变化点"""
+    result: List[PricePoint] = []
+    for point in sorted(points, key=lambda p: p[0]):
+        if result and result[-1][1:] == point[1:]:
+            continue
+        if result and result[-1][0] == point[0]:
+            # 同一秒内多次变化只保留最后一次
+            result[-1] = point
+            continue
+        result.append(point)
+    return result
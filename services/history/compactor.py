@@ -0,0 +1,54 @@
+import asyncio
+from typing import Optional
+
+import services.logger.logger as logger
+from services.db.remote.mysqlutil import AsyncMysqlUtil
+from services.history.store import PriceHistoryStore
+
+
+class HistoryCompactor:
+    """定时把过期的原始价格点压缩进历史块，每轮处理到没有待压缩数据为止"""
+
+    def __init__(self, mysql: AsyncMysqlUtil, store: PriceHistoryStore, interval: float = 3600, batch: int = 200):
+        self.mysql = mysql
+        self.store = store
+        self.interval = interval
+        self.batch = batch
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        loop = self._task.get_loop()
+        if loop is not asyncio.get_running_loop():
+            # 由其他事件循环调用时只请求取消，不等待
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._task.cancel)
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def compact_once(self) -> int:
+        total = 0
+        while True:
+            processed = await self.mysql.run(self.store.compact, self.batch)
+            total += processed
+            if processed < self.batch:
+                return total
+
+    async def _run(self):
+        while True:
+            try:
+                compacted = await self.compact_once()
+                self.runs += 1
+                if compacted:
+                    logger.info(f"已压缩 {compacted} 个商品的价格历史")
+            except Exception as e:
+                # 查询失败时跳过本轮，下一轮重新查询待压缩的商品
+                logger.error(f"压缩价格历史失败，跳过本轮: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,184 @@
+import time
+from typing import Dict, List, Optional
+
+import services.logger.logger as logger
+from services.db.remote.mysqlutil import MysqlUtil
+from services.history.codec import PricePoint, decode_block, dedupe_points, encode_block
+
+UPSERT_BLOCK_SQL = ("INSERT INTO jd_price_history_block (sku_code, start_ts, end_ts, point_count, data) "
+                    "VALUES (%s, %s, %s, %s, %s) "
+                    "ON DUPLICATE KEY UPDATE end_ts=VALUES(end_ts), point_count=VALUES(point_count), data=VALUES(data)")
+
+
+class PriceHistoryStore:
+    """
+    价格历史存储
+
+    - jd_price_history：最近的原始变化点，每次价格或下架状态变化写一行（由 SkuWriteBehind 随商品一起写入）
+    - jd_price_history_block：压缩后的历史，每个 SKU 按 block_span 秒一个块，块内为 codec 编码的变化点
+
+    compact 把早于 compact_after 秒的原始点合并进对应的块并删除原始行，
+    查询时读取与时间范围重叠的块和原始点合并，多年的历史也只需要读取几十个块。
+    所有方法都是阻塞的，在异步代码中通过 AsyncMysqlUtil.run 调用。
+    """
+
+    def __init__(self, mysql: MysqlUtil, block_span: int = 30 * 86400, compact_after: int = 7 * 86400):
+        self.mysql = mysql
+        self.block_span = block_span
+        self.compact_after = compact_after
+
+        # 统计信息
+        self.compacted_points = 0
+        self.compacted_blocks = 0
+
+    def _block_start(self, ts: int) -> int:
+        return ts - ts % self.block_span
+
+    # ---- 压缩 ----
+
+    def compact(self, batch: int = 200, now: Optional[float] = None) -> int:
+        """
+        压缩最多 batch 个 SKU 的过期原始点
+
+        :return: 本次处理的 SKU 数量，等于 batch 时说明还有待压缩的数据
+        查询待压缩的商品失败时抛出异常，由 HistoryCompactor 跳过本轮
+        """
+        cutoff = int((now if now is not None else time.time()) - self.compact_after)
+        rows = self.mysql.get_fetchall(
+            "SELECT DISTINCT sku_code FROM jd_price_history WHERE ts < %s LIMIT %s", (cutoff, batch),
+            raise_on_error=True,
+        )
+        for row in rows:
+            try:
+                self._compact_sku(row['sku_code'], cutoff)
+            except Exception as e:
+                logger.error(f"压缩商品 {row['sku_code']} 的价格历史失败: {e}")
+        return len(rows)
+
+    def _compact_sku(self, sku_code: str, cutoff: int):
+        with self.mysql.transaction() as cursor:
+            cursor.execute(
+                "SELECT id, ts, price, is_taken_down FROM jd_price_history "
+                "WHERE sku_code = %s AND ts < %s ORDER BY ts, id FOR UPDATE",
+                (sku_code, cutoff),
+            )
+            raw_rows = cursor.fetchall()
+            if not raw_rows:
+                return
+
+            by_block: Dict[int, List[PricePoint]] = {}
+            for row in raw_rows:
+                point = (int(row['ts']), float(row['price']), int(row['is_taken_down']))
+                by_block.setdefault(self._block_start(point[0]), []).append(point)
+
+            placeholders = ", ".join(["%s"] * len(by_block))
+            cursor.execute(
+                "SELECT start_ts, data FROM jd_price_history_block "
+                f"WHERE sku_code = %s AND start_ts IN ({placeholders}) FOR UPDATE",
+                (sku_code, *by_block),
+            )
+            existing = {int(row['start_ts']): decode_block(row['data']) for row in cursor.fetchall()}
+
+            params = []
+            for start_ts, points in by_block.items():
+                merged = dedupe_points(existing.get(start_ts, []) + points)
+                params.append((sku_code, start_ts, merged[-1][0], len(merged), encode_block(merged)))
+            cursor.executemany(UPSERT_BLOCK_SQL, params)
+
+            ids = [row['id'] for row in raw_rows]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"DELETE FROM jd_price_history WHERE id IN ({placeholders})", ids)
+        self.compacted_points += len(raw_rows)
+        self.compacted_blocks += len(by_block)
+
+    # ---- 查询 ----
+
+    def query(self, sku_code: str, start: int, end: int) -> List[PricePoint]:
+        """
+        查询 [start, end] 内的价格变化点
+
+        结果的第一个点是 start 时刻的价格（取 start 之前最后一个变化点，时间戳记为 start），
+        便于按阶梯函数绘制。查询失败时抛出异常，不会当作没有历史返回空结果。
+        """
+        blocks = self.mysql.get_fetchall(
+            "SELECT data FROM jd_price_history_block "
+            "WHERE sku_code = %s AND start_ts <= %s AND end_ts >= %s ORDER BY start_ts",
+            (sku_code, end, start),
+            raise_on_error=True,
+        )
+        # start 之前最后一个块，用来确定 start 时刻的价格
+        previous_block = self.mysql.get_fetchone(
+            "SELECT data FROM jd_price_history_block "
+            "WHERE sku_code = %s AND start_ts < %s ORDER BY start_ts DESC LIMIT 1",
+            (sku_code, start),
+        )
+        points: List[PricePoint] = []
+        for block in ([previous_block] if previous_block else []) + list(blocks):
+            points.extend(decode_block(block['data']))
+
+        raw_rows = list(self.mysql.get_fetchall(
+            "SELECT ts, price, is_taken_down FROM jd_price_history "
+            "WHERE sku_code = %s AND ts BETWEEN %s AND %s ORDER BY ts",
+            (sku_code, start, end),
+            raise_on_error=True,
+        ))
+        previous_raw = self.mysql.get_fetchone(
+            "SELECT ts, price, is_taken_down FROM jd_price_history "
+            "WHERE sku_code = %s AND ts < %s ORDER BY ts DESC LIMIT 1",
+            (sku_code, start),
+        )
+        if previous_raw:
+            raw_rows.append(previous_raw)
+        points.extend((int(row['ts']), float(row['price']), int(row['is_taken_down'])) for row in raw_rows)
+
+        points = dedupe_points(points)
+        before = [p for p in points if p[0] < start]
+        in_range = [p for p in points if start <= p[0] <= end]
+        if before and (not in_range or in_range[0][0] > start):
+            in_range.insert(0, (start, before[-1][1], before[-1][2]))
+        return in_range
+
+    def stats(self) -> dict:
+        return {
+            "compacted_points": self.compacted_points,
+            "compacted_blocks": self.compacted_blocks,
+        }
+
+
+def downsample(points: List[PricePoint], start: int, end: int, buckets: int) -> List[dict]:
+    """
+    把价格变化点按时间等分为 buckets 段，每段返回开、高、低、收价
+
+    价格按阶梯函数处理：没有变化点的段沿用上一段的收盘价，在第一个点之前的段不返回。
+    """
+    if buckets <= 0 or end <= start:
+        return []
+    width = (end - start) / buckets
+    result = []
+    i = 0
+    last: Optional[PricePoint] = None
+    for b in range(buckets):
+        bucket_start = start + b * width
+        bucket_end = start + (b + 1) * width
+        open_price = last[1] if last is not None else None
+        high = low = open_price
+        while i < len(points) and (points[i][0] < bucket_end or b == buckets - 1):
+            price = points[i][1]
+            if open_price is None:
+                open_price = high = low = price
+            else:
+                high = max(high, price)
+                low = min(low, price)
+            last = points[i]
+            i += 1
+        if open_price is None:
+            continue
+        result.append({
+            "ts": int(bucket_start),
+            "open": open_price,
+            "high": high,
+            "low": low,
+            "close": last[1],
+            "is_taken_down": last[2],
+        })
+    return result
@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 from conf.appConf import Mode
 from global_conf import global_vars
 from services.buffApi import update
+from services.logger.logger import log_level_to_python
+from services.logger.queued import (DATE_FORMAT, TEXT_FORMAT, BatchStreamHandler, JsonFormatter, QueuedLogging,
+                                    RotatingCompressedFileHandler)
 
 DEFAULT_TZ = "Asia/Shanghai"
 ENV_FILE = ".env"
@@ -53,45 +56,47 @@ def init_log(app_name: str):
     """
     初始化日志
 
+    日志记录先进入有界队列，由后台线程批量写入控制台和按大小/时间轮转的日志文件
+
     Args:
         app_name: 应用名称
     """
+    log_conf = global_vars.Conf.log
     # 获取日志级别
-    log_level = logging.DEBUG if global_vars.is_dev_mode() else logging.INFO
+    log_level = logging.DEBUG if global_vars.is_dev_mode() else log_level_to_python(log_conf.Level)
 
     # 设置日志格式
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-    # 创建日志处理器
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
+    if log_conf.Json:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    handlers = []
+    if log_conf.Console:
+        handlers.append(BatchStreamHandler(sys.stdout))
+
+    # 日志文件
+    log_dir = os.path.join(os.getcwd(), log_conf.Dir)
+    handlers.append(RotatingCompressedFileHandler(
+        os.path.join(log_dir, f"{app_name}.log"),
+        max_bytes=log_conf.MaxBytes,
+        when=log_conf.RotateWhen,
+        backup_count=log_conf.BackupCount,
+        compress=log_conf.Compress,
+    ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
     # 设置日志记录器
     global_vars.Logger = logging.getLogger(app_name)
     global_vars.Logger.setLevel(log_level)
-    global_vars.Logger.addHandler(handler)
-
-    # 获取日志文件路径
-    log_dir = os.path.join(os.getcwd(), "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    from datetime import datetime
-    log_file = os.path.join(log_dir, f"{app_name}_{datetime.now().strftime('%Y-%m-%d')}.log")
-
-    # 创建文件处理器
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(formatter)
-    global_vars.Logger.addHandler(file_handler)
-
-    # 设置清理函数
-    def cleanup_log():
-        for handler in global_vars.Logger.handlers:
-            handler.close()
-            global_vars.Logger.removeHandler(handler)
-
-    global_vars.set_cleanup(global_vars.LOG_WRITER_CLEANUP_KEY, cleanup_log)
+    global_vars.LogPipeline = QueuedLogging(
+        global_vars.Logger, handlers, queue_size=log_conf.QueueSize, batch_size=log_conf.BatchSize,
+    )
+    global_vars.LogPipeline.start()
+
+    # 设置清理函数：写完队列中剩余的日志
+    global_vars.set_cleanup(global_vars.LOG_WRITER_CLEANUP_KEY, global_vars.LogPipeline.stop)
 
 def init_lib():
     """
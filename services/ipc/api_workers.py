@@ -0,0 +1,174 @@
+"""
+多进程 API 服务
+
+split 模式下由抓取进程绑定对外的 HTTP 端口，再把监听 socket 传给 ApiWorkerPool 启动的各个 API 进程，
+由操作系统在进程之间分配连接（与 uvicorn --workers 相同）。API 进程不启动浏览器：
+商品查询通过 services.ipc.channel 发给抓取进程，商品列表读各自从数据库加载的商品索引。
+API 进程的指标随心跳发给抓取进程，由抓取进程合并后在 /metrics 输出。
+"""
+
+import multiprocessing
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import services.logger.logger as logger
+from global_conf import global_vars
+from services.metrics.registry import REGISTRY
+
+
+@dataclass
+class _WorkerState:
+    worker_id: int
+    process: multiprocessing.Process
+    started_at: float
+
+
+def bind_socket(http_addr: str) -> socket.socket:
+    """绑定对外的 HTTP 端口，listen 由各 API 进程中的 uvicorn 调用"""
+    host, port = http_addr.rsplit(":", 1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host.strip(), int(port)))
+    sock.set_inheritable(True)
+    return sock
+
+
+def metrics_source(worker_id: int) -> str:
+    return f"api-worker-{worker_id}"
+
+
+def encode_metrics(snapshot: dict) -> dict:
+    """Registry 快照的标签键是元组，转换为可以 JSON 序列化的 [[标签...], 值] 列表"""
+    return {name: [[list(key), value] for key, value in values.items()] for name, values in snapshot.items()}
+
+
+def decode_metrics(data: dict) -> dict:
+    return {name: {tuple(key): value for key, value in values} for name, values in data.items()}
+
+
+class ApiWorkerPool:
+    """
+    API 进程池，在抓取进程中运行
+
+    - 进程异常退出时重启；正常退出（收到 SIGINT/SIGTERM）的进程不重启
+    - close 向各进程发送 SIGTERM，uvicorn 处理完已收到的请求后退出，超时未退出的强制结束
+    """
+
+    def __init__(self,
+                 workers: int,
+                 http_addr: str,
+                 debug: bool = False,
+                 enable_pprof: bool = False,
+                 monitor_interval: float = 1.0):
+        self.workers = workers
+        self.http_addr = http_addr
+        self.debug = debug
+        self.enable_pprof = enable_pprof
+        self.monitor_interval = monitor_interval
+
+        # spawn：子进程不继承抓取进程的事件循环、浏览器和数据库连接
+        self._mp = multiprocessing.get_context("spawn")
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._states: Dict[int, _WorkerState] = {}
+        self._closed = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        # 统计信息
+        self.restarts = 0
+
+    def start(self):
+        self._sock = bind_socket(self.http_addr)
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        thread = threading.Thread(target=self._monitor, name="api-worker-monitor", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"已启动 {self.workers} 个 API 进程，监听 {self.http_addr}")
+
+    def _spawn(self, worker_id: int):
+        process = self._mp.Process(
+            target=_api_worker_main,
+            args=(worker_id, global_vars.Conf.model_dump(warnings=False), self._sock, self.debug, self.enable_pprof),
+            name=f"api-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        with self._lock:
+            self._states[worker_id] = _WorkerState(worker_id, process, time.monotonic())
+        logger.info(f"API 进程 {worker_id} 已启动，pid={process.pid}")
+
+    def close(self, timeout: float = 10):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            states = list(self._states.values())
+        for state in states:
+            if state.process.is_alive():
+                state.process.terminate()
+        deadline = time.monotonic() + timeout
+        for state in states:
+            state.process.join(max(0.0, deadline - time.monotonic()))
+            if state.process.is_alive():
+                state.process.kill()
+                state.process.join(1)
+        if self._sock is not None:
+            self._sock.close()
+        logger.info("API 进程已全部退出")
+
+    def _monitor(self):
+        while not self._closed.wait(self.monitor_interval):
+            with self._lock:
+                states = [state for state in self._states.values() if not state.process.is_alive()]
+            for state in states:
+                if self._closed.is_set():
+                    return
+                exitcode = state.process.exitcode
+                # 新进程的计数从 0 开始，先把旧进程的指标并入累计值
+                REGISTRY.retire_remote(metrics_source(state.worker_id))
+                if exitcode == 0:
+                    logger.info(f"API 进程 {state.worker_id} 已退出")
+                    with self._lock:
+                        self._states.pop(state.worker_id, None)
+                    continue
+                logger.error(f"API 进程 {state.worker_id} 异常退出，exitcode={exitcode}")
+                self.restarts += 1
+                self._spawn(state.worker_id)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            workers = [{
+                "worker_id": state.worker_id,
+                "pid": state.process.pid,
+                "alive": state.process.is_alive(),
+                "uptime_seconds": round(now - state.started_at, 1),
+            } for state in self._states.values()]
+        return {
+            "http_addr": self.http_addr,
+            "workers": workers,
+            "restarts": self.restarts,
+        }
+
+
+# ---- API 进程 ----
+
+def _api_worker_main(worker_id: int, conf: dict, sock: socket.socket, debug: bool, enable_pprof: bool):
+    """API 进程入口"""
+    from conf.appConf import AppConf
+    from services.logger.logger import setup_logger
+    import logging
+
+    global_vars.Conf = AppConf.model_validate(conf)
+    level = logging.DEBUG if global_vars.is_dev_mode() else logging.INFO
+    global_vars.Logger = setup_logger(f"{global_vars.Conf.app_name}.api{worker_id}", level)
+
+    # api 与 jdUtil 互相导入，与 main.py 一样先导入 jdUtil
+    from jdUtil import new_api_worker
+
+    jd = new_api_worker(worker_id, sock, debug=debug, enable_pprof=enable_pprof)
+    jd.run()
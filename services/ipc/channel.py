@@ -0,0 +1,327 @@
+"""
+本机进程间的请求/响应通道
+
+API 进程通过 JobClient 把抓取任务发给抓取进程中的 JobServer。
+每个帧为 4 字节大端长度 + UTF-8 JSON：
+    请求：{"id": 1, "op": "query", "payload": {...}, "timeout": 30}
+    响应：{"id": 1, "ok": true, "result": ...}
+          {"id": 1, "ok": false, "error": "NetworkError", "message": "..."}
+一个连接上可以同时有多个请求，响应按 id 对应，顺序不保证。
+
+- 超时：客户端按请求等待 timeout 秒；服务端也按请求中的 timeout 取消处理，不做客户端已经放弃的工作
+- 背压：客户端最多 max_in_flight 个未完成请求，超出的请求在截止时间内排队；
+  服务端同时处理的请求超过 max_in_flight 时立即返回 ChannelBusyError，不排队
+
+地址为 host:port 时使用 TCP，unix:/path 时使用 Unix socket。
+"""
+
+import asyncio
+import os
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import services.logger.logger as logger
+from common.fastjson import dumps, loads
+from services.jdhelper.error import NetworkError, TuringVerificationRequiredError
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+Handler = Callable[[dict], Awaitable[Any]]
+
+
+class ChannelError(NetworkError):
+    """与抓取进程通信失败"""
+
+
+class ChannelBusyError(ChannelError):
+    """抓取进程或本进程的未完成请求已达上限"""
+
+
+class ChannelTimeoutError(ChannelError):
+    """请求在 timeout 内没有得到响应"""
+
+
+# 服务端抛出、需要在客户端按原类型重新抛出的异常
+_REMOTE_ERRORS = {cls.__name__: cls for cls in (NetworkError, TuringVerificationRequiredError,
+                                                 ChannelBusyError, ChannelTimeoutError)}
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """返回 ("unix", 路径) 或 ("tcp", (host, port))"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, port = address.rsplit(":", 1)
+    return "tcp", (host.strip(), int(port))
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Optional[dict]:
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ChannelError(message=f"帧长度 {length} 超过上限")
+    return loads(await reader.readexactly(length))
+
+
+def _encode_frame(message: dict) -> bytes:
+    body = dumps(message)
+    return _HEADER.pack(len(body)) + body
+
+
+class JobServer:
+    """
+    在抓取进程中运行，按 op 分发请求
+
+    handlers 为 {op: async fn(payload) -> 可 JSON 序列化的结果}
+    """
+
+    def __init__(self, address: str, handlers: Dict[str, Handler], max_in_flight: int = 64):
+        self.address = address
+        self.handlers = handlers
+        self.max_in_flight = max_in_flight
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._in_flight = 0
+        self._tasks: set = set()
+        self._writers: set = set()
+
+        # 统计信息
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def start(self):
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=target)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host=target[0], port=target[1])
+        logger.info(f"抓取任务通道已监听 {self.address}")
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        # 关闭监听不会断开已建立的连接，客户端的未完成请求要靠断开连接才能立即结束
+        for writer in list(self._writers):
+            writer.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        write_lock = asyncio.Lock()
+        try:
+            while True:
+                request = await _read_frame(reader)
+                if request is None:
+                    return
+                self.requests += 1
+                if self._in_flight >= self.max_in_flight:
+                    self.rejected += 1
+                    await self._reply(writer, write_lock, {
+                        "id": request.get("id"), "ok": False, "error": ChannelBusyError.__name__,
+                        "message": f"抓取进程繁忙，正在处理 {self._in_flight} 个请求",
+                    })
+                    continue
+                self._in_flight += 1
+                task = asyncio.create_task(self._dispatch(request, writer, write_lock))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (ConnectionError, ChannelError, ValueError) as e:
+            logger.warning(f"抓取任务通道连接异常: {e}")
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, request: dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        response = {"id": request.get("id")}
+        try:
+            handler = self.handlers.get(request.get("op"))
+            if handler is None:
+                raise ValueError(f"Unknown op: {request.get('op')}")
+            timeout = request.get("timeout")
+            result = await asyncio.wait_for(handler(request.get("payload") or {}), timeout)
+            response.update(ok=True, result=result)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            response.update(ok=False, error=ChannelTimeoutError.__name__, message="抓取进程处理超时")
+        except Exception as e:
+            self.errors += 1
+            response.update(ok=False, error=type(e).__name__, message=getattr(e, "message", None) or str(e))
+        finally:
+            self._in_flight -= 1
+        try:
+            await self._reply(writer, write_lock, response)
+        except ConnectionError:
+            # 客户端已断开，结果丢弃
+            pass
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, write_lock: asyncio.Lock, response: dict):
+        async with write_lock:
+            writer.write(_encode_frame(response))
+            # 客户端读取慢时在这里等待，不在内存中堆积响应
+            await writer.drain()
+
+    def stats(self) -> dict:
+        return {
+            "address": self.address,
+            "connections": self.connections,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+class JobClient:
+    """
+    在 API 进程中使用，一条长连接上并发发送请求
+
+    连接断开时所有未完成的请求以 ChannelError 结束，下一次请求时重新连接。
+    """
+
+    def __init__(self, address: str, timeout: float = 60, max_in_flight: int = 32, connect_timeout: float = 5):
+        self.address = address
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+
+        # 统计信息
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.busy = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            kind, target = parse_address(self.address)
+            try:
+                if kind == "unix":
+                    opening = asyncio.open_unix_connection(target)
+                else:
+                    opening = asyncio.open_connection(target[0], target[1])
+                self._reader, self._writer = await asyncio.wait_for(opening, self.connect_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                raise ChannelError(message=f"无法连接抓取进程 {self.address}", details=str(e))
+            self.reconnects += 1
+            self._read_task = asyncio.create_task(self._read_responses(self._reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        error: Exception = ChannelError(message="与抓取进程的连接已断开")
+        try:
+            while True:
+                response = await _read_frame(reader)
+                if response is None:
+                    break
+                future = self._pending.pop(response.get("id"), None)
+                if future is None or future.done():
+                    # 已超时的请求，结果丢弃
+                    continue
+                if response.get("ok"):
+                    future.set_result(response.get("result"))
+                else:
+                    error_cls = _REMOTE_ERRORS.get(response.get("error"))
+                    if error_cls is None:
+                        future.set_exception(NetworkError(message=response.get("message"),
+                                                          details=response.get("error")))
+                    else:
+                        future.set_exception(error_cls(message=response.get("message")))
+        except (ConnectionError, ChannelError, ValueError) as e:
+            error = ChannelError(message="与抓取进程的连接异常", details=str(e))
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def call(self, op: str, payload: Optional[dict] = None, timeout: Optional[float] = None) -> Any:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.busy += 1
+            raise ChannelBusyError(message=f"等待发送超时，已有 {self.max_in_flight} 个请求未完成")
+        try:
+            if not self.connected:
+                await self.connect()
+            self._next_id += 1
+            request_id = self._next_id
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            remaining = max(0.0, deadline - time.monotonic())
+            self.requests += 1
+            try:
+                async with self._write_lock:
+                    self._writer.write(_encode_frame({
+                        "id": request_id, "op": op, "payload": payload or {}, "timeout": remaining,
+                    }))
+                    await self._writer.drain()
+                return await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise ChannelTimeoutError(message=f"{op} 请求 {timeout}s 内未响应")
+            except ConnectionError as e:
+                raise ChannelError(message="发送请求失败", details=str(e))
+            finally:
+                self._pending.pop(request_id, None)
+        except ChannelError:
+            self.failures += 1
+            raise
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None:
+            self._read_task.cancel()
+            await asyncio.gather(self._read_task, return_exceptions=True)
+            self._read_task = None
+
+    def stats(self) -> dict:
+        return {
+            "address": self.address,
+            "connected": self.connected,
+            "pending": len(self._pending),
+            "max_in_flight": self.max_in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "busy": self.busy,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,38 @@
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from common.retry import RetryBudget, RetryPolicy
+
+# 商品详情页中商品名称、价格所在的节点
+SKU_NAME_SELECTOR = '.sku-name-title'
+SKU_PRICE_SELECTOR = '.summary-price.J-summary-price .p-price .price'
+
+# 抓取相关的重试共用一个预算，京东整体不可用时不会在每个请求上都重试满
+SCRAPE_RETRY_BUDGET = RetryBudget(ratio=0.2, max_tokens=20)
+
+# 页面导航：超时后指数退避重试
+NAVIGATION_RETRY = RetryPolicy(
+    max_retries=3,
+    retry_delay=2,
+    max_delay=10,
+    exceptions=(PlaywrightTimeoutError,),
+    budget=SCRAPE_RETRY_BUDGET,
+)
+
+# 等待元素：价格等节点由脚本异步渲染，短暂等待后再试一次
+SELECTOR_RETRY = RetryPolicy(
+    max_retries=2,
+    retry_delay=0.5,
+    max_delay=2,
+    exceptions=(PlaywrightTimeoutError,),
+    budget=SCRAPE_RETRY_BUDGET,
+)
+
+# HTTP 快速通道：连接类错误重试，HTTP 状态码错误不重试
+HTTP_RETRY = RetryPolicy(
+    max_retries=2,
+    retry_delay=0.5,
+    max_delay=2,
+    exceptions=(httpx.TransportError,),
+    budget=SCRAPE_RETRY_BUDGET,
+)
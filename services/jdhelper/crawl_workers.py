@@ -0,0 +1,392 @@
+"""
+多进程抓取
+
+每个抓取进程各自启动 Chromium、使用 cookies 登录并持有自己的页面池，从共享的任务队列中取 SKU 抓取，
+结果通过结果队列返回 API 进程，由 API 进程负责写库和更新缓存。
+
+消息格式（抓取进程 -> API 进程）：(消息类型, worker_id, job_id, 数据)
+抓取进程的指标随心跳以快照形式发回，由 API 进程合并到 /metrics 输出。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import services.logger.logger as logger
+from global_conf import global_vars
+from services.jdhelper.error import NetworkError, TuringVerificationRequiredError
+from services.metrics.metrics import CRAWL_JOB_SECONDS
+from services.metrics.registry import REGISTRY
+
+MSG_READY = "ready"
+MSG_HEARTBEAT = "heartbeat"
+MSG_METRICS = "metrics"
+MSG_STARTED = "started"
+MSG_RESULT = "result"
+MSG_ERROR = "error"
+
+# 抓取进程中抛出、需要在 API 进程中按原类型重新抛出的异常
+_REMOTE_ERRORS = {cls.__name__: cls for cls in (NetworkError, TuringVerificationRequiredError)}
+
+
+@dataclass
+class _Job:
+    job_id: int
+    sku_code: str
+    future: Future
+    attempts: int = 1
+    # 收到 MSG_STARTED 后记录处理该任务的进程，重新入队时清空；不为 None 即正在被抓取
+    worker_id: Optional[int] = None
+
+
+@dataclass
+class _WorkerState:
+    worker_id: int
+    process: multiprocessing.Process
+    started_at: float
+    last_seen: float
+    ready: bool = False
+    completed: int = 0
+    scraper_stats: dict = field(default_factory=dict)
+
+
+class CrawlWorkerPool:
+    """
+    抓取进程池
+
+    - 第一个进程登录成功后再启动其余进程，cookies 缺失时只会打开一个手动登录窗口
+    - 进程退出或超过 heartbeat_timeout 秒没有心跳时判定为崩溃，强制结束并重启
+    - 抓取进程从队列取出任务后立即发送 MSG_STARTED，崩溃时只有它已取出的任务重新入队，最多尝试 max_attempts 次；
+      仍在队列中的任务不受影响，也不计入尝试次数。取出后来不及发送 MSG_STARTED 就崩溃的任务由 job_timeout 兜底
+    - 任务结果用 concurrent.futures.Future 传递，可以在任意事件循环中等待
+    """
+
+    def __init__(self,
+                 workers: int,
+                 concurrency: int = 4,
+                 job_timeout: float = 60,
+                 heartbeat_interval: float = 5,
+                 heartbeat_timeout: float = 30,
+                 max_attempts: int = 2,
+                 ready_timeout: float = 600):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.job_timeout = job_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.ready_timeout = ready_timeout
+
+        # spawn：子进程不继承父进程的事件循环、线程和数据库连接
+        self._mp = multiprocessing.get_context("spawn")
+        self._jobs = self._mp.Queue()
+        self._results = self._mp.Queue()
+
+        self._lock = threading.Lock()
+        self._states: Dict[int, _WorkerState] = {}
+        self._pending: Dict[int, _Job] = {}
+        # 已按崩溃处理的进程 pid，之后才读到的 MSG_STARTED 对应的任务直接重新入队
+        self._dead_pids: Set[int] = set()
+        self._next_job_id = 0
+        self._first_ready = threading.Event()
+        self._closed = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        # 统计信息
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    # ---- 生命周期 ----
+
+    async def start(self):
+        """启动抓取进程，第一个进程登录完成后返回"""
+        for target, name in ((self._read_results, "crawl-results"), (self._monitor, "crawl-monitor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self._spawn(0)
+        ready = await asyncio.to_thread(self._first_ready.wait, self.ready_timeout)
+        if not ready:
+            raise RuntimeError(f"抓取进程 {self.ready_timeout} 秒内未完成登录")
+        for worker_id in range(1, self.workers):
+            self._spawn(worker_id)
+        logger.info(f"已启动 {self.workers} 个抓取进程，每个进程并发 {self.concurrency}")
+
+    def _spawn(self, worker_id: int):
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(worker_id, global_vars.Conf.model_dump(warnings=False), self._jobs, self._results,
+                  self.concurrency, self.heartbeat_interval),
+            name=f"crawl-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        now = time.monotonic()
+        with self._lock:
+            self._states[worker_id] = _WorkerState(worker_id, process, now, now)
+        logger.info(f"抓取进程 {worker_id} 已启动，pid={process.pid}")
+
+    def close(self, timeout: float = 5):
+        """通知抓取进程退出，超时未退出的强制结束，未完成的任务以 NetworkError 结束"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            states = list(self._states.values())
+        for _ in range(len(states) * self.concurrency):
+            self._jobs.put(None)
+        deadline = time.monotonic() + timeout
+        for state in states:
+            state.process.join(max(0.0, deadline - time.monotonic()))
+            if state.process.is_alive():
+                state.process.kill()
+                state.process.join(1)
+        self._results.put(None)
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for job in pending.values():
+            _set_exception(job.future, NetworkError(message="抓取进程已关闭"))
+        logger.info("抓取进程已全部退出")
+
+    # ---- 任务 ----
+
+    async def query(self, sku_code: str) -> Optional[dict]:
+        if self._closed.is_set():
+            raise NetworkError(message="抓取进程已关闭")
+        future: Future = Future()
+        with self._lock:
+            self._next_job_id += 1
+            job = _Job(self._next_job_id, sku_code, future)
+            self._pending[job.job_id] = job
+            self.submitted += 1
+        self._jobs.put((job.job_id, sku_code))
+        start = time.perf_counter()
+        result = "error"
+        try:
+            sku_info = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.job_timeout)
+            result = "ok"
+            return sku_info
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            result = "timeout"
+            raise NetworkError(message=f"抓取商品 {sku_code} 超时（{self.job_timeout}s）")
+        finally:
+            CRAWL_JOB_SECONDS.observe(time.perf_counter() - start, result=result)
+            with self._lock:
+                self._pending.pop(job.job_id, None)
+
+    def _read_results(self):
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            kind, worker_id, job_id, data = message
+            orphan = None
+            with self._lock:
+                state = self._states.get(worker_id)
+                if state is not None:
+                    state.last_seen = time.monotonic()
+                if kind == MSG_READY:
+                    if state is not None:
+                        state.ready = True
+                    self._first_ready.set()
+                elif kind == MSG_HEARTBEAT:
+                    if state is not None:
+                        state.scraper_stats = data
+                elif kind == MSG_METRICS:
+                    REGISTRY.update_remote(_metrics_source(worker_id), data)
+                elif kind == MSG_STARTED:
+                    job = self._pending.get(job_id)
+                    if job is not None:
+                        job.worker_id = worker_id
+                        if data in self._dead_pids:
+                            orphan = job
+                else:
+                    if state is not None:
+                        state.completed += 1
+                    # 已超时的任务不在 _pending 中，结果直接丢弃
+                    job = self._pending.pop(job_id, None)
+            if orphan is not None:
+                self._requeue([orphan])
+            elif kind == MSG_RESULT and job is not None:
+                self.completed += 1
+                _set_result(job.future, data)
+            elif kind == MSG_ERROR and job is not None:
+                self.failed += 1
+                error_name, message_text = data
+                error_cls = _REMOTE_ERRORS.get(error_name)
+                if error_cls is not None:
+                    _set_exception(job.future, error_cls(message=message_text))
+                else:
+                    _set_exception(job.future, NetworkError(message=message_text, details=error_name))
+
+    def _monitor(self):
+        while not self._closed.wait(self.heartbeat_interval):
+            now = time.monotonic()
+            with self._lock:
+                states = list(self._states.values())
+            for state in states:
+                alive = state.process.is_alive()
+                # 登录阶段可能需要手动操作，只对已就绪的进程检查心跳
+                hung = state.ready and now - state.last_seen > self.heartbeat_timeout
+                if alive and not hung:
+                    continue
+                if self._closed.is_set():
+                    return
+                if hung and alive:
+                    logger.error(f"抓取进程 {state.worker_id} 超过 {self.heartbeat_timeout} 秒无心跳，强制结束")
+                    state.process.kill()
+                    state.process.join(1)
+                else:
+                    logger.error(f"抓取进程 {state.worker_id} 异常退出，exitcode={state.process.exitcode}")
+                self.restarts += 1
+                # 新进程的计数从 0 开始，先把旧进程的指标并入累计值
+                REGISTRY.retire_remote(_metrics_source(state.worker_id))
+                self._recover_jobs(state.worker_id, state.process.pid)
+                self._spawn(state.worker_id)
+
+    def _recover_jobs(self, worker_id: int, pid: int):
+        """崩溃进程已取出的任务重新入队或以失败结束，仍在队列中的任务不受影响"""
+        with self._lock:
+            self._dead_pids.add(pid)
+            jobs = [job for job in self._pending.values() if job.worker_id == worker_id]
+        self._requeue(jobs)
+
+    def _requeue(self, jobs: List[_Job]):
+        retry, failed = [], []
+        with self._lock:
+            for job in jobs:
+                # 已超时或已有结果的任务不再处理
+                if self._pending.get(job.job_id) is not job:
+                    continue
+                if job.attempts < self.max_attempts:
+                    job.attempts += 1
+                    job.worker_id = None
+                    retry.append(job)
+                else:
+                    failed.append(job)
+                    del self._pending[job.job_id]
+        for job in retry:
+            self.requeued += 1
+            self._jobs.put((job.job_id, job.sku_code))
+        for job in failed:
+            self.failed += 1
+            _set_exception(job.future, NetworkError(message=f"抓取商品 {job.sku_code} 时抓取进程异常退出"))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            workers = [{
+                "worker_id": state.worker_id,
+                "pid": state.process.pid,
+                "alive": state.process.is_alive(),
+                "ready": state.ready,
+                "uptime_seconds": round(now - state.started_at, 1),
+                "heartbeat_age_seconds": round(now - state.last_seen, 1),
+                "completed": state.completed,
+                "scraper": state.scraper_stats,
+            } for state in self._states.values()]
+            pending = len(self._pending)
+            running = sum(1 for job in self._pending.values() if job.worker_id is not None)
+        return {
+            "workers": workers,
+            "pending": pending,
+            "running": running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+
+def _set_result(future: Future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+def _set_exception(future: Future, exc: BaseException):
+    if not future.done():
+        future.set_exception(exc)
+
+
+def _metrics_source(worker_id: int) -> str:
+    return f"crawl-worker-{worker_id}"
+
+
+# ---- 抓取进程 ----
+
+def _worker_main(worker_id: int, conf: dict, jobs, results, concurrency: int, heartbeat_interval: float):
+    """抓取进程入口"""
+    from conf.appConf import AppConf
+    from services.logger.logger import setup_logger
+    import logging
+
+    # Ctrl+C 由 API 进程统一处理，抓取进程等待退出通知
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    global_vars.Conf = AppConf.model_validate(conf)
+    level = logging.DEBUG if global_vars.is_dev_mode() else logging.INFO
+    global_vars.Logger = setup_logger(f"{global_vars.Conf.app_name}.crawl{worker_id}", level)
+    asyncio.run(_worker_loop(worker_id, jobs, results, concurrency, heartbeat_interval))
+
+
+async def _worker_loop(worker_id: int, jobs, results, concurrency: int, heartbeat_interval: float):
+    from services.jdhelper.scraper import SkuScraper
+
+    loop = asyncio.get_running_loop()
+    # 同一个 Chromium 用户目录不能被多个进程同时使用
+    user_data_dir = global_vars.Conf.scrape.UserDataDir
+    scraper = SkuScraper(user_data_dir=f"{user_data_dir}-{worker_id}" if user_data_dir else "")
+
+    async def heartbeat():
+        while True:
+            results.put((MSG_HEARTBEAT, worker_id, None, scraper.stats()))
+            results.put((MSG_METRICS, worker_id, None, REGISTRY.snapshot()))
+            await asyncio.sleep(heartbeat_interval)
+
+    def take():
+        job = jobs.get()
+        if job is not None:
+            # 取出后立即报告，进程崩溃时 API 进程据此只重新入队已取出的任务
+            results.put((MSG_STARTED, worker_id, job[0], os.getpid()))
+        return job
+
+    async def consume():
+        while True:
+            job = await loop.run_in_executor(None, take)
+            if job is None:
+                return
+            job_id, sku_code = job
+            try:
+                sku_info = await scraper.query(sku_code)
+            except Exception as e:
+                results.put((MSG_ERROR, worker_id, job_id, (type(e).__name__, getattr(e, "message", None) or str(e))))
+                continue
+            results.put((MSG_RESULT, worker_id, job_id, sku_info))
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        login_page = await scraper.start()
+        await login_page.close()
+        results.put((MSG_READY, worker_id, None, os.getpid()))
+        logger.info(f"抓取进程 {worker_id} 已就绪")
+        await asyncio.gather(*(consume() for _ in range(concurrency)))
+    finally:
+        heartbeat_task.cancel()
+        await scraper.close()
@@ -37,3 +37,11 @@ class TuringVerificationRequiredError(Exception):
                                                                                                                                               f"\ndetails: {self.details}" if self.details else ""
         )
 
+
+
+class SessionExpiredError(Exception):
+    """Cookies 失效且无法重新登录（例如无头模式）时抛出的异常"""
+
+    def __init__(self, message="登录已失效，请重新登录"):
+        self.message = message
+        super().__init__(self.message)
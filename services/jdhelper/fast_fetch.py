@@ -0,0 +1,150 @@
+from typing import List, Optional, Tuple
+
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+import services.logger.logger as logger
+from common.retry import CircuitBreakerRegistry, call_with_retry, host_of
+from services.jdhelper.common import HTTP_RETRY, SKU_NAME_SELECTOR, SKU_PRICE_SELECTOR
+from services.jdhelper.login_with_cookie import COOKIES_SAVE_PATH
+from services.jdhelper.session import load_cookies
+
+DEFAULT_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9",
+}
+
+# 被重定向到这些地址说明需要登录或触发了风控，交给浏览器处理
+BLOCKED_URL_KEYWORDS = ("passport.jd.com", "risk_handler", "privatedomain")
+
+# 与 Playwright 导航分开熔断，快速通道被限流时不影响浏览器兜底
+http_breakers = CircuitBreakerRegistry(failure_threshold=5, reset_timeout=60.0)
+
+
+def parse_item_page(html: str) -> Tuple[str, Optional[float]]:
+    """
+    从商品详情页 HTML 中解析商品名称和价格
+
+    :return: (商品名称, 价格)，找不到价格时价格为 None
+    """
+    tree = LexborHTMLParser(html)
+    sku_name = ''
+    price_value = None
+
+    name_node = tree.css_first(SKU_NAME_SELECTOR)
+    if name_node is not None:
+        sku_name = name_node.text().strip()
+
+    price_node = tree.css_first(SKU_PRICE_SELECTOR)
+    if price_node is not None:
+        try:
+            price_value = float(price_node.text().split('¥')[-1].strip())
+        except ValueError:
+            price_value = None
+    return sku_name, price_value
+
+
+def to_httpx_cookies(cookies: Optional[List[dict]]) -> httpx.Cookies:
+    """把 Playwright 格式的 cookies 转换为 httpx 的 Cookies"""
+    jar = httpx.Cookies()
+    for cookie in cookies or ():
+        jar.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    return jar
+
+
+class FastSkuFetcher:
+    """
+    不启动浏览器的商品页抓取
+
+    使用连接池复用的 httpx.AsyncClient 直接请求商品页，并用 lexbor 解析 HTML。
+    只有名称和价格都能解析到时才返回结果，否则返回 None，由调用方回退到 Playwright。
+
+    cookies 在创建 client 时从 cookie_file 读取；浏览器登录或续期后由 update_cookies 同步，
+    使用浏览器用户目录（不写 cookie_file）时也能带上登录状态。
+    """
+
+    def __init__(self,
+                 item_url_template: str = "https://item.jd.com/{sku_code}.html",
+                 cookie_file: str = COOKIES_SAVE_PATH,
+                 timeout: float = 5.0,
+                 max_connections: int = 20):
+        self.item_url_template = item_url_template
+        self.cookie_file = cookie_file
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cookies: Optional[List[dict]] = None
+
+        # 统计信息
+        self.hits = 0
+        self.fallbacks = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 延迟创建，保证 client 属于实际使用它的事件循环
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                cookies=to_httpx_cookies(self._cookies if self._cookies is not None
+                                         else load_cookies(self.cookie_file)),
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    def update_cookies(self, cookies: List[dict]):
+        """用浏览器中最新的 cookies 替换 client 的 cookies"""
+        self._cookies = cookies
+        if self._client is not None:
+            self._client.cookies = to_httpx_cookies(cookies)
+
+    async def _get(self, url: str) -> httpx.Response:
+        return await self.client.get(url)
+
+    async def fetch(self, sku_code: str) -> Optional[dict]:
+        """
+        抓取商品信息
+
+        :return: {'sku_code', 'sku_name', 'price', 'url'}，无法解析时返回 None
+        """
+        url = self.item_url_template.format(sku_code=sku_code)
+        try:
+            response = await call_with_retry(self._get, url, policy=HTTP_RETRY,
+                                             breaker=http_breakers.get(host_of(url)))
+        except Exception as e:
+            logger.debug(f"快速通道请求失败，回退到浏览器: {url} {e}")
+            self.fallbacks += 1
+            return None
+
+        final_url = str(response.url)
+        if response.status_code != 200 or any(k in final_url for k in BLOCKED_URL_KEYWORDS):
+            logger.debug(f"快速通道响应异常，回退到浏览器: {final_url} {response.status_code}")
+            self.fallbacks += 1
+            return None
+
+        sku_name, price_value = parse_item_page(response.text)
+        if not sku_name or price_value is None:
+            self.fallbacks += 1
+            return None
+
+        self.hits += 1
+        return {
+            'sku_code': sku_code,
+            'sku_name': sku_name,
+            'price': price_value,
+            'url': url,
+        }
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "fallbacks": self.fallbacks}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
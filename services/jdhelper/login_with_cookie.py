@@ -1,50 +1,95 @@
 import os
-import sys
 import time
-import json
+from contextlib import suppress
 from typing import Optional
 
 from playwright.async_api import async_playwright, BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
 
 from services.jdhelper import COOKIES_DIR
-from services.jdhelper.error import NetworkError
+from services.jdhelper.error import NetworkError, SessionExpiredError
+from services.jdhelper.session import EXPIRED, MISSING, check_cookies, load_cookies, probe_session, save_cookies
 import services.logger.logger as logger
-from common.utils import sync_retry
+from common.retry import async_retry
+from services.jdhelper.common import NAVIGATION_RETRY
 
 LOGIN_URL = 'https://passport.jd.com/new/login.aspx'  # 京东登录页面
 COOKIES_SAVE_PATH = os.path.join(COOKIES_DIR, "cookies.json")  # 保存 cookies 的路径
+BROWSER_ARGS = ["--disable-blink-features", "--disable-blink-features=AutomationControlled", "--disable-bot-controls",
+                "--disable-infobars", "--window-size=1920,1080", "--start-maximized"]
 
-@sync_retry(max_retries=3, retry_delay=2, exceptions=(PlaywrightTimeoutError,))
+@async_retry(NAVIGATION_RETRY, breaker_arg="url")
 async def __load_page(page: Page, url: str, timeout: float):
     return await page.goto(url, timeout=timeout)
 
 
-async def logInWithCookies(target_url: str = "https://www.jd.com/", retry: int = 0, context: Optional[BrowserContext] = None):
+async def logInWithCookies(target_url: str = "https://www.jd.com/", retry: int = 0, context: Optional[BrowserContext] = None,
+                           user_data_dir: str = "", headless: bool = False):
     """
     使用 cookies 模拟登录
 
     Params:
         retry: 重新尝试登录的次数
         context: 每次重新尝试登录通用一个 BrowserContext 对象，减少了其初始化的开支
+        user_data_dir: Chromium 用户数据目录，非空时使用持久化的浏览器配置，登录状态保存在目录中
+        headless: 是否以无头模式启动，无头模式下无法手动登录
     Returns:
-        登录成功时返回 tuple[Page, BrowserContext], 失败则程序退出。
+        登录成功时返回 tuple[Page, BrowserContext]，Cookies 失效且无法重新登录时抛出 SessionExpiredError。
+        登录失败时关闭本次启动的浏览器和 Playwright。
+
+    先只根据 cookies.json 中的过期时间判断是否需要登录，再通过登录状态接口确认，不打开京东页面。
     """
+    if retry > 0:
+        return await _logIn(target_url, retry, context, headless)
+
     # 初始化 playwright
-    if retry == 0:
-        playwright = await async_playwright().start()
-        browser = await playwright.chromium.launch(
-                headless=False,
-                args=["--disable-blink-features", "--disable-blink-features=AutomationControlled", "--disable-bot-controls", "--disable-infobars", "--window-size=1920,1080", "--start-maximized"]
+    playwright = await async_playwright().start()
+    browser = None
+    try:
+        if user_data_dir:
+            os.makedirs(user_data_dir, exist_ok=True)
+            context = await playwright.chromium.launch_persistent_context(
+                user_data_dir,
+                headless=headless,
+                args=BROWSER_ARGS,
+                no_viewport=None,  # 不限制视口大小
             )
+            # 用户目录中已有有效的登录状态时直接使用，不需要注入 cookies
+            state, _ = check_cookies(await context.cookies())
+            if state not in (MISSING, EXPIRED) and await probe_session(context):
+                logger.info('使用浏览器用户目录中的登录状态')
+                return await context.new_page(), context
+        else:
+            browser = await playwright.chromium.launch(headless=headless, args=BROWSER_ARGS)
+            context = await browser.new_context(
+                no_viewport=None  # 不限制视口大小
+            )
+        return await _logIn(target_url, 0, context, headless)
+    except BaseException:
+        # 调用方拿不到 context，无法关闭，这里关闭后再抛出，避免留下浏览器进程
+        for close in (context.close if context is not None else None,
+                      browser.close if browser is not None else None,
+                      playwright.stop):
+            if close is not None:
+                with suppress(Exception):
+                    await close()
+        raise
+
 
-        context = await browser.new_context(
-            no_viewport=None  # 不限制视口大小
-        )
+async def _logIn(target_url: str, retry: int, context: BrowserContext, headless: bool):
+    """在已启动的 context 中登录，参数与 logInWithCookies 相同"""
+    # 先在本地检查 Cookies 的过期时间，已过期的不再拿去访问京东
+    cookies = load_cookies(COOKIES_SAVE_PATH)
+    state, expires_at = check_cookies(cookies)
+    if state == EXPIRED:
+        logger.warning(f'Cookies 已于 {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(expires_at))} 过期')
+        cookies = None
 
-    # 没有 Cookies 先登录获取
-    if not os.path.exists(COOKIES_SAVE_PATH):
+    # 没有可用的 Cookies 先登录获取
+    if not cookies:
+        if headless:
+            raise SessionExpiredError("无头模式下无法手动登录，请先关闭 Headless 登录一次以保存 Cookies")
         logger.info("未找到 Cookies 文件，将跳转手动登录！")
-        page = await context.new_page()  # 这里的 context 在 retry=0时用的local变量，其余情况均使用递归传递的参数
+        page = await context.new_page()  # context 由 logInWithCookies 创建，重试时沿用同一个
         try:
             response = await __load_page(page, LOGIN_URL, timeout=10000)  # 打开登录界面
             if response.status != 200:
@@ -65,38 +110,25 @@ async def logInWithCookies(target_url: str = "https://www.jd.com/", retry: int =
                 logger.info("等待用户完成登录...")
         # 获取 Cookies 并保存到文件
         cookies = await page.context.cookies()
-        with open(COOKIES_SAVE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(cookies, f, ensure_ascii=False, indent=4)
-            logger.info(f'Cookies 已保存到 {os.getcwd()}/cookies.json')
-        # 视觉效果优化，以便使用者查看日志信息并进行下一步操作
-        await page.close()
-        time.sleep(2)
-
-        # 用 Cookies 登录
-    page = await context.new_page()
-    try:
-        await __load_page(page, target_url, timeout=10000)  # 打开登录页面
-    except PlaywrightTimeoutError:
-        raise NetworkError(message=f"页面加载超时: {target_url}")
+        save_cookies(COOKIES_SAVE_PATH, cookies)
+        logger.info(f'Cookies 已保存到 {COOKIES_SAVE_PATH}')
+        # 手动登录的页面已经带有 cookies，直接返回
+        return page, context
 
-    with open(COOKIES_SAVE_PATH, 'r', encoding='utf-8') as f:
-        cookies = json.load(f)  # 读取文件中的 cookies
-        await page.context.add_cookies(cookies)  # 加载 cookies 到页面上下文
-    await page.reload()  # 刷新页面以应用 cookies
-    # 检查是否成功登录
-    try:
-        await page.wait_for_selector('.nickname', timeout=10000)  # 查找一个登录后特有的元素
+    # 用 Cookies 登录：先把 cookies 加入上下文，再用登录状态接口确认，不需要打开页面
+    await context.add_cookies(cookies)  # 加载 cookies 到浏览器上下文
+    authenticated = await probe_session(context)
+    if authenticated is None:
+        # 网络波动时以本地检查为准，会话是否有效由 SessionManager 在后台继续确认
+        logger.warning('无法确认登录状态，按 Cookies 过期时间继续使用')
+    if authenticated is not False:
         logger.info('使用已保存的 Cookies 登录')
-        return page, context
-    except PlaywrightTimeoutError:
-        if os.path.isfile(COOKIES_SAVE_PATH):  # 每个账号的 cookies 对应一个文件，需要确保删除的是文件
-            os.remove(COOKIES_SAVE_PATH)
-            logger.warning('Cookies 已失效，请重新手动登录！')
-            # 视觉效果优化，以便使用者查看日志信息并进行下一步操作
-            await page.close()
-            time.sleep(2)
-        if retry >= 3:  # 防止无限递归，但暂未想到发生异常的情况
-            logger.critical("登录异常")
-            sys.exit(1)
-        else:
-            return await logInWithCookies(retry=retry + 1, context=context)  # 尾递归，语义明了
+        return await context.new_page(), context
+
+    if os.path.isfile(COOKIES_SAVE_PATH):  # 每个账号的 cookies 对应一个文件，需要确保删除的是文件
+        os.remove(COOKIES_SAVE_PATH)
+        logger.warning('Cookies 已失效，请重新手动登录！')
+    await context.clear_cookies()
+    if retry >= 3:  # 防止无限递归，但暂未想到发生异常的情况
+        raise SessionExpiredError("多次登录后 Cookies 仍然无效")
+    return await _logIn(target_url, retry + 1, context, headless)  # 尾递归，语义明了
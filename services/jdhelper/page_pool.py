@@ -0,0 +1,155 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import Set
+
+from playwright.async_api import BrowserContext, Page
+
+import services.logger.logger as logger
+from services.metrics.metrics import SCRAPE_STAGE_SECONDS
+
+
+class PagePool:
+    """
+    基于同一个 BrowserContext 的页面池
+
+    - 启动时预热 size 个标签页，请求通过 checkout/release 借还页面
+    - 借出前做健康检查，已关闭、崩溃或无响应的页面会被关闭并补充新页面
+    - 池中页面共享 context 的 cookies，因此无需为每个页面重新登录
+    """
+
+    def __init__(self, context: BrowserContext, size: int = 4, health_check_timeout: float = 3.0):
+        if size < 1:
+            raise ValueError(f"Invalid page pool size: {size}")
+        self.context = context
+        self.size = size
+        self.health_check_timeout = health_check_timeout
+
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._pages: Set[Page] = set()
+        self._crashed: Set[Page] = set()
+        self._closed = False
+
+        # 统计信息
+        self.created = 0
+        self.replaced = 0
+        self.checkouts = 0
+
+    async def start(self):
+        """预热页面"""
+        pages = await asyncio.gather(*(self._new_page() for _ in range(self.size)))
+        for page in pages:
+            self._idle.put_nowait(page)
+        logger.info(f"页面池已就绪，共 {self.size} 个标签页")
+
+    async def _new_page(self) -> Page:
+        page = await self.context.new_page()
+        page.on("crash", lambda p: self._crashed.add(p))
+        self._pages.add(page)
+        self.created += 1
+        return page
+
+    async def _discard(self, page: Page):
+        self._pages.discard(page)
+        self._crashed.discard(page)
+        with suppress(Exception):
+            if not page.is_closed():
+                await page.close()
+
+    async def _replace(self, page: Page) -> Page:
+        """关闭坏掉的页面并新建一个顶替它"""
+        await self._discard(page)
+        self.replaced += 1
+        logger.warning("页面池中的标签页已失效，正在替换")
+        return await self._new_page()
+
+    async def is_healthy(self, page: Page) -> bool:
+        """
+        检查页面是否可用
+
+        页面已关闭或崩溃时直接判定失效，否则执行一次轻量的 JS 求值确认渲染进程仍有响应
+        """
+        if page.is_closed() or page in self._crashed:
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), timeout=self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def acquire(self) -> Page:
+        """借出一个健康的页面，池为空时等待其他请求归还"""
+        if self._closed:
+            raise RuntimeError("Page pool is closed")
+        start = time.perf_counter()
+        page = await self._idle.get()
+        SCRAPE_STAGE_SECONDS.observe(time.perf_counter() - start, stage="page_acquire")
+        try:
+            if not await self.is_healthy(page):
+                page = await self._replace(page)
+        except BaseException:
+            # 替换失败时也要把名额还回去，避免池子越借越少
+            self._idle.put_nowait(page)
+            raise
+        self.checkouts += 1
+        return page
+
+    async def release(self, page: Page, broken: bool = False):
+        """
+        归还页面
+
+        Args:
+            page: 借出的页面
+            broken: 使用过程中出现异常时为 True，会先做健康检查再决定是否替换
+        """
+        if self._closed:
+            await self._discard(page)
+            return
+        try:
+            if page.is_closed() or page in self._crashed or (broken and not await self.is_healthy(page)):
+                page = await self._replace(page)
+        finally:
+            self._idle.put_nowait(page)
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        借用页面的上下文管理器
+
+        用法：
+            async with pool.page() as page:
+                await page.goto(url)
+        """
+        page = await self.acquire()
+        broken = False
+        try:
+            yield page
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            await self.release(page, broken=broken)
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self._idle.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self.idle,
+            "in_use": self.in_use,
+            "created": self.created,
+            "replaced": self.replaced,
+            "checkouts": self.checkouts,
+        }
+
+    async def close(self):
+        """关闭池中全部页面"""
+        self._closed = True
+        for page in list(self._pages):
+            await self._discard(page)
@@ -0,0 +1,144 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Page, Request, Route
+
+import services.logger.logger as logger
+from common.utils import percentile
+
+# 被拦截资源无法得知真实大小，按类型估算节省的字节数
+DEFAULT_SIZE_ESTIMATES = {
+    "image": 30 * 1024,
+    "media": 500 * 1024,
+    "font": 60 * 1024,
+    "stylesheet": 40 * 1024,
+    "script": 80 * 1024,
+}
+DEFAULT_SIZE_ESTIMATE = 5 * 1024
+
+
+@dataclass
+class PageRequestStats:
+    """单次抓取期间一个页面的请求统计"""
+    allowed: int = 0
+    blocked: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+    bytes_loaded: int = 0
+    bytes_saved: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "bytes_loaded": self.bytes_loaded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def _match_domain(host: str, domains: Iterable[str]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class RequestFilter:
+    """
+    BrowserContext 级别的请求拦截
+
+    规则按顺序判断：
+        1. 主文档请求始终放行
+        2. 命中 deny_domains 的请求拦截（广告、统计脚本等）
+        3. allow_domains 非空时，不在其中的第三方域名拦截
+        4. 资源类型在 block_resource_types 中的拦截（图片、字体、样式等）
+    """
+
+    def __init__(self,
+                 block_resource_types: Iterable[str] = ("image", "media", "font", "stylesheet"),
+                 allow_domains: Iterable[str] = (),
+                 deny_domains: Iterable[str] = (),
+                 latency_window: int = 1000):
+        self.block_resource_types = frozenset(block_resource_types)
+        self.allow_domains = tuple(d.lower().lstrip(".") for d in allow_domains)
+        self.deny_domains = tuple(d.lower().lstrip(".") for d in deny_domains)
+
+        self._pages: Dict[Page, PageRequestStats] = {}
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self.totals = PageRequestStats()
+        self.scrapes = 0
+
+    async def install(self, context: BrowserContext):
+        """在 context 上注册路由，之后新建的所有页面都会经过过滤"""
+        await context.route("**/*", self._handle_route)
+        context.on("requestfinished", self._on_request_finished)
+        logger.info(f"已启用请求过滤，拦截类型: {sorted(self.block_resource_types)}")
+
+    def should_block(self, request: Request) -> bool:
+        resource_type = request.resource_type
+        if resource_type == "document" and request.is_navigation_request():
+            return False
+        host = (urlparse(request.url).hostname or "").lower()
+        if self.deny_domains and _match_domain(host, self.deny_domains):
+            return True
+        if self.allow_domains and not _match_domain(host, self.allow_domains):
+            return True
+        return resource_type in self.block_resource_types
+
+    def _stats_for(self, request: Request) -> Optional[PageRequestStats]:
+        try:
+            page = request.frame.page
+        except Exception:
+            # Service Worker 等请求没有所属页面
+            return None
+        return self._pages.get(page)
+
+    async def _handle_route(self, route: Route, request: Request):
+        stats = self._stats_for(request)
+        if self.should_block(request):
+            resource_type = request.resource_type
+            saved = DEFAULT_SIZE_ESTIMATES.get(resource_type, DEFAULT_SIZE_ESTIMATE)
+            for s in (stats, self.totals):
+                if s is not None:
+                    s.blocked += 1
+                    s.blocked_by_type[resource_type] = s.blocked_by_type.get(resource_type, 0) + 1
+                    s.bytes_saved += saved
+            await route.abort()
+            return
+        for s in (stats, self.totals):
+            if s is not None:
+                s.allowed += 1
+        await route.continue_()
+
+    async def _on_request_finished(self, request: Request):
+        stats = self._stats_for(request)
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        size = sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        for s in (stats, self.totals):
+            if s is not None:
+                s.bytes_loaded += max(size, 0)
+
+    def begin(self, page: Page):
+        """开始统计一次抓取"""
+        self._pages[page] = PageRequestStats()
+
+    def end(self, page: Page, elapsed: float) -> Optional[PageRequestStats]:
+        """结束统计，返回本次抓取的请求统计，并记录抓取耗时"""
+        stats = self._pages.pop(page, None)
+        self._latencies.append(elapsed)
+        self.scrapes += 1
+        return stats
+
+    def snapshot(self) -> dict:
+        latencies = list(self._latencies)
+        return {
+            "scrapes": self.scrapes,
+            "totals": self.totals.to_dict(),
+            "scrape_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "scrape_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "block_resource_types": sorted(self.block_resource_types),
+            "allow_domains": list(self.allow_domains),
+            "deny_domains": list(self.deny_domains),
+        }
@@ -0,0 +1,230 @@
+import re
+import time
+from functools import lru_cache
+from typing import Optional
+
+from playwright.async_api import BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
+
+import services.logger.logger as logger
+from common.retry import async_retry, call_with_retry, CircuitOpenError
+from global_conf import global_vars
+from services.jdhelper.common import NAVIGATION_RETRY, SELECTOR_RETRY, SKU_NAME_SELECTOR, SKU_PRICE_SELECTOR
+from services.jdhelper.error import NetworkError
+from services.jdhelper.fast_fetch import FastSkuFetcher
+from services.jdhelper.login_with_cookie import COOKIES_SAVE_PATH, logInWithCookies as async_logInWithCookies
+from services.jdhelper.page_pool import PagePool
+from services.jdhelper.request_filter import RequestFilter
+from services.jdhelper.session import SessionManager
+from services.metrics.metrics import SCRAPE_FIELD_MISSING, SCRAPE_SECONDS, SCRAPE_STAGE_SECONDS
+
+
+class SkuScraper:
+    """
+    商品详情抓取
+
+    持有一个浏览器会话（登录后的 BrowserContext + 页面池）和 HTTP 快速通道，
+    jdUtil 在进程内使用一个实例，多进程模式下每个抓取进程各自持有一个实例。
+    """
+
+    def __init__(self, user_data_dir: Optional[str] = None):
+        scrape_conf = global_vars.Conf.scrape
+        self.user_data_dir = scrape_conf.UserDataDir if user_data_dir is None else user_data_dir
+        self.browser_context: Optional[BrowserContext] = None
+        self.page_pool: Optional[PagePool] = None
+        self.fast_fetcher: Optional[FastSkuFetcher] = None
+        self.request_filter: Optional[RequestFilter] = None
+        self.session: Optional[SessionManager] = None
+
+        if scrape_conf.EnableFastPath:
+            self.fast_fetcher = FastSkuFetcher(
+                item_url_template=scrape_conf.ItemUrlTemplate,
+                timeout=scrape_conf.FastPathTimeout,
+                max_connections=scrape_conf.FastPathMaxConnections,
+            )
+
+    async def start(self) -> Page:
+        """
+        登录并初始化页面池
+
+        :return: 登录时使用的页面，由调用方决定何时关闭
+        """
+        scrape_conf = global_vars.Conf.scrape
+        login_page, self.browser_context = await async_logInWithCookies(
+            user_data_dir=self.user_data_dir, headless=scrape_conf.Headless,
+        )
+        # 登录完成后再启用请求过滤，手动登录页需要完整加载图片（二维码/验证码）
+        if scrape_conf.EnableRequestFilter:
+            self.request_filter = RequestFilter(
+                block_resource_types=scrape_conf.BlockResourceTypes,
+                allow_domains=scrape_conf.AllowDomains,
+                deny_domains=scrape_conf.DenyDomains,
+            )
+            await self.request_filter.install(self.browser_context)
+        # 快速通道使用与浏览器相同的登录状态（包括浏览器用户目录中的登录状态）
+        if self.fast_fetcher is not None:
+            self.fast_fetcher.update_cookies(await self.browser_context.cookies())
+        self.page_pool = PagePool(
+            self.browser_context,
+            size=scrape_conf.PagePoolSize,
+            health_check_timeout=scrape_conf.PageHealthCheckTimeout,
+        )
+        await self.page_pool.start()
+        # 登录会话在后台探测和续期，抓取不等待
+        if scrape_conf.SessionProbeInterval > 0:
+            self.session = SessionManager(
+                self.browser_context,
+                COOKIES_SAVE_PATH,
+                probe_interval=scrape_conf.SessionProbeInterval,
+                refresh_before=scrape_conf.SessionRefreshBefore,
+                probe_timeout=scrape_conf.SessionProbeTimeout,
+                on_cookies=self.fast_fetcher.update_cookies if self.fast_fetcher is not None else None,
+            )
+            self.session.start()
+        return login_page
+
+    async def query(self, sku_code) -> dict:
+        start = time.perf_counter()
+        # 优先走 HTTP 快速通道，解析不到名称或价格时再用浏览器渲染
+        if self.fast_fetcher is not None:
+            with SCRAPE_STAGE_SECONDS.time(stage="fast_path"):
+                fast_info = await self.fast_fetcher.fetch(sku_code)
+            if fast_info is not None:
+                logger.info(f"商品名称: {fast_info['sku_name']}, 商品价格: {fast_info['price']}")
+                SCRAPE_SECONDS.observe(time.perf_counter() - start, path="fast")
+                return self._make_sku_info(fast_info['sku_code'], fast_info['sku_name'],
+                                           fast_info['price'], fast_info['url'], 0)
+
+        try:
+            return await self._query_with_page(sku_code)
+        finally:
+            SCRAPE_SECONDS.observe(time.perf_counter() - start, path="browser")
+
+    async def _query_with_page(self, sku_code) -> dict:
+        if self.page_pool is None:
+            raise NetworkError(message=f"浏览器未启动，无法渲染商品页：{sku_code}")
+        async with self.page_pool.page() as page:
+            if self.request_filter is None:
+                return await self._scrape_sku_info(page, sku_code)
+
+            self.request_filter.begin(page)
+            start = time.perf_counter()
+            try:
+                return await self._scrape_sku_info(page, sku_code)
+            finally:
+                stats = self.request_filter.end(page, time.perf_counter() - start)
+                if stats is not None:
+                    logger.debug(f"商品 {sku_code} 请求统计: {stats.to_dict()}")
+
+    async def _scrape_sku_info(self, page: Page, sku_code):
+        url_1 = global_vars.Conf.scrape.ItemUrlTemplate.format(sku_code=sku_code)
+        sku_name = ''
+        price_value = 0.00
+        is_taken_down = 0
+        try:
+            with SCRAPE_STAGE_SECONDS.time(stage="goto"):
+                await self.__load_page(page, url_1, timeout=20000)
+        except PlaywrightTimeoutError:
+            raise NetworkError(message=f"页面加载超时：{url_1}")
+        except CircuitOpenError as e:
+            raise NetworkError(message=f"京东访问失败次数过多，已熔断：{url_1}", details=str(e))
+
+        try:
+            with SCRAPE_STAGE_SECONDS.time(stage="wait_name"):
+                await call_with_retry(page.wait_for_selector, SKU_NAME_SELECTOR, timeout=5000,
+                                      policy=SELECTOR_RETRY)
+            sku_name_element = page.locator(SKU_NAME_SELECTOR)
+            sku_name = await sku_name_element.inner_text()
+            logger.info(f'商品名称: {sku_name}')
+        except Exception as e:
+            logger.error(f"获取商品名称失败: {e}")
+            SCRAPE_FIELD_MISSING.inc(field="name")
+
+        try:
+            with SCRAPE_STAGE_SECONDS.time(stage="wait_price"):
+                await call_with_retry(page.wait_for_selector, SKU_PRICE_SELECTOR, timeout=5000,
+                                      policy=SELECTOR_RETRY)
+            price_element = page.locator(SKU_PRICE_SELECTOR)
+            price_text = await price_element.inner_text()
+            price_value = float(price_text.split('¥')[-1].strip())
+            logger.info(f'商品价格: {price_value}')
+        except Exception as e:
+            logger.error(f"获取商品价格失败: {e}，可能已经下架了")
+            SCRAPE_FIELD_MISSING.inc(field="price")
+            is_taken_down = 1
+
+        return self._make_sku_info(sku_code, sku_name, price_value, url_1, is_taken_down)
+
+    def _make_sku_info(self, sku_code, sku_name, price_value, url, is_taken_down) -> dict:
+        brand_name = ''
+        if sku_name:
+            brand_name = extract_brand(sku_name)
+        return {
+            'sku_code': sku_code,
+            'sku_name': sku_name,
+            'price': price_value,
+            'url': url,
+            'brand': brand_name,
+            'is_taken_down': is_taken_down
+        }
+
+    @async_retry(NAVIGATION_RETRY, breaker_arg="url")
+    async def __load_page(self, page: Page, url: str, timeout: float):
+        return await page.goto(url, timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "page_pool": self.page_pool.stats() if self.page_pool is not None else None,
+            "fast_path": self.fast_fetcher.stats() if self.fast_fetcher is not None else None,
+            "request_filter": self.request_filter.snapshot() if self.request_filter is not None else None,
+            "session": self.session.stats() if self.session is not None else None,
+        }
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.stop()
+        if self.fast_fetcher is not None:
+            try:
+                await self.fast_fetcher.close()
+            except Exception as e:
+                logger.error(f"关闭 HTTP 快速通道失败: {e}")
+        if self.page_pool is not None:
+            try:
+                await self.page_pool.close()
+            except Exception as e:
+                logger.error(f"关闭页面池失败: {e}")
+        if self.browser_context is not None:
+            # 持久化用户目录在关闭时写回磁盘
+            try:
+                await self.browser_context.close()
+            except Exception as e:
+                logger.error(f"关闭浏览器失败: {e}")
+
+
+@lru_cache(maxsize=4096)
+def extract_brand(sku_name):
+    """
+    从商品名称中提取品牌信息
+    规则：优先取第一个括号前的内容，若无括号则取第一个空格前的内容
+
+    重复抓取的商品名称通常不变，按名称缓存结果
+    """
+    if not sku_name:
+        return ""
+
+    # 模式1：匹配"品牌（英文）"结构（支持中英文括号）
+    pattern1 = r'^([^\(\（]+?)\s*[\(\（]'
+    # 模式2：匹配首个空格前的连续非空字符
+    pattern2 = r'^(\S+?)\s'
+
+    # 先尝试匹配括号模式
+    match = re.search(pattern1, sku_name)
+    if match:
+        return match.group(1).strip()
+
+    # 再尝试匹配空格模式
+    match = re.search(pattern2, sku_name)
+    if match:
+        return match.group(1).strip()
+
+    # 两种模式都不匹配时取前5个字符（防止过长无效字符）
+    return sku_name[:5].strip()
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Callable, List, Optional, Tuple
+
+from playwright.async_api import BrowserContext
+
+import services.logger.logger as logger
+from services.metrics.metrics import SESSION_PROBES
+
+HOME_URL = "https://www.jd.com/"
+# 返回当前登录状态的 JSONP 接口，只有几十字节，不需要渲染页面
+PROBE_URL = "https://passport.jd.com/loginservice.aspx?method=Login"
+_AUTHENTICATED_RE = re.compile(r'"IsAuthenticated"\s*:\s*(true|false)')
+
+# 决定登录状态的 cookies，其中任意一个缺失或过期即视为未登录
+AUTH_COOKIES = ("thor", "pin")
+
+# 本地检查的结果
+MISSING = "missing"
+EXPIRED = "expired"
+EXPIRING = "expiring"
+VALID = "valid"
+
+
+def load_cookies(path: str) -> Optional[List[dict]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cookies(path: str, cookies: List[dict]):
+    """先写临时文件再替换，其他进程不会读到写了一半的文件"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cookies, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+
+def check_cookies(cookies: Optional[List[dict]], refresh_before: float = 0,
+                  now: Optional[float] = None) -> Tuple[str, Optional[float]]:
+    """
+    只根据 cookies 中的 expires 字段判断登录状态，不访问网络
+
+    :return: (状态, 最早过期时间)，会话级 cookie（expires 为 -1）没有过期时间，不参与计算
+    """
+    if not cookies:
+        return MISSING, None
+    now = time.time() if now is None else now
+    by_name = {cookie.get("name"): cookie for cookie in cookies}
+    expires_at = None
+    for name in AUTH_COOKIES:
+        cookie = by_name.get(name)
+        if cookie is None or not cookie.get("value"):
+            return MISSING, None
+        expires = cookie.get("expires", -1)
+        if expires is not None and expires > 0:
+            expires_at = expires if expires_at is None else min(expires_at, expires)
+    if expires_at is None:
+        return VALID, None
+    if expires_at <= now:
+        return EXPIRED, expires_at
+    if expires_at - now <= refresh_before:
+        return EXPIRING, expires_at
+    return VALID, expires_at
+
+
+async def probe_session(context: BrowserContext, timeout: float = 5) -> Optional[bool]:
+    """
+    用浏览器上下文的 cookies 请求登录状态接口
+
+    :return: True 已登录，False 未登录，None 网络异常无法判断
+    """
+    try:
+        response = await context.request.get(PROBE_URL, headers={"Referer": HOME_URL}, timeout=timeout * 1000)
+        text = await response.text()
+    except Exception as e:
+        logger.debug(f"登录状态探测失败: {e}")
+        SESSION_PROBES.inc(result="error")
+        return None
+    match = _AUTHENTICATED_RE.search(text)
+    if match is None:
+        SESSION_PROBES.inc(result="error")
+        return None
+    authenticated = match.group(1) == "true"
+    SESSION_PROBES.inc(result="ok" if authenticated else "expired")
+    return authenticated
+
+
+class SessionManager:
+    """
+    后台维持京东登录会话
+
+    - 每 probe_interval 秒请求一次登录状态接口，不打开页面
+    - 探测成功后把浏览器中被京东续期的 cookies 写回 cookies_path；临近过期时先打开一次首页触发续期
+    - cookies_path 被其他进程（另一个抓取进程或重新登录）更新后，重新加载到浏览器中
+    - 确认已登录或重新加载后，把浏览器中的 cookies 传给 on_cookies（HTTP 快速通道据此更新 cookies）
+    - 会话失效只记录状态和日志，不阻塞抓取，也不退出进程
+    """
+
+    def __init__(self,
+                 context: BrowserContext,
+                 cookies_path: str,
+                 probe_interval: float = 600,
+                 refresh_before: float = 3 * 86400,
+                 probe_timeout: float = 5,
+                 on_cookies: Optional[Callable[[List[dict]], None]] = None):
+        self.context = context
+        self.cookies_path = cookies_path
+        self.probe_interval = probe_interval
+        self.refresh_before = refresh_before
+        self.probe_timeout = probe_timeout
+        self.on_cookies = on_cookies
+        self._task: Optional[asyncio.Task] = None
+        self._file_mtime = self._mtime()
+        self._saved_auth: Optional[tuple] = None
+
+        self.state = VALID
+        self.expires_at: Optional[float] = None
+        self.last_probe_at = 0.0
+
+        # 统计信息
+        self.probes = 0
+        self.probe_errors = 0
+        self.refreshes = 0
+        self.saves = 0
+        self.reloads = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.error(f"检查登录会话失败: {e}")
+
+    async def check_once(self):
+        await self._reload_if_changed()
+        authenticated = await probe_session(self.context, self.probe_timeout)
+        self.probes += 1
+        self.last_probe_at = time.time()
+        if authenticated is None:
+            # 网络波动，保留上一次的状态
+            self.probe_errors += 1
+            return
+        if not authenticated:
+            if self.state != EXPIRED:
+                logger.error("京东登录已失效，抓取结果可能缺少价格，请关闭 Headless 后重新登录")
+            self.state = EXPIRED
+            return
+
+        cookies = await self.context.cookies()
+        state, self.expires_at = check_cookies(cookies, self.refresh_before)
+        if state == EXPIRING:
+            await self.refresh()
+            cookies = await self.context.cookies()
+            state, self.expires_at = check_cookies(cookies, self.refresh_before)
+        # 接口确认已登录，本地过期时间只用来决定是否续期
+        self.state = EXPIRING if state == EXPIRING else VALID
+        self._save_if_changed(cookies)
+        self._publish(cookies)
+
+    async def refresh(self):
+        """打开一次首页，京东会在响应中延长登录 cookies 的有效期"""
+        page = await self.context.new_page()
+        try:
+            await page.goto(HOME_URL, wait_until="domcontentloaded", timeout=self.probe_timeout * 1000 * 4)
+            self.refreshes += 1
+        except Exception as e:
+            logger.warning(f"刷新登录会话失败: {e}")
+        finally:
+            await page.close()
+
+    async def _reload_if_changed(self):
+        mtime = self._mtime()
+        if mtime is None or mtime == self._file_mtime:
+            return
+        self._file_mtime = mtime
+        cookies = load_cookies(self.cookies_path)
+        if cookies and check_cookies(cookies)[0] in (VALID, EXPIRING):
+            await self.context.add_cookies(cookies)
+            self._saved_auth = self._auth_key(cookies)
+            self.reloads += 1
+            logger.info("Cookies 文件已更新，重新加载到浏览器")
+            self._publish(await self.context.cookies())
+
+    def _publish(self, cookies: List[dict]):
+        if self.on_cookies is None:
+            return
+        try:
+            self.on_cookies(cookies)
+        except Exception as e:
+            logger.error(f"同步 Cookies 失败: {e}")
+
+    def _save_if_changed(self, cookies: List[dict]):
+        auth = self._auth_key(cookies)
+        if auth == self._saved_auth:
+            return
+        try:
+            save_cookies(self.cookies_path, cookies)
+        except OSError as e:
+            logger.error(f"保存 Cookies 失败: {e}")
+            return
+        self._saved_auth = auth
+        self._file_mtime = self._mtime()
+        self.saves += 1
+
+    @staticmethod
+    def _auth_key(cookies: List[dict]) -> tuple:
+        return tuple(sorted((c.get("name"), c.get("value"), c.get("expires")) for c in cookies
+                            if c.get("name") in AUTH_COOKIES))
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.cookies_path)
+        except OSError:
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "expires_in": int(self.expires_at - time.time()) if self.expires_at else None,
+            "last_probe_at": int(self.last_probe_at),
+            "probes": self.probes,
+            "probe_errors": self.probe_errors,
+            "refreshes": self.refreshes,
+            "saves": self.saves,
+            "reloads": self.reloads,
+        }
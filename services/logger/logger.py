@@ -8,6 +8,8 @@ import logging
 import logging.handlers
 from typing import Optional, TextIO
 
+from global_conf import global_vars
+
 # 配置日志格式
 def setup_logger(name: str, level: int = logging.INFO, 
                 log_file: Optional[str] = None, 
@@ -87,27 +89,28 @@ def log_level_to_python(level: str) -> int:
     return level_map.get(level.lower(), logging.INFO)
 
 # 日志函数别名，方便从原Go代码迁移
+# stacklevel=2 让日志记录中的函数名、行号指向调用方而不是这里
 def debug(msg: str, *args, **kwargs) -> None:
     """Debug级别日志"""
-    from global_conf.global_vars import Logger
-    Logger.debug(msg, *args, **kwargs)
+    kwargs.setdefault("stacklevel", 2)
+    global_vars.Logger.debug(msg, *args, **kwargs)
 
 def info(msg: str, *args, **kwargs) -> None:
     """Info级别日志"""
-    from global_conf.global_vars import Logger
-    Logger.info(msg, *args, **kwargs)
+    kwargs.setdefault("stacklevel", 2)
+    global_vars.Logger.info(msg, *args, **kwargs)
 
 def warning(msg: str, *args, **kwargs) -> None:
     """Warning级别日志"""
-    from global_conf.global_vars import Logger
-    Logger.warning(msg, *args, **kwargs)
+    kwargs.setdefault("stacklevel", 2)
+    global_vars.Logger.warning(msg, *args, **kwargs)
 
 def error(msg: str, *args, **kwargs) -> None:
     """Error级别日志"""
-    from global_conf.global_vars import Logger
-    Logger.error(msg, *args, **kwargs)
+    kwargs.setdefault("stacklevel", 2)
+    global_vars.Logger.error(msg, *args, **kwargs)
 
 def critical(msg: str, *args, **kwargs) -> None:
     """Critical级别日志"""
-    from global_conf.global_vars import Logger
-    Logger.critical(msg, *args, **kwargs)
+    kwargs.setdefault("stacklevel", 2)
+    global_vars.Logger.critical(msg, *args, **kwargs)
@@ -0,0 +1,312 @@
+"""
+队列日志
+
+业务代码中的 logger.info 只把日志记录放入有界队列，由后台线程批量格式化并写入控制台和文件，
+事件循环线程不再直接做磁盘和 stdout I/O。队列满时丢弃新记录并按级别计数。
+
+文件按大小或时间轮转，轮转出的文件在单独的线程中 gzip 压缩。
+"""
+
+import datetime
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from services.metrics.metrics import LOG_DROPPED
+
+# LogRecord 自带的属性，其余属性视为 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，logger.info(msg, extra={...}) 中的字段原样输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "func": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "process": record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BoundedQueueHandler(logging.Handler):
+    """
+    把日志记录放入有界队列
+
+    调用方线程只计算消息文本（避免参数对象之后被修改），格式化和写入由 QueueLogListener 完成。
+    队列满时不阻塞调用方，直接丢弃并计数。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__()
+        self.queue = log_queue
+        self.dropped: Dict[str, int] = {}
+        self.enqueued = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info and not record.exc_text:
+                # traceback 会引用调用栈上的对象，在调用方线程中转为文本
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+            LOG_DROPPED.inc(level=record.levelname)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """一批日志拼接后一次写入并 flush"""
+
+    def emit_batch(self, records: Sequence[logging.LogRecord]):
+        lines = [self.format(record) + self.terminator for record in records if record.levelno >= self.level]
+        if not lines:
+            return
+        with self.lock:
+            try:
+                self.stream.write("".join(lines))
+                self.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+class RotatingCompressedFileHandler(logging.Handler):
+    """
+    按大小和/或时间轮转的日志文件
+
+    - max_bytes：当前文件写入后将超过该大小时轮转，0 表示不按大小轮转
+    - when：midnight（每天零点）、hourly 或空字符串（不按时间轮转）
+    - 轮转出的文件命名为 {filename}.{时间}，compress 为 True 时在后台压缩为 .gz，最多保留 backup_count 个
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 50 * 1024 * 1024, when: str = "midnight",
+                 backup_count: int = 14, compress: bool = True, encoding: str = "utf-8"):
+        super().__init__()
+        if when not in ("", "midnight", "hourly"):
+            raise ValueError(f"Invalid log rotation interval: {when}")
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.when = when
+        self.backup_count = backup_count
+        self.compress = compress
+        self.encoding = encoding
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        self._stream = open(self.filename, "a", encoding=self.encoding)
+        self._size = self._stream.tell()
+        self._rollover_at = self._next_rollover(time.time())
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compress")
+
+        # 统计信息
+        self.rotations = 0
+
+    def _next_rollover(self, now: float) -> Optional[float]:
+        current = datetime.datetime.fromtimestamp(now)
+        if self.when == "midnight":
+            return (current.replace(hour=0, minute=0, second=0, microsecond=0)
+                    + datetime.timedelta(days=1)).timestamp()
+        if self.when == "hourly":
+            return (current.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)).timestamp()
+        return None
+
+    def emit(self, record: logging.LogRecord):
+        self.emit_batch([record])
+
+    def emit_batch(self, records: Sequence[logging.LogRecord]):
+        text = "".join(self.format(record) + "\n" for record in records if record.levelno >= self.level)
+        if not text:
+            return
+        data_size = len(text.encode(self.encoding))
+        with self.lock:
+            try:
+                now = time.time()
+                if ((self._rollover_at is not None and now >= self._rollover_at)
+                        or (self.max_bytes and self._size > 0 and self._size + data_size > self.max_bytes)):
+                    self._rotate(now)
+                self._stream.write(text)
+                self._stream.flush()
+                self._size += data_size
+            except Exception:
+                self.handleError(records[-1])
+
+    def _rotate(self, now: float):
+        self._stream.close()
+        suffix = datetime.datetime.fromtimestamp(now).strftime("%Y-%m-%d_%H-%M-%S")
+        rotated = f"{self.filename}.{suffix}"
+        index = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated = f"{self.filename}.{suffix}.{index}"
+            index += 1
+        os.replace(self.filename, rotated)
+        self._stream = open(self.filename, "a", encoding=self.encoding)
+        self._size = 0
+        self._rollover_at = self._next_rollover(now)
+        self.rotations += 1
+        if self.compress:
+            self._compressor.submit(self._compress_and_prune, rotated)
+        else:
+            self._prune()
+
+    def _compress_and_prune(self, path: str):
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except OSError as e:
+            sys.stderr.write(f"压缩日志文件 {path} 失败: {e}\n")
+        self._prune()
+
+    def _prune(self):
+        if self.backup_count <= 0:
+            return
+        backups = []
+        for path in glob.glob(glob.escape(self.filename) + ".*"):
+            try:
+                backups.append((os.path.getmtime(path), path))
+            except OSError:
+                # 正在压缩的文件可能刚被删除
+                continue
+        backups.sort()
+        for _, path in backups[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        with self.lock:
+            if not self._stream.closed:
+                self._stream.close()
+        self._compressor.shutdown(wait=True)
+        super().close()
+
+
+class QueueLogListener:
+    """
+    从队列中批量取出日志记录，交给各个 handler 写入
+
+    每次阻塞等待第一条记录，再非阻塞地取出最多 batch_size - 1 条，一批只写一次。
+    """
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.Handler], batch_size: int = 256):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+        self._stop = object()
+
+        # 统计信息
+        self.written = 0
+        self.batches = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            batch = []
+            stopping = record is self._stop
+            if not stopping:
+                batch.append(record)
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._stop:
+                    stopping = True
+                else:
+                    batch.append(record)
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: List[logging.LogRecord]):
+        for handler in self.handlers:
+            emit_batch = getattr(handler, "emit_batch", None)
+            if emit_batch is not None:
+                emit_batch(batch)
+            else:
+                for record in batch:
+                    handler.handle(record)
+        self.written += len(batch)
+        self.batches += 1
+
+    def stop(self, timeout: float = 5):
+        """写完队列中剩余的日志后关闭 handler"""
+        if self._thread is None:
+            return
+        # 队列已满时等待写线程腾出位置
+        try:
+            self.queue.put(self._stop, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+
+class QueuedLogging:
+    """把 logger 的输出切换为 BoundedQueueHandler + QueueLogListener"""
+
+    def __init__(self, logger: logging.Logger, handlers: List[logging.Handler],
+                 queue_size: int = 10000, batch_size: int = 256):
+        self.logger = logger
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = BoundedQueueHandler(self.queue)
+        self.listener = QueueLogListener(self.queue, handlers, batch_size)
+
+    def start(self):
+        self.listener.start()
+        self.logger.addHandler(self.handler)
+
+    def stop(self):
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+
+    def stats(self) -> dict:
+        rotations = sum(getattr(handler, "rotations", 0) for handler in self.listener.handlers)
+        return {
+            "pending": self.queue.qsize(),
+            "enqueued": self.handler.enqueued,
+            "written": self.listener.written,
+            "batches": self.listener.batches,
+            "dropped": dict(self.handler.dropped),
+            "rotations": rotations,
+        }
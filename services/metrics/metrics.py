@@ -0,0 +1,70 @@
+"""
+项目中使用的指标，在 /metrics 路由中以 Prometheus 格式输出
+"""
+
+from services.metrics.registry import Counter, Gauge, Histogram
+
+# ---- 抓取 ----
+
+# stage：fast_path（HTTP 快速通道）、page_acquire（等待页面池）、goto、wait_name、wait_price
+SCRAPE_STAGE_SECONDS = Histogram(
+    "jd_scrape_stage_seconds", "Time spent in each stage of a product scrape.", ["stage"],
+)
+# path：fast（快速通道命中）或 browser（浏览器渲染）
+SCRAPE_SECONDS = Histogram(
+    "jd_scrape_seconds", "End-to-end time of a product scrape.", ["path"],
+)
+SCRAPE_ERRORS = Counter(
+    "jd_scrape_errors_total", "Failed product scrapes by exception type.", ["type"],
+)
+SCRAPE_FIELD_MISSING = Counter(
+    "jd_scrape_field_missing_total", "Scrapes where a field could not be read from the page.", ["field"],
+)
+# result：ok（已登录）、expired（已失效）、error（网络异常，无法判断）
+SESSION_PROBES = Counter(
+    "jd_session_probes_total", "Login session probes by result.", ["result"],
+)
+CRAWL_JOB_SECONDS = Histogram(
+    "jd_crawl_job_seconds", "Time from submitting a job to the crawl worker pool to its result.", ["result"],
+)
+
+# ---- 数据库 ----
+
+DB_CALL_SECONDS = Histogram(
+    "jd_db_call_seconds", "Latency of MysqlUtil methods, including waiting for a pooled connection.", ["method"],
+)
+DB_ERRORS = Counter(
+    "jd_db_errors_total", "MysqlUtil errors by method and exception type.", ["method", "type"],
+)
+
+# ---- HTTP ----
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "jd_http_request_seconds", "HTTP request latency by route template.", ["route", "method", "status"],
+)
+
+# ---- 事件循环 ----
+
+# loop：main（HTTP 服务、抓取与后台任务共用的事件循环）
+LOOP_LAG_SECONDS = Histogram(
+    "jd_event_loop_lag_seconds", "Delay between when the loop monitor heartbeat was due and when it ran.", ["loop"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOOP_STALLS = Counter(
+    "jd_event_loop_stalls_total", "Times the event loop was blocked longer than the monitor threshold.", ["loop"],
+)
+
+# ---- 日志 ----
+
+LOG_DROPPED = Counter(
+    "jd_log_dropped_total", "Log records dropped because the logging queue was full.", ["level"],
+)
+
+# ---- 资源池 ----
+
+# pool：page（页面池）、mysql（数据库连接池）、crawl_workers（抓取进程）
+POOL_SIZE = Gauge("jd_pool_size", "Configured size of a resource pool.", ["pool"])
+POOL_IN_USE = Gauge("jd_pool_in_use", "Resources currently checked out of a pool.", ["pool"])
+QUEUE_PENDING = Gauge(
+    "jd_queue_pending", "Items waiting in an internal queue (write_behind, crawl_jobs).", ["queue"],
+)
@@ -0,0 +1,246 @@
+"""
+Prometheus 文本格式的指标
+
+只实现项目用到的 Counter / Gauge / Histogram，不引入 prometheus_client：
+抓取进程通过心跳把自己的指标快照发回 API 进程，由 Registry 与本进程的数值合并后统一输出。
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 秒，覆盖从一次数据库查询到一次完整页面渲染的耗时
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: "Optional[Registry]" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[LabelKey, object]:
+        raise NotImplementedError
+
+    def samples(self, values: Dict[LabelKey, object]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(a: Optional[float], b: float) -> float:
+        return (a or 0) + b
+
+    def samples(self, values: Dict[LabelKey, float]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """
+    瞬时值
+
+    除了 set 之外可以用 set_function 注册回调，在输出时读取连接池、队列等组件的当前状态，
+    回调返回 [(标签字典, 值), ...]。
+    """
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._functions: List[Callable[[], Iterable[Tuple[dict, float]]]] = []
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], Iterable[Tuple[dict, float]]]):
+        self._functions.append(fn)
+
+    def snapshot(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            values = dict(self._values)
+        for fn in self._functions:
+            try:
+                for labels, value in fn():
+                    values[self._key(labels)] = value
+            except Exception:
+                # 组件未初始化或已关闭时跳过，不影响其他指标输出
+                continue
+        return values
+
+    @staticmethod
+    def merge(a: Optional[float], b: float) -> float:
+        return (a or 0) + b
+
+    def samples(self, values: Dict[LabelKey, float]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: "Optional[Registry]" = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶计数（非累计，最后一个为 +Inf）, 总和, 次数]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """统计代码块耗时，代码块抛出异常时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[LabelKey, list]:
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    @staticmethod
+    def merge(a: Optional[list], b: list) -> list:
+        if a is None:
+            return [list(b[0]), b[1], b[2]]
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def samples(self, values: Dict[LabelKey, list]) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    指标注册表
+
+    update_remote 保存其他进程发来的最新快照，输出时与本进程的数值相加；
+    远端进程重启前调用 retire_remote，把它最后一次快照并入累计值，保证计数器不回退。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, dict] = {}
+        self._retired: dict = {}
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicated metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        """本进程计数器和直方图的快照，可以通过 multiprocessing 队列传给其他进程"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics if metric.kind != "gauge"}
+
+    def update_remote(self, source: str, snapshot: dict):
+        with self._lock:
+            self._remote[source] = snapshot
+
+    def retire_remote(self, source: str):
+        with self._lock:
+            snapshot = self._remote.pop(source, None)
+            if snapshot is not None:
+                self._retired = self._merge(self._retired, snapshot)
+
+    def _merge(self, base: dict, snapshot: dict) -> dict:
+        merged = {name: dict(values) for name, values in base.items()}
+        for name, values in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            target = merged.setdefault(name, {})
+            for key, value in values.items():
+                key = tuple(key)
+                target[key] = metric.merge(target.get(key), value)
+        return merged
+
+    def render(self) -> str:
+        """输出 Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            others = self._retired
+            for snapshot in self._remote.values():
+                others = self._merge(others, snapshot)
+
+        lines = []
+        for metric in metrics:
+            values = metric.snapshot()
+            for key, value in others.get(metric.name, {}).items():
+                values[key] = metric.merge(values.get(key), value)
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(values))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -1,9 +1,28 @@
+import hashlib
 from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
 @dataclass
+class ProductQuery:
+    """
+    商品列表查询条件，按 (price, sku_code) 升序做游标分页
+
+    after_price/after_sku_code 为上一页最后一条记录，均为 None 时从第一条开始
+    """
+    type: str
+    limit: int = 50
+    after_price: Optional[float] = None
+    after_sku_code: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    brand: Optional[str] = None
+    is_taken_down: Optional[int] = None
+
+
+@dataclass(slots=True)
 class SkuInfo:
+    """抓取结果，slots 避免每个实例一个 __dict__"""
     sku_code: str
     sku_name: str = ""
     price: float = 0.0
@@ -23,6 +42,11 @@ class SkuInfo:
             'is_taken_down': self.is_taken_down
         }
 
+    def fingerprint(self) -> str:
+        """抓取内容指纹：名称、价格（分）、下架状态都不变时指纹相同"""
+        content = f"{self.sku_name}\x1f{int(round(float(self.price or 0) * 100))}\x1f{int(self.is_taken_down or 0)}"
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
 
 class SkuType(str, Enum):
     GPU = "显卡"
@@ -38,13 +62,19 @@ class SkuType(str, Enum):
 
     @classmethod
     def get_type_code(cls, sku_type_str: str) -> int:
-        for i, member in enumerate(cls):
-            if member.value == sku_type_str:
-                return i + 1
-        raise ValueError(f"Invalid sku type: {sku_type_str}")
+        try:
+            return _TYPE_CODES[sku_type_str]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid sku type: {sku_type_str}")
 
     @classmethod
     def get_type_str(cls, type_code: int) -> str:
-        if 1 <= type_code <= len(cls):
-            return list(cls)[type_code - 1].value
-        raise ValueError(f"Invalid type code: {type_code}")
\ No newline at end of file
+        try:
+            return _TYPE_STRS[type_code]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid type code: {type_code}")
+
+
+# 类型名称与编号的对应关系，编号按定义顺序从 1 开始，与数据库中的 type 列一致
+_TYPE_CODES = {member.value: code for code, member in enumerate(SkuType, 1)}
+_TYPE_STRS = {code: value for value, code in _TYPE_CODES.items()}
\ No newline at end of file
@@ -0,0 +1,194 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+import services.logger.logger as logger
+from services.metrics.metrics import LOOP_LAG_SECONDS, LOOP_STALLS
+
+# 事件循环自身的调度代码，出现在每个栈的最外层，不参与归类
+_LOOP_INTERNAL_FILES = ("asyncio/base_events.py", "asyncio/runners.py", "asyncio/events.py",
+                        "concurrent/futures/thread.py", "threading.py")
+
+
+class _Offender:
+    __slots__ = ("key", "stack", "count", "total_blocked", "max_blocked", "last_seen")
+
+    def __init__(self, key: str, stack: List[str]):
+        self.key = key
+        self.stack = stack
+        self.count = 0
+        self.total_blocked = 0.0
+        self.max_blocked = 0.0
+        self.last_seen = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "location": self.key,
+            "count": self.count,
+            "total_blocked_seconds": round(self.total_blocked, 3),
+            "max_blocked_seconds": round(self.max_blocked, 3),
+            "last_seen": int(self.last_seen),
+            "stack": self.stack,
+        }
+
+
+class LoopLagMonitor:
+    """
+    事件循环阻塞检测
+
+    - 心跳协程每 interval 秒醒来一次，实际醒来时间与预期之差即调度延迟，记录到 jd_event_loop_lag_seconds
+    - 看门狗线程发现心跳超过 threshold 秒没有推进时，通过 sys._current_frames() 抓取事件循环线程的调用栈，
+      即正在占用事件循环的回调；心跳恢复后把这次阻塞的时长记到该调用栈上
+    - 按调用栈最内层的几帧归类，保留阻塞总时长最多的 max_offenders 个位置
+
+    看门狗没来得及抓到调用栈的短暂阻塞只计入延迟，归类为 unattributed。
+    """
+
+    def __init__(self,
+                 name: str,
+                 interval: float = 0.1,
+                 threshold: float = 0.1,
+                 key_frames: int = 3,
+                 max_offenders: int = 50):
+        self.name = name
+        self.interval = interval
+        self.threshold = threshold
+        self.key_frames = key_frames
+        self.max_offenders = max_offenders
+
+        self._lock = threading.Lock()
+        self._offenders: Dict[str, _Offender] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._last_beat = 0.0
+        # 看门狗在当前这次阻塞中抓到的调用栈，心跳恢复后由心跳协程结算
+        self._pending_stall: Optional[_Offender] = None
+
+        # 统计信息
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.total_blocked = 0.0
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """在被监控的事件循环中调用"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name=f"loop-monitor-{self.name}", daemon=True)
+        self._watchdog.start()
+        logger.info(f"事件循环 {self.name} 阻塞检测已启动，阈值 {self.threshold * 1000:.0f}ms")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        if self._loop is asyncio.get_running_loop():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(task.cancel)
+
+    # ---- 检测 ----
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            LOOP_LAG_SECONDS.observe(lag, loop=self.name)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._record_stall(lag)
+            elif self._pending_stall is not None:
+                # 看门狗抓到栈后循环很快恢复，延迟未达到阈值，不计入
+                with self._lock:
+                    self._pending_stall = None
+
+    def _watch(self):
+        check = min(self.interval, self.threshold) / 2
+        captured_beat = None
+        while not self._stopped.wait(check):
+            beat = self._last_beat
+            if time.monotonic() - beat < self.interval + self.threshold or beat == captured_beat:
+                continue
+            # 同一次阻塞只抓一次调用栈
+            captured_beat = beat
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            offender = self._describe(frame)
+            with self._lock:
+                self._pending_stall = offender
+
+    def _describe(self, frame) -> _Offender:
+        summary = traceback.extract_stack(frame)
+        frames = [entry for entry in summary
+                  if not entry.filename.replace("\\", "/").endswith(_LOOP_INTERNAL_FILES)]
+        stack = [f"{entry.filename}:{entry.lineno} {entry.name}" for entry in frames[-30:]]
+        key = " <- ".join(reversed(stack[-self.key_frames:])) or "unattributed"
+        return _Offender(key, stack)
+
+    def _record_stall(self, lag: float):
+        LOOP_STALLS.inc(loop=self.name)
+        with self._lock:
+            captured, self._pending_stall = self._pending_stall, None
+            key = captured.key if captured is not None else "unattributed"
+            offender = self._offenders.get(key)
+            if offender is None:
+                offender = self._offenders[key] = captured if captured is not None else _Offender(key, [])
+            offender.count += 1
+            offender.total_blocked += lag
+            offender.max_blocked = max(offender.max_blocked, lag)
+            offender.last_seen = time.time()
+            self.stalls += 1
+            self.total_blocked += lag
+            if len(self._offenders) > self.max_offenders:
+                smallest = min((o for o in self._offenders.values() if o is not offender),
+                               key=lambda o: o.total_blocked)
+                del self._offenders[smallest.key]
+        if captured is not None:
+            logger.warning(f"事件循环 {self.name} 被阻塞 {lag * 1000:.0f}ms: {captured.key}")
+
+    # ---- 报告 ----
+
+    def report(self, limit: int = 20) -> dict:
+        with self._lock:
+            offenders = sorted(self._offenders.values(), key=lambda o: o.total_blocked, reverse=True)
+            top = [offender.to_dict() for offender in offenders[:limit]]
+        return {
+            "loop": self.name,
+            "threshold_seconds": self.threshold,
+            "stats": self.stats(),
+            "offenders": top,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._offenders.clear()
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.total_blocked = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "stalls": self.stalls,
+            "total_blocked_seconds": round(self.total_blocked, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+            "offenders": len(self._offenders),
+        }
@@ -0,0 +1,279 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+import services.logger.logger as logger
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls", "filename")
+HEAP_STAT_KEYS = ("lineno", "filename", "traceback")
+
+
+class ProfilerBusyError(Exception):
+    """同一时间只能有一个 cProfile 在运行"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """
+    采样所有线程的调用栈
+
+    每 interval 秒读取一次 sys._current_frames()，返回 {"线程名;外层函数;...;内层函数": 次数}，
+    即 flamegraph.pl / speedscope 可以直接读取的 collapsed 格式。
+    开销只与采样频率有关，不会像 cProfile 一样拖慢被分析的代码。
+    """
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def format_stats(profile, sort: str = "cumulative", limit: int = 50) -> str:
+    """把 cProfile.Profile 或 .prof 文件路径格式化为 pstats 文本"""
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# 慢请求分析的范围说明，随 /debug/pprof/slow 一起返回
+SLOW_PROFILE_SCOPE = ("cProfile records the whole event-loop thread while the request is in flight, "
+                      "including other requests and background tasks running concurrently; "
+                      "it is not a per-request profile")
+
+
+class Profiler:
+    """
+    运行时性能分析（/debug/pprof 路由）
+
+    - CPU：cProfile 分析 HTTP 事件循环所在线程，或按固定间隔采样所有线程的调用栈
+    - 内存：tracemalloc 快照及两次快照之间的差异
+    - 慢请求：按 slow_request_sample_rate 抽样对请求启用 cProfile，耗时超过阈值时保存到 profile_dir
+
+    cProfile 按线程生效，同一时间只允许一个（按需采集或慢请求抽样），已有分析在运行时慢请求抽样直接跳过。
+    慢请求的分析覆盖的是整个事件循环线程而不只是这一个请求：请求 await 期间同一线程上运行的其他请求、
+    后台刷新和写入缓冲等协程都会计入，保存的 .prof 用来定位这段时间内事件循环在忙什么，不能当作单个请求的开销。
+    """
+
+    def __init__(self,
+                 profile_dir: str = "profiles",
+                 max_seconds: float = 60,
+                 sample_interval: float = 0.005,
+                 slow_request_threshold: float = 2.0,
+                 slow_request_sample_rate: float = 0.1,
+                 max_saved_profiles: int = 50,
+                 max_heap_snapshots: int = 10,
+                 tracemalloc_frames: int = 10):
+        self.profile_dir = profile_dir
+        self.max_seconds = max_seconds
+        self.sample_interval = sample_interval
+        self.slow_request_threshold = slow_request_threshold
+        self.slow_request_sample_rate = slow_request_sample_rate
+        self.max_saved_profiles = max_saved_profiles
+        self.max_heap_snapshots = max_heap_snapshots
+        self.tracemalloc_frames = tracemalloc_frames
+
+        self._cprofile_lock = threading.Lock()
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._next_snapshot_id = 0
+
+        # 统计信息
+        self.cpu_profiles = 0
+        self.requests_profiled = 0
+        self.slow_requests_saved = 0
+
+    # ---- CPU ----
+
+    async def cpu_profile(self, seconds: float) -> cProfile.Profile:
+        """对当前事件循环所在线程运行 cProfile seconds 秒"""
+        seconds = min(seconds, self.max_seconds)
+        if not self._cprofile_lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another cProfile session is running")
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+        finally:
+            self._cprofile_lock.release()
+        self.cpu_profiles += 1
+        return profile
+
+    async def sample(self, seconds: float) -> Counter:
+        """在单独的线程中采样所有线程的调用栈，不阻塞事件循环"""
+        seconds = min(seconds, self.max_seconds)
+        stacks = await asyncio.to_thread(sample_stacks, seconds, self.sample_interval)
+        self.cpu_profiles += 1
+        return stacks
+
+    # ---- 慢请求 ----
+
+    def begin_request(self) -> Optional[cProfile.Profile]:
+        """
+        按抽样率为请求启用 cProfile，未抽中或已有分析在运行时返回 None
+
+        cProfile 无法按 asyncio 任务过滤，从 begin_request 到 end_request 之间事件循环线程上执行的所有代码都会被记录
+        """
+        if self.slow_request_threshold <= 0 or random.random() >= self.slow_request_sample_rate:
+            return None
+        if not self._cprofile_lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except BaseException:
+            self._cprofile_lock.release()
+            raise
+        return profile
+
+    def end_request(self, profile: cProfile.Profile, elapsed: float, method: str, route: str) -> Optional[str]:
+        """结束请求的 cProfile，耗时超过阈值时保存，返回保存的文件名"""
+        try:
+            profile.disable()
+        finally:
+            self._cprofile_lock.release()
+        self.requests_profiled += 1
+        if elapsed < self.slow_request_threshold:
+            return None
+
+        route_name = re.sub(r"[^A-Za-z0-9_-]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{route_name}-{int(elapsed * 1000)}ms.prof"
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile.dump_stats(os.path.join(self.profile_dir, name))
+            self._prune_saved()
+        except OSError as e:
+            logger.error(f"保存慢请求性能分析失败: {e}")
+            return None
+        self.slow_requests_saved += 1
+        logger.warning(f"慢请求 {method} {route} 耗时 {elapsed:.2f}s，性能分析已保存: {name}")
+        return name
+
+    def saved_profiles(self) -> List[dict]:
+        """已保存的慢请求分析，按时间从新到旧"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.profile_dir):
+            if not name.endswith(".prof"):
+                continue
+            path = os.path.join(self.profile_dir, name)
+            entries.append({"name": name, "size": os.path.getsize(path), "mtime": int(os.path.getmtime(path))})
+        entries.sort(key=lambda entry: (entry["mtime"], entry["name"]), reverse=True)
+        return entries
+
+    def saved_profile_path(self, name: str) -> Optional[str]:
+        """返回保存的分析文件路径，name 不合法或文件不存在时返回 None"""
+        if os.path.basename(name) != name or not name.endswith(".prof"):
+            return None
+        path = os.path.join(self.profile_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def _prune_saved(self):
+        for entry in self.saved_profiles()[self.max_saved_profiles:]:
+            os.remove(os.path.join(self.profile_dir, entry["name"]))
+
+    # ---- 内存 ----
+
+    def heap_start(self, frames: Optional[int] = None):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames or self.tracemalloc_frames)
+            logger.info("tracemalloc 已启动")
+
+    def heap_stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc 已停止")
+        self._snapshots.clear()
+
+    def heap_snapshot(self) -> int:
+        """
+        保存一个 tracemalloc 快照并返回编号，未启动时先启动
+
+        只保留最近 max_heap_snapshots 个快照
+        """
+        self.heap_start()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        self._next_snapshot_id += 1
+        self._snapshots[self._next_snapshot_id] = snapshot
+        while len(self._snapshots) > self.max_heap_snapshots:
+            self._snapshots.popitem(last=False)
+        return self._next_snapshot_id
+
+    def heap_top(self, snapshot_id: int, key: str = "lineno", limit: int = 30) -> List[dict]:
+        snapshot = self._get_snapshot(snapshot_id)
+        return [{
+            "location": self._format_trace(stat.traceback),
+            "size": stat.size,
+            "count": stat.count,
+        } for stat in snapshot.statistics(key)[:limit]]
+
+    def heap_diff(self, from_id: int, to_id: int, key: str = "lineno", limit: int = 30) -> List[dict]:
+        """两次快照之间增长最多的分配位置"""
+        old = self._get_snapshot(from_id)
+        new = self._get_snapshot(to_id)
+        return [{
+            "location": self._format_trace(stat.traceback),
+            "size": stat.size,
+            "size_diff": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        } for stat in new.compare_to(old, key)[:limit]]
+
+    def _get_snapshot(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is None:
+            raise KeyError(f"Heap snapshot {snapshot_id} not found")
+        return snapshot
+
+    @staticmethod
+    def _format_trace(traceback: tracemalloc.Traceback) -> List[str]:
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+    def stats(self) -> Dict[str, object]:
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "cpu_profiles": self.cpu_profiles,
+            "cprofile_running": self._cprofile_lock.locked(),
+            "requests_profiled": self.requests_profiled,
+            "slow_requests_saved": self.slow_requests_saved,
+            "slow_request_threshold": self.slow_request_threshold,
+            "tracemalloc": tracemalloc.is_tracing(),
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+            "heap_snapshots": list(self._snapshots),
+        }
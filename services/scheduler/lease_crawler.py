@@ -0,0 +1,240 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import services.logger.logger as logger
+from services.db.remote.crawl_lease import CrawlLeaseCoordinator
+from services.db.remote.mysqlutil import AsyncMysqlUtil
+from services.jdhelper.error import TuringVerificationRequiredError
+from services.scheduler.refresher import RateLimiter, call_in_loop
+
+
+class LeaseCrawler:
+    """
+    多节点模式下的后台抓取
+
+    替代 PriceRefresher 的本地调度队列：由 CrawlLeaseCoordinator 从 jd_crawl_lease 领取到期的 SKU，
+    抓取成功后按 next_crawl_in(sku_code) 给出的间隔设置下次抓取时间，失败按 attempts 指数退避。
+    领取数量不超过空闲的并发槽位，持有期间每 heartbeat_interval 秒统一续租一次；
+    续租时发现租约已被其他节点接手的 SKU，取消其进行中的抓取，不再写回租约。
+    与 PriceRefresher 提供相同的 start/pause/resume/stop/stats 接口。
+    """
+
+    def __init__(self,
+                 mysql: AsyncMysqlUtil,
+                 coordinator: CrawlLeaseCoordinator,
+                 refresh: Callable[[str, int], Awaitable[Optional[dict]]],
+                 next_crawl_in: Callable[[str], float],
+                 concurrency: int = 2,
+                 rate: float = 0.5,
+                 burst: float = 2,
+                 claim_batch: int = 10,
+                 heartbeat_interval: float = 30,
+                 idle_interval: float = 5,
+                 reseed_interval: float = 300,
+                 first_interval: float = 6 * 3600,
+                 retry_delay: float = 60,
+                 max_retry_delay: float = 3600,
+                 verify_cooldown: float = 600):
+        self.mysql = mysql
+        self.coordinator = coordinator
+        self._refresh = refresh
+        self._next_crawl_in = next_crawl_in
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst)
+        self.claim_batch = claim_batch
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_interval = idle_interval
+        self.reseed_interval = reseed_interval
+        self.first_interval = first_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.verify_cooldown = verify_cooldown
+
+        self._held: Dict[str, int] = {}
+        self._crawls: Dict[str, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._main_tasks: Set[asyncio.Task] = set()
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._resumed: Optional[asyncio.Event] = None
+        self._paused = False
+        self._paused_until = 0.0
+        self._closed = False
+
+        # 统计信息
+        self.refreshed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.verify_pauses = 0
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        if self._main_tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._slot_freed = asyncio.Event()
+        self._resumed = asyncio.Event()
+        if not self._paused:
+            self._resumed.set()
+        for coro in (self._run(), self._heartbeat(), self._reseed()):
+            self._main_tasks.add(asyncio.create_task(coro))
+        logger.info(f"多节点抓取已启动，节点 {self.coordinator.node_id}，并发 {self.concurrency}")
+
+    def pause(self):
+        self._paused = True
+        if self._resumed is not None:
+            call_in_loop(self._loop, self._resumed.clear)
+
+    def resume(self):
+        self._paused = False
+        self._paused_until = 0.0
+        if self._resumed is not None:
+            call_in_loop(self._loop, self._resumed.set)
+
+    async def stop(self):
+        """停止领取新任务，取消进行中的抓取并释放持有的租约"""
+        self._closed = True
+        if not self._main_tasks:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            if self._loop.is_closed() or not self._loop.is_running():
+                return
+            future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            await asyncio.wrap_future(future)
+        else:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        held = list(self._held)
+        tasks = [*self._main_tasks, *self._tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # 立即释放，其他节点不必等租约过期
+        for sku_code in held:
+            try:
+                await self.mysql.run(self.coordinator.release, sku_code, 0)
+            except Exception as e:
+                logger.error(f"释放抓取租约 {sku_code} 失败: {e}")
+                break
+        self._held.clear()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    # ---- 调度 ----
+
+    async def _run(self):
+        while not self._closed:
+            await self._resumed.wait()
+            cooldown = self._paused_until - time.monotonic()
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
+                continue
+
+            free = self.concurrency - len(self._held)
+            if free <= 0:
+                self._slot_freed.clear()
+                await self._slot_freed.wait()
+                continue
+
+            try:
+                rows = await self.mysql.run(self.coordinator.claim, min(free, self.claim_batch))
+            except Exception as e:
+                logger.error(f"领取抓取任务失败: {e}")
+                await asyncio.sleep(self.idle_interval)
+                continue
+            if not rows:
+                await asyncio.sleep(self.idle_interval)
+                continue
+
+            for row in rows:
+                self._held[row['sku_code']] = int(row['attempts']) + 1
+                task = asyncio.create_task(self._crawl_one(row['sku_code'], int(row['type'])))
+                self._crawls[row['sku_code']] = task
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _crawl_one(self, sku_code: str, sku_type: int):
+        try:
+            await self.limiter.acquire()
+            try:
+                sku_info = await self._refresh(sku_code, sku_type)
+            except TuringVerificationRequiredError as e:
+                self.verify_pauses += 1
+                self._paused_until = time.monotonic() + self.verify_cooldown
+                logger.warning(f"多节点抓取触发人机验证，暂停 {self.verify_cooldown} 秒: {e.message}")
+                sku_info = None
+            except Exception as e:
+                logger.warning(f"多节点抓取商品 {sku_code} 失败: {getattr(e, 'message', None) or e}")
+                sku_info = None
+
+            if sku_info is None:
+                self.failed += 1
+                attempts = self._held.get(sku_code, 1)
+                delay = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+                await self.mysql.run(self.coordinator.release, sku_code, delay)
+            else:
+                self.refreshed += 1
+                await self.mysql.run(self.coordinator.complete, sku_code, self._next_crawl_in(sku_code))
+        except Exception as e:
+            # 租约写回失败时等待过期，由下一次领取接手
+            logger.error(f"更新抓取租约 {sku_code} 失败: {e}")
+        finally:
+            # 租约丢失后被取消的抓取已由 _cancel_lost 移除，不影响之后重新领取的同一商品
+            if self._crawls.get(sku_code) is asyncio.current_task():
+                del self._crawls[sku_code]
+                self._held.pop(sku_code, None)
+            self._slot_freed.set()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not self._held:
+                continue
+            sku_codes = list(self._held)
+            try:
+                renewed = set(await self.mysql.run(self.coordinator.heartbeat, sku_codes))
+            except Exception as e:
+                logger.error(f"抓取租约续期失败: {e}")
+                continue
+            for sku_code in sku_codes:
+                if sku_code not in renewed:
+                    self._cancel_lost(sku_code)
+
+    def _cancel_lost(self, sku_code: str):
+        """租约已被其他节点接手：取消本节点的抓取，由接手的节点完成"""
+        task = self._crawls.pop(sku_code, None)
+        self._held.pop(sku_code, None)
+        if task is not None and not task.done():
+            task.cancel()
+            self.cancelled += 1
+            logger.warning(f"商品 {sku_code} 的抓取租约已被其他节点接手，取消本节点的抓取")
+
+    async def _reseed(self):
+        """定期把新加入 jd_products_info 的商品登记到租约表"""
+        while True:
+            try:
+                added = await self.mysql.run(self.coordinator.seed, int(self.first_interval))
+                if added:
+                    logger.info(f"抓取租约表新增 {added} 个商品")
+            except Exception as e:
+                logger.error(f"登记抓取租约失败: {e}")
+            await asyncio.sleep(self.reseed_interval)
+
+    def stats(self) -> dict:
+        stats = self.coordinator.stats()
+        stats.update({
+            "running": any(not task.done() for task in self._main_tasks),
+            "paused": self._paused,
+            "cooldown_seconds": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "held": len(self._held),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "verify_pauses": self.verify_pauses,
+        })
+        return stats
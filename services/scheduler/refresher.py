@@ -0,0 +1,391 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import services.logger.logger as logger
+from services.jdhelper.error import NetworkError, TuringVerificationRequiredError
+
+
+class RateLimiter:
+    """
+    异步令牌桶限速
+
+    每秒补充 rate 个令牌，最多积累 burst 个，acquire 在令牌不足时等待
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def call_in_loop(loop: asyncio.AbstractEventLoop, fn: Callable[[], None]):
+    """已在 loop 中时直接执行 fn，否则（其他线程或事件循环）切回 loop 执行"""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        fn()
+    else:
+        loop.call_soon_threadsafe(fn)
+
+
+@dataclass
+class _RefreshItem:
+    sku_code: str
+    type: int
+    price: float = 0.0
+    is_taken_down: int = 0
+    last_refresh: float = 0.0
+    # 相对价格变化幅度的指数移动平均
+    volatility: float = 0.0
+    # 按半衰期衰减的访问次数
+    popularity: float = 0.0
+    popularity_at: float = 0.0
+    failures: int = 0
+    next_due: float = 0.0
+    version: int = 0
+
+
+class PriceRefresher:
+    """
+    按新鲜度调度的后台价格刷新
+
+    每个商品根据上次更新时间、价格波动和访问热度计算下次刷新时间：
+        interval = base_interval / ((1 + volatility_weight * volatility) * (1 + ln(1 + popularity)))
+    并限制在 [min_interval, max_interval] 之间，已下架商品的间隔再乘以 taken_down_factor。
+    到期的商品按到期时间从小根堆中取出，经过全局令牌桶限速和并发上限后调用 refresh 重新抓取。
+
+    - refresh 失败按指数退避重新排队
+    - 触发人机验证时整体暂停 verify_cooldown 秒
+    - pause/resume 手动暂停与恢复，暂停期间不发起新的抓取
+    """
+
+    def __init__(self,
+                 refresh: Callable[[str, int], Awaitable[Optional[dict]]],
+                 min_interval: float = 600,
+                 base_interval: float = 6 * 3600,
+                 max_interval: float = 24 * 3600,
+                 rate: float = 0.5,
+                 burst: float = 2,
+                 concurrency: int = 2,
+                 volatility_alpha: float = 0.3,
+                 volatility_weight: float = 20.0,
+                 popularity_half_life: float = 6 * 3600,
+                 taken_down_factor: float = 4.0,
+                 verify_cooldown: float = 600):
+        self._refresh = refresh
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.concurrency = concurrency
+        self.volatility_alpha = volatility_alpha
+        self.volatility_weight = volatility_weight
+        self.popularity_half_life = popularity_half_life
+        self.taken_down_factor = taken_down_factor
+        self.verify_cooldown = verify_cooldown
+        self.limiter = RateLimiter(rate, burst)
+
+        self._items: Dict[str, _RefreshItem] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = itertools.count()
+        self._inflight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._resumed: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._paused = False
+        self._paused_until = 0.0
+        self._closed = False
+        # 为 True 时只计算刷新间隔、不维护调度队列（多节点模式由租约表调度）
+        self.passive = False
+
+        # 统计信息
+        self.refreshed = 0
+        self.changed = 0
+        self.failed = 0
+        self.verify_pauses = 0
+
+    # ---- 调度 ----
+
+    def _interval(self, item: _RefreshItem, now: float) -> float:
+        popularity = self._decayed_popularity(item, now)
+        factor = (1 + self.volatility_weight * item.volatility) * (1 + math.log1p(popularity))
+        interval = self.base_interval / factor
+        if item.is_taken_down:
+            interval *= self.taken_down_factor
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def _decayed_popularity(self, item: _RefreshItem, now: float) -> float:
+        if item.popularity <= 0:
+            return 0.0
+        return item.popularity * 0.5 ** ((now - item.popularity_at) / self.popularity_half_life)
+
+    def _schedule(self, item: _RefreshItem, next_due: float):
+        item.next_due = next_due
+        item.version += 1
+        if item.sku_code in self._inflight or self.passive:
+            # 刷新完成后会重新排队
+            return
+        heapq.heappush(self._heap, (next_due, next(self._seq), item.sku_code, item.version))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def load(self, rows: Iterable[dict]):
+        """
+        用数据库中的商品初始化调度队列
+
+        :param rows: 含 sku_code、type、price、is_taken_down、update_time 的字典
+        """
+        now = time.time()
+        for row in rows:
+            try:
+                sku_type = int(row['type'])
+            except (TypeError, ValueError):
+                # 类型缺失的历史数据无法按类型重新抓取，跳过
+                continue
+            item = _RefreshItem(
+                sku_code=row['sku_code'],
+                type=sku_type,
+                price=float(row.get('price') or 0),
+                is_taken_down=int(row.get('is_taken_down') or 0),
+                # update_time 只在内容变化时更新，最近一次抓取时间取两者较大值
+                last_refresh=float(max(row.get('update_time') or 0, row.get('last_seen_time') or 0)),
+            )
+            self._items[item.sku_code] = item
+            self._schedule(item, item.last_refresh + self._interval(item, now))
+        logger.info(f"价格刷新队列已加载 {len(self._items)} 个商品")
+
+    def observe(self, sku_info: dict):
+        """
+        记录一次抓取结果（手动查询或后台刷新），更新波动率并重新计算下次刷新时间
+        """
+        sku_code = sku_info['sku_code']
+        now = time.time()
+        item = self._items.get(sku_code)
+        if item is None:
+            item = _RefreshItem(sku_code=sku_code, type=int(sku_info.get('type') or 0))
+            self._items[sku_code] = item
+        else:
+            new_price = float(sku_info.get('price') or 0)
+            change = 0.0
+            if item.price > 0 and new_price > 0:
+                change = abs(new_price - item.price) / item.price
+            item.volatility += self.volatility_alpha * (change - item.volatility)
+        item.price = float(sku_info.get('price') or 0)
+        item.is_taken_down = int(sku_info.get('is_taken_down') or 0)
+        if sku_info.get('type'):
+            item.type = int(sku_info['type'])
+        item.last_refresh = now
+        item.failures = 0
+        self._schedule(item, now + self._interval(item, now))
+
+    def touch(self, sku_code: str):
+        """记录一次接口访问，热门商品刷新得更频繁"""
+        item = self._items.get(sku_code)
+        if item is None:
+            return
+        now = time.time()
+        item.popularity = self._decayed_popularity(item, now) + 1
+        item.popularity_at = now
+        next_due = item.last_refresh + self._interval(item, now)
+        if next_due < item.next_due:
+            self._schedule(item, next_due)
+
+    def next_refresh_in(self, sku_code: str) -> float:
+        """距下次刷新的秒数，多节点模式下用来设置租约表的 next_crawl_at"""
+        item = self._items.get(sku_code)
+        if item is None:
+            return self.base_interval
+        return max(self.min_interval, item.next_due - time.time())
+
+    def _pop_due(self) -> Tuple[Optional[_RefreshItem], float]:
+        """取出一个已到期的商品，没有到期商品时返回 (None, 距下一个到期的秒数)"""
+        while self._heap:
+            next_due, _, sku_code, version = self._heap[0]
+            item = self._items.get(sku_code)
+            if item is None or item.version != version or sku_code in self._inflight:
+                heapq.heappop(self._heap)
+                continue
+            delay = next_due - time.time()
+            if delay > 0:
+                return None, delay
+            heapq.heappop(self._heap)
+            return item, 0.0
+        return None, self.max_interval
+
+    async def _wait_wakeup(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run(self):
+        while not self._closed:
+            await self._resumed.wait()
+            cooldown = self._paused_until - time.monotonic()
+            if cooldown > 0:
+                # resume() 会清除冷却并唤醒，不必等到冷却结束
+                await self._wait_wakeup(cooldown)
+                continue
+
+            item, delay = self._pop_due()
+            if item is None:
+                await self._wait_wakeup(delay)
+                continue
+
+            self._inflight.add(item.sku_code)
+            slot_acquired = False
+            started = False
+            try:
+                await self._slots.acquire()
+                slot_acquired = True
+                await self.limiter.acquire()
+                # 等待并发槽和令牌期间被暂停或进入人机验证冷却时不发起刷新
+                started = not self._paused and self._paused_until <= time.monotonic()
+            finally:
+                # 等待令牌时被取消或已暂停：归还已占用的并发槽，商品放回队列
+                if not started:
+                    if slot_acquired:
+                        self._slots.release()
+                    self._inflight.discard(item.sku_code)
+                    self._schedule(item, item.next_due)
+            if not started:
+                continue
+            task = asyncio.create_task(self._refresh_one(item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_one(self, item: _RefreshItem):
+        old_price = item.price
+        started = time.time()
+        try:
+            sku_info = await self._refresh(item.sku_code, item.type)
+        except TuringVerificationRequiredError as e:
+            self.verify_pauses += 1
+            self._paused_until = time.monotonic() + self.verify_cooldown
+            logger.warning(f"后台刷新触发人机验证，暂停 {self.verify_cooldown} 秒: {e.message}")
+            self._retry_later(item)
+            return
+        except (NetworkError, asyncio.TimeoutError) as e:
+            logger.warning(f"后台刷新商品 {item.sku_code} 失败: {getattr(e, 'message', e)}")
+            self._retry_later(item)
+            return
+        except Exception as e:
+            logger.error(f"后台刷新商品 {item.sku_code} 出错: {e}")
+            self._retry_later(item)
+            return
+        finally:
+            self._inflight.discard(item.sku_code)
+            self._slots.release()
+
+        self.refreshed += 1
+        if sku_info is None:
+            self._retry_later(item)
+            return
+        if float(sku_info.get('price') or 0) != old_price:
+            self.changed += 1
+        if item.last_refresh < started:
+            # refresh 内部没有调用 observe 时在这里记录结果
+            self.observe(sku_info)
+        else:
+            # observe 在刷新期间已经算好了下次刷新时间，只是当时商品在刷新中没有入队
+            self._schedule(item, item.next_due)
+
+    def _retry_later(self, item: _RefreshItem):
+        self.failed += 1
+        item.failures += 1
+        delay = min(self.max_interval, self.min_interval * 2 ** (item.failures - 1))
+        self._schedule(item, time.time() + delay)
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """在当前事件循环中启动调度任务"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        if not self._paused:
+            self._resumed.set()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"后台价格刷新已启动，并发 {self.concurrency}，限速 {self.limiter.rate}/s")
+
+    def pause(self):
+        self._paused = True
+        if self._resumed is not None:
+            call_in_loop(self._loop, self._resumed.clear)
+
+    def resume(self):
+        self._paused = False
+        self._paused_until = 0.0
+        if self._resumed is not None:
+            call_in_loop(self._loop, self._resumed.set)
+            # 唤醒正在等待人机验证冷却的调度任务
+            call_in_loop(self._loop, self._wakeup.set)
+
+    async def stop(self):
+        """停止调度并取消进行中的刷新"""
+        self._closed = True
+        if self._task is None:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            if self._loop.is_closed() or not self._loop.is_running():
+                return
+            future = asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop)
+            await asyncio.wrap_future(future)
+        else:
+            await self._cancel_tasks()
+
+    async def _cancel_tasks(self):
+        tasks = [self._task, *self._tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def stats(self) -> dict:
+        now = time.time()
+        overdue = [now - item.next_due for item in self._items.values()
+                   if item.next_due <= now and item.sku_code not in self._inflight]
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "paused": self._paused,
+            "cooldown_seconds": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "tracked": len(self._items),
+            "inflight": len(self._inflight),
+            "overdue": len(overdue),
+            "max_lag_seconds": round(max(overdue), 1) if overdue else 0,
+            "refreshed": self.refreshed,
+            "changed": self.changed,
+            "failed": self.failed,
+            "verify_pauses": self.verify_pauses,
+        }
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import pytest
+
+from common.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry
+from global_conf import global_vars
+from services.logger.logger import setup_logger
+
+global_vars.Logger = global_vars.Logger or setup_logger("test")
+
+POLICY = RetryPolicy(max_retries=1, exceptions=(TimeoutError,))
+
+
+def half_open_breaker() -> CircuitBreaker:
+    """已熔断且 reset_timeout 已过，下一次调用即为探测调用"""
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=0.1)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 1
+    return breaker
+
+
+async def succeed():
+    return "ok"
+
+
+def test_probe_non_policy_exception_reopens():
+    breaker = half_open_breaker()
+
+    async def fail():
+        raise RuntimeError("net::ERR_CONNECTION_RESET")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call_with_retry(fail, policy=POLICY, breaker=breaker))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # reset_timeout 过后可以重新探测并恢复
+    breaker.opened_at = time.monotonic() - 1
+    assert asyncio.run(call_with_retry(succeed, policy=POLICY, breaker=breaker)) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_cancelled_allows_next_probe():
+    breaker = half_open_breaker()
+
+    async def main():
+        task = asyncio.create_task(call_with_retry(asyncio.sleep, 10, policy=POLICY, breaker=breaker))
+        await asyncio.sleep(0)
+        # 探测进行中，其他调用被拒绝
+        with pytest.raises(CircuitOpenError):
+            await call_with_retry(succeed, policy=POLICY, breaker=breaker)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await call_with_retry(succeed, policy=POLICY, breaker=breaker)
+
+    assert asyncio.run(main()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_probe_non_policy_exception_not_counted():
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=0.1)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call_with_retry(fail, policy=POLICY, breaker=breaker))
+    assert breaker.state == CircuitBreaker.CLOSED